@@ -1,406 +1,742 @@
-from fastapi import APIRouter, UploadFile, Form
-from fastapi.responses import JSONResponse
-from app.parsing.gff3_parser import parse_gff3
-from app.comparison.align import best_matching_transcript, compare_transcripts
-from app.visualization.plotter import plot_gene_comparison, plot_to_base64, create_overview_plot
-import tempfile
-import os
+from fastapi import APIRouter, UploadFile, Form, File, Header, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from app.comparison.matching import find_matching_genes, compare_gene_pair, compare_gene_pairs
+from app.comparison.index import RegionIndex
+from app.comparison.metrics import accuracy_metrics
+from app.schemas.compact import FORMATS, BINARY_MEDIA_TYPE, TypeTable, compact_gene, compact_diff, binary_genes
+from app.schemas.encoding import dumps, JSONBytesResponse
+from app.schemas.serializers import serialize_gene, serialize_region_feature
+from app.jobs.manager import jobs
+from app.storage.datasets import store, DatasetError
+from app.telemetry import profiling
+from app.visualization.render_cache import render_cache, render_key, etag_for, etag_matches, cached_render
+from app.visualization.overview import get_pyramid, METRICS as OVERVIEW_METRICS
+from app.visualization.plotter import OVERVIEW_GENE_LIMIT
+from app.visualization.render_pool import render_pool, render_gene_comparison, render_overview, render_binned_overview
+from typing import Optional
+import numpy as np
+import base64
 import time
-from collections import defaultdict
 
 
-router = APIRouter()
+router = APIRouter(route_class=profiling.ProfiledRoute)
 
-def index_genes_by_locus(genes):
-    index = defaultdict(list)
-    for gene in genes.values():
-        key = (gene.chrom, gene.strand)
-        index[key].append(gene)
-    return index
+# Records serialized per chunk of a streamed NDJSON response
+NDJSON_BATCH = 256
 
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
 
-def serialize_gene(gene):
-    """Convert Gene object to JSON-serializable dict."""
+
+def resolve_dataset(upload, dataset_id, label):
+    """
+    Return the stored Dataset for a request, either by dataset ID or by
+    parsing (once) an uploaded file.
+    """
+    if dataset_id:
+        return store.get(dataset_id, label)
+    if upload is None:
+        raise DatasetError(f"Provide either {label}_file or {label}_dataset_id")
+    dataset, _ = store.add(upload.file, filename=upload.filename)
+    return dataset
+
+
+@router.post("/upload")
+def upload_dataset(file: UploadFile):
+    """Parse and store a GFF3 file, returning the dataset ID to use in later requests."""
+    dataset, cached = store.add(file.file, filename=file.filename)
     return {
-        "gene_id": gene.id,
-        "chrom": gene.chrom,
-        "start": gene.start,
-        "end": gene.end,
-        "strand": gene.strand,
-        "transcripts": [
-            {
-                "transcript_id": tx.id,
-                "exons": [
-                    {
-                        "start": exon.start,
-                        "end": exon.end,
-                        "type": exon.feature_type
-                    }
-                    for exon in tx.exons
-                ]
-            }
-            for tx in gene.transcripts
-        ]
+        "dataset_id": dataset.id,
+        "filename": dataset.filename,
+        "gene_count": len(dataset.genes),
+        "cached": cached
     }
 
 
-def find_matching_genes(ref_genes, pred_genes, overlap_threshold=0.5):
-    matches = []
+@router.delete("/datasets/{dataset_id}")
+def delete_dataset(dataset_id: str):
+    """Drop a stored dataset."""
+    return {"dataset_id": dataset_id, "removed": store.remove(dataset_id)}
+
+
+@router.get("/datasets/stats")
+def dataset_stats():
+    """Report dataset store occupancy and hit rates."""
+    return store.stats()
+
 
-    ref_index = index_genes_by_locus(ref_genes)
-    pred_index = index_genes_by_locus(pred_genes)
+def match_record(ref_genes, pred_genes, ref_id, pred_id, ratio):
+    """One /find-matches entry: a gene pair with both genes serialized."""
+    return {
+        "ref_gene_id": ref_id,
+        "pred_gene_id": pred_id,
+        "overlap_ratio": round(ratio, 3),
+        "ref_gene": serialize_gene(ref_genes[ref_id]),
+        "pred_gene": serialize_gene(pred_genes[pred_id])
+    }
+
+
+def comparison_results(ref_genes, pred_genes, matches, batch_size=None):
+    """
+    Yield one /compare-all result per (ref_id, pred_id, ratio) match,
+    comparing transcripts batch_size matches at a time (all at once if None).
+    """
+    batch_size = batch_size or max(len(matches), 1)
+    for i in range(0, len(matches), batch_size):
+        page = matches[i:i + batch_size]
+        comparisons = compare_gene_pairs(
+            [(ref_genes[ref_id], pred_genes[pred_id]) for ref_id, pred_id, _ in page]
+        )
+        for (ref_id, pred_id, ratio), gene_comparisons in zip(page, comparisons):
+            yield {
+                "gene_id": f"{ref_id} ↔ {pred_id}",
+                "ref_gene_id": ref_id,
+                "pred_gene_id": pred_id,
+                "overlap_ratio": round(ratio, 3),
+                "comparisons": gene_comparisons
+            }
 
-    for key in ref_index:
-        if key not in pred_index:
-            continue
 
-        for ref_gene in ref_index[key]:
-            for pred_gene in pred_index[key]:
+def ndjson_response(records, summary, batch_size=NDJSON_BATCH):
+    """
+    Stream records as newline-delimited JSON, serialized lazily in batches,
+    followed by one final {"done": true, ...summary} line.
+    """
+    def lines():
+        batch = []
+        for record in records:
+            batch.append(dumps(record))
+            if len(batch) >= batch_size:
+                yield b"\n".join(batch) + b"\n"
+                batch = []
+        if batch:
+            yield b"\n".join(batch) + b"\n"
+        yield dumps({"done": True, **summary}) + b"\n"
 
-                # 🚀 EARLY EXIT — ADD THIS HERE
-                if pred_gene.end < ref_gene.start or pred_gene.start > ref_gene.end:
-                    continue
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-                overlap_start = max(ref_gene.start, pred_gene.start)
-                overlap_end = min(ref_gene.end, pred_gene.end)
 
-                overlap_length = overlap_end - overlap_start + 1
-                ref_length = ref_gene.end - ref_gene.start + 1
-                pred_length = pred_gene.end - pred_gene.start + 1
+def format_error(wire_format: str, binary: bool = True, stream: bool = False):
+    """Error response for an unsupported format parameter, or None."""
+    if wire_format not in FORMATS:
+        return JSONResponse({"error": f"Unknown format {wire_format}; expected one of {', '.join(FORMATS)}"},
+                            status_code=400)
+    if wire_format == "binary" and not binary:
+        return JSONResponse({"error": "format=binary is only supported for gene payloads"}, status_code=400)
+    if stream and wire_format != "json":
+        return JSONResponse({"error": "stream=true only supports format=json"}, status_code=400)
+    return None
 
-                overlap_ratio = overlap_length / min(ref_length, pred_length)
 
-                if overlap_ratio >= overlap_threshold:
-                    matches.append(
-                        (ref_gene.id, pred_gene.id, overlap_ratio)
-                    )
+def binary_response(body: bytes):
+    return Response(body, media_type=BINARY_MEDIA_TYPE)
 
-    matches.sort(key=lambda x: x[2], reverse=True)
-    return matches
 
 @router.post("/parse")
-async def parse_gff3_file(file: UploadFile):
-    """Parse a single GFF3 file and return all genes."""
-    content = await file.read()
-    
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as temp:
-        temp.write(content.decode('utf-8'))
-        temp_path = temp.name
-    
-    try:
-        genes = parse_gff3(temp_path)
-        return {
-            "genes": [serialize_gene(gene) for gene in genes.values()],
+def parse_gff3_file(file: Optional[UploadFile] = File(None), dataset_id: Optional[str] = Form(None),
+                    stream: bool = Form(False), wire_format: str = Form("json", alias="format")):
+    """
+    Parse a single GFF3 file (or stored dataset) and return all genes.
+    With stream=true genes are sent as NDJSON, one per line, ending with
+    {"done": true, "gene_count": n}.
+    format=compact or format=binary selects a compact wire format (see
+    app.schemas.compact).
+    """
+    error = format_error(wire_format, stream=stream)
+    if error:
+        return error
+    genes = resolve_dataset(file, dataset_id, "input").genes
+    if stream:
+        return ndjson_response((serialize_gene(gene) for gene in genes.values()),
+                               {"gene_count": len(genes)})
+    if wire_format == "binary":
+        return binary_response(binary_genes(serialize_gene(gene) for gene in genes.values()))
+    if wire_format == "compact":
+        types = TypeTable()
+        compact = [compact_gene(serialize_gene(gene), types) for gene in genes.values()]
+        return JSONBytesResponse({
+            "format": "compact",
+            "types": types.types,
+            "genes": compact,
             "gene_ids": list(genes.keys())
-        }
-    finally:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+        })
+    return JSONBytesResponse({
+        "genes": [serialize_gene(gene) for gene in genes.values()],
+        "gene_ids": list(genes.keys())
+    })
 
 
 @router.post("/find-matches")
-async def find_matches(ref_file: UploadFile, pred_file: UploadFile, overlap_threshold: float = Form(0.5), include_overview: bool = Form(False)):
-    """Find matching genes between two files by genomic coordinates. Optionally generate overview visualization."""
-    ref_content = await ref_file.read()
-    pred_content = await pred_file.read()
+def find_matches(request: Request,
+                 ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                 ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                 overlap_threshold: float = Form(0.5), include_overview: bool = Form(False),
+                 stream: bool = Form(False), wire_format: str = Form("json", alias="format")):
+    """
+    Find matching genes between two files by genomic coordinates. Optionally generate overview visualization
+    (base64 in overview_image, plus overview_url for the raw image endpoint).
+    With stream=true matches are sent as NDJSON, one per line, as they are
+    serialized; the last line is {"done": true, "total_matches": n} and
+    carries overview_url when include_overview is set.
+    format=compact encodes the embedded genes compactly; format=binary sends
+    [ref_gene_id, pred_gene_id, overlap_ratio] rows in the header and the
+    ref/pred genes of each match, in turn, as binary genes.
+    """
+    error = format_error(wire_format, stream=stream)
+    if error:
+        return error
+    ref_dataset = resolve_dataset(ref_file, ref_dataset_id, "ref")
+    pred_dataset = resolve_dataset(pred_file, pred_dataset_id, "pred")
+    ref_genes, pred_genes = ref_dataset.genes, pred_dataset.genes
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as ref_temp:
-        ref_temp.write(ref_content.decode('utf-8'))
-        ref_temp_path = ref_temp.name
+    matches = find_matching_genes(ref_genes, pred_genes, overlap_threshold)
+    overview_url = str(request.url_for("overview_image_file", fmt="png").include_query_params(
+        ref_dataset_id=ref_dataset.id, pred_dataset_id=pred_dataset.id, overlap_threshold=overlap_threshold
+    ))
+
+    if stream:
+        summary = {"total_matches": len(matches)}
+        if include_overview and matches:
+            summary["overview_url"] = overview_url
+        return ndjson_response(
+            (match_record(ref_genes, pred_genes, *match) for match in matches), summary
+        )
+
+    if wire_format == "binary":
+        header = {
+            "matches": [[ref_id, pred_id, round(ratio, 3)] for ref_id, pred_id, ratio in matches],
+            "total_matches": len(matches)
+        }
+        if include_overview and matches:
+            header["overview_url"] = overview_url
+        genes = (serialize_gene(genes[gene_id])
+                 for ref_id, pred_id, _ in matches
+                 for genes, gene_id in ((ref_genes, ref_id), (pred_genes, pred_id)))
+        return binary_response(binary_genes(genes, header))
+
+    match_data = [match_record(ref_genes, pred_genes, *match) for match in matches]
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as pred_temp:
-        pred_temp.write(pred_content.decode('utf-8'))
-        pred_temp_path = pred_temp.name
+    result = {
+        "matches": match_data,
+        "total_matches": len(matches)
+    }
     
-    try:
-        ref_genes = parse_gff3(ref_temp_path)
-        pred_genes = parse_gff3(pred_temp_path)
-        
-        matches = find_matching_genes(ref_genes, pred_genes, overlap_threshold)
-        
-        match_data = [
-            {
-                "ref_gene_id": ref_id,
-                "pred_gene_id": pred_id,
-                "overlap_ratio": round(ratio, 3),
-                "ref_gene": serialize_gene(ref_genes[ref_id]),
-                "pred_gene": serialize_gene(pred_genes[pred_id])
-            }
-            for ref_id, pred_id, ratio in matches
+    # Generate overview visualization if requested
+    if include_overview and match_data:
+        overview_png = overview_image(ref_dataset, pred_dataset, overlap_threshold, match_data)
+        result["overview_image"] = base64.b64encode(overview_png).decode('utf-8')
+        result["overview_url"] = overview_url
+
+    if wire_format == "compact":
+        types = TypeTable()
+        result["matches"] = [
+            {**match, "ref_gene": compact_gene(match["ref_gene"], types),
+             "pred_gene": compact_gene(match["pred_gene"], types)}
+            for match in match_data
         ]
-        
-        result = {
-            "matches": match_data,
-            "total_matches": len(matches)
-        }
-        
-        # Generate overview visualization if requested
-        if include_overview and match_data:
-            overview_fig = create_overview_plot(match_data)
-            result["overview_image"] = plot_to_base64(overview_fig)
-        
-        return result
-    finally:
-        if os.path.exists(ref_temp_path):
-            os.unlink(ref_temp_path)
-        if os.path.exists(pred_temp_path):
-            os.unlink(pred_temp_path)
+        result.update(format="compact", types=types.types)
+    
+    return JSONBytesResponse(result)
+
+
+def gene_image(ref_dataset, pred_dataset, ref_gene, pred_gene, fmt="png", comparisons=None):
+    """Render (or fetch from cache) the comparison image for a gene pair."""
+    key = render_key("gene", ref_dataset.id, pred_dataset.id, ref_gene.id, pred_gene.id, fmt)
+
+    def render():
+        ref_gene_dict = serialize_gene(ref_gene)
+        pred_gene_dict = serialize_gene(pred_gene)
+        diffs = comparisons if comparisons is not None else compare_gene_pair(ref_gene, pred_gene)
+        return render_pool.render(render_gene_comparison, ref_gene_dict, pred_gene_dict, diffs, fmt=fmt)
+
+    return key, cached_render(key, render)
+
+
+def window_genes_of(dataset, chrom=None, start=None, end=None):
+    """The dataset's genes overlapping chrom:start-end, or all of them without chrom."""
+    if chrom is None:
+        return dataset.genes
+    genes = dataset.query_region(chrom, 1 if start is None else start, 2 ** 62 if end is None else end)
+    return {gene.id: gene for gene in genes}
+
+
+def overview_image(ref_dataset, pred_dataset, overlap_threshold, match_data=None, fmt="png",
+                   mode="auto", metric="overlap", chrom=None, start=None, end=None):
+    """
+    Render (or fetch from cache) the match overview image for two datasets.
+    mode="genes" draws individual matches, mode="binned" draws the
+    level-of-detail heatmap; both can be limited to chrom:start-end. "auto"
+    switches to binned above OVERVIEW_GENE_LIMIT matches or, without
+    match_data, genes in the window, so the pyramid is only built when the
+    binned view is drawn.
+    """
+    if mode == "auto" and match_data is not None:
+        mode = "genes" if len(match_data) <= OVERVIEW_GENE_LIMIT else "binned"
+    if mode == "auto":
+        window_genes = max(len(window_genes_of(ref_dataset, chrom, start, end)),
+                           len(window_genes_of(pred_dataset, chrom, start, end)))
+        mode = "genes" if window_genes <= OVERVIEW_GENE_LIMIT else "binned"
+
+    if mode == "binned":
+        key = render_key("overview-binned", ref_dataset.id, pred_dataset.id, overlap_threshold,
+                         fmt, metric, chrom, start, end)
+
+        def render():
+            pyramid = get_pyramid(ref_dataset, pred_dataset, overlap_threshold)
+            if chrom is not None:
+                if chrom not in pyramid.levels:
+                    values, bin_start, bin_size = np.empty(0), 0, pyramid.base_bin_size
+                else:
+                    values, bin_start, bin_size = pyramid.region(chrom, start, end, metric)
+                matrix, labels = values.reshape(1, -1), [chrom]
+            else:
+                matrix, labels, bin_size = pyramid.genome(metric)
+                bin_start = 0
+            return render_pool.render(render_binned_overview, matrix, labels, bin_start, bin_size,
+                                      fmt=fmt, metric=metric, total_matches=pyramid.total_matches)
+
+        return cached_render(key, render)
+
+    key = render_key("overview", ref_dataset.id, pred_dataset.id, overlap_threshold, fmt, chrom, start, end)
+
+    def render():
+        data = match_data
+        if data is None:
+            ref_genes = window_genes_of(ref_dataset, chrom, start, end)
+            pred_genes = window_genes_of(pred_dataset, chrom, start, end)
+            data = [
+                match_record(ref_genes, pred_genes, *match)
+                for match in find_matching_genes(ref_genes, pred_genes, overlap_threshold)
+            ]
+        return render_pool.render(render_overview, data, fmt=fmt)
+
+    return cached_render(key, render)
+
+
+def image_response(image: bytes, fmt: str, key: str):
+    """Raw image response; content-addressed, so it may be cached indefinitely."""
+    return Response(image, media_type=IMAGE_FORMATS[fmt], headers={
+        "ETag": etag_for(key),
+        "Cache-Control": "public, max-age=31536000, immutable",
+    })
 
 
 @router.post("/visualize-gene")
-async def visualize_gene(ref_file: UploadFile, pred_file: UploadFile, 
-                         ref_gene_id: str = Form(...), pred_gene_id: str = Form(...)):
-    """Generate a detailed visualization comparing two specific genes."""
-    ref_content = await ref_file.read()
-    pred_content = await pred_file.read()
+def visualize_gene(request: Request,
+                   ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                   ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                   ref_gene_id: str = Form(...), pred_gene_id: str = Form(...),
+                   include_image: bool = Form(True), if_none_match: Optional[str] = Header(None)):
+    """
+    Generate a detailed visualization comparing two specific genes.
+    Rendered images are cached; the response carries an ETag and a matching
+    If-None-Match gets 304 Not Modified. image_url points at the raw PNG
+    endpoint; pass include_image=false to skip the base64 copy.
+    """
+    ref_dataset = resolve_dataset(ref_file, ref_dataset_id, "ref")
+    pred_dataset = resolve_dataset(pred_file, pred_dataset_id, "pred")
+    ref_genes, pred_genes = ref_dataset.genes, pred_dataset.genes
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as ref_temp:
-        ref_temp.write(ref_content.decode('utf-8'))
-        ref_temp_path = ref_temp.name
+    key = render_key("gene", ref_dataset.id, pred_dataset.id, ref_gene_id, pred_gene_id, "png", include_image)
+    if etag_matches(if_none_match, key):
+        return Response(status_code=304, headers={"ETag": etag_for(key)})
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as pred_temp:
-        pred_temp.write(pred_content.decode('utf-8'))
-        pred_temp_path = pred_temp.name
+    ref_gene = ref_genes.get(ref_gene_id)
+    pred_gene = pred_genes.get(pred_gene_id)
     
-    try:
-        ref_genes = parse_gff3(ref_temp_path)
-        pred_genes = parse_gff3(pred_temp_path)
-        
-        ref_gene = ref_genes.get(ref_gene_id)
-        pred_gene = pred_genes.get(pred_gene_id)
-        
-        if not ref_gene:
-            return JSONResponse({"error": f"Gene {ref_gene_id} not found in reference file"}, status_code=404)
-        if not pred_gene:
-            return JSONResponse({"error": f"Gene {pred_gene_id} not found in predicted file"}, status_code=404)
-        
-        # Serialize genes
-        ref_gene_dict = serialize_gene(ref_gene)
-        pred_gene_dict = serialize_gene(pred_gene)
-        
-        # Get comparison data
-        comparisons = []
-        for pred_tx in pred_gene.transcripts:
-            ref_tx = best_matching_transcript(pred_tx, ref_gene.transcripts)
-            if ref_tx:
-                diff = compare_transcripts(ref_tx, pred_tx)
-                serialized_diff = {
-                    "reference_transcript": ref_tx.id,
-                    "predicted_transcript": pred_tx.id,
-                    "matched": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["matched"]
-                    ],
-                    "missing": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["missing"]
-                    ],
-                    "extra": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["extra"]
-                    ],
-                    "partial": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["partial"]
-                    ]
-                }
-                comparisons.append(serialized_diff)
-        
-        # Generate visualization
-        fig = plot_gene_comparison(
-            ref_gene_dict, pred_gene_dict,
-            ref_gene_dict['transcripts'], pred_gene_dict['transcripts'],
-            comparisons
-        )
-        
-        image_base64 = plot_to_base64(fig)
-        
-        return {
-            "ref_gene_id": ref_gene_id,
-            "pred_gene_id": pred_gene_id,
-            "image": image_base64,
-            "comparison_data": comparisons
-        }
-    finally:
-        if os.path.exists(ref_temp_path):
-            os.unlink(ref_temp_path)
-        if os.path.exists(pred_temp_path):
-            os.unlink(pred_temp_path)
+    if not ref_gene:
+        return JSONResponse({"error": f"Gene {ref_gene_id} not found in reference file"}, status_code=404)
+    if not pred_gene:
+        return JSONResponse({"error": f"Gene {pred_gene_id} not found in predicted file"}, status_code=404)
+    
+    # Get comparison data
+    comparisons = compare_gene_pair(ref_gene, pred_gene)
+    
+    result = {
+        "ref_gene_id": ref_gene_id,
+        "pred_gene_id": pred_gene_id,
+        "image_url": str(request.url_for(
+            "gene_image_file", ref_dataset_id=ref_dataset.id, pred_dataset_id=pred_dataset.id,
+            ref_gene_id=ref_gene_id, pred_gene_id=pred_gene_id, fmt="png"
+        )),
+        "comparison_data": comparisons
+    }
+    
+    # Generate visualization
+    if include_image:
+        _, image_png = gene_image(ref_dataset, pred_dataset, ref_gene, pred_gene, comparisons=comparisons)
+        result["image"] = base64.b64encode(image_png).decode('utf-8')
+    
+    return JSONBytesResponse(result, headers={"ETag": etag_for(key), "Cache-Control": "no-cache"})
+
+
+@router.get("/visualize-gene/{ref_dataset_id}/{pred_dataset_id}/{ref_gene_id}/{pred_gene_id}.{fmt}",
+            name="gene_image_file")
+def visualize_gene_image(ref_dataset_id: str, pred_dataset_id: str, ref_gene_id: str, pred_gene_id: str,
+                         fmt: str, if_none_match: Optional[str] = Header(None)):
+    """Raw comparison image (png, svg or webp) for a gene pair, usable directly as an <img> src."""
+    if fmt not in IMAGE_FORMATS:
+        return JSONResponse({"error": f"Unsupported image format {fmt}"}, status_code=400)
+
+    ref_dataset = store.get(ref_dataset_id, "ref")
+    pred_dataset = store.get(pred_dataset_id, "pred")
+
+    key = render_key("gene", ref_dataset.id, pred_dataset.id, ref_gene_id, pred_gene_id, fmt)
+    if etag_matches(if_none_match, key):
+        return Response(status_code=304, headers={"ETag": etag_for(key)})
+
+    ref_gene = ref_dataset.genes.get(ref_gene_id)
+    pred_gene = pred_dataset.genes.get(pred_gene_id)
+    if not ref_gene:
+        return JSONResponse({"error": f"Gene {ref_gene_id} not found in reference file"}, status_code=404)
+    if not pred_gene:
+        return JSONResponse({"error": f"Gene {pred_gene_id} not found in predicted file"}, status_code=404)
+
+    key, image = gene_image(ref_dataset, pred_dataset, ref_gene, pred_gene, fmt)
+    return image_response(image, fmt, key)
+
+
+@router.get("/overview.{fmt}", name="overview_image_file")
+def overview_image_file(fmt: str, ref_dataset_id: str, pred_dataset_id: str, overlap_threshold: float = 0.5,
+                        mode: str = "auto", metric: str = "overlap", chrom: Optional[str] = None,
+                        start: Optional[int] = None, end: Optional[int] = None,
+                        if_none_match: Optional[str] = Header(None)):
+    """
+    Raw gene match overview image (png, svg or webp) for two stored datasets.
+    mode=binned (or auto with many genes in view) draws per-chromosome bins of
+    the chosen metric (count, overlap, missing_rate, extra_rate); pass chrom
+    and optionally start/end to zoom into a region.
+    """
+    if fmt not in IMAGE_FORMATS:
+        return JSONResponse({"error": f"Unsupported image format {fmt}"}, status_code=400)
+    if mode not in ("auto", "genes", "binned"):
+        return JSONResponse({"error": f"Unknown overview mode {mode}"}, status_code=400)
+    if metric not in OVERVIEW_METRICS:
+        return JSONResponse({"error": f"Unknown overview metric {metric}"}, status_code=400)
+    if start is not None and end is not None and start >= end:
+        return JSONResponse({"error": "Overview start must be less than end"}, status_code=400)
+
+    ref_dataset = store.get(ref_dataset_id, "ref")
+    pred_dataset = store.get(pred_dataset_id, "pred")
+
+    key = render_key("overview", ref_dataset.id, pred_dataset.id, overlap_threshold, fmt,
+                     mode, metric, chrom, start, end)
+    if etag_matches(if_none_match, key):
+        return Response(status_code=304, headers={"ETag": etag_for(key)})
+
+    image = overview_image(ref_dataset, pred_dataset, overlap_threshold, fmt=fmt,
+                           mode=mode, metric=metric, chrom=chrom, start=start, end=end)
+    return image_response(image, fmt, key)
 
 
 @router.post("/gene")
-async def get_gene(ref_file: UploadFile, pred_file: UploadFile, gene_id: str = Form(...)):
-    """Get gene data from both files for visualization."""
-    ref_content = await ref_file.read()
-    pred_content = await pred_file.read()
+def get_gene(ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                   ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                   gene_id: str = Form(...), wire_format: str = Form("json", alias="format")):
+    """Get gene data from both files for visualization (format: json, compact or binary)."""
+    error = format_error(wire_format)
+    if error:
+        return error
+    ref_genes = resolve_dataset(ref_file, ref_dataset_id, "ref").genes
+    pred_genes = resolve_dataset(pred_file, pred_dataset_id, "pred").genes
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as ref_temp:
-        ref_temp.write(ref_content.decode('utf-8'))
-        ref_temp_path = ref_temp.name
+    ref_gene = ref_genes.get(gene_id)
+    pred_gene = pred_genes.get(gene_id)
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as pred_temp:
-        pred_temp.write(pred_content.decode('utf-8'))
-        pred_temp_path = pred_temp.name
+    if not ref_gene:
+        return {"error": f"Gene {gene_id} not found in reference file"}
+    if not pred_gene:
+        return {"error": f"Gene {gene_id} not found in predicted file"}
+
+    reference, predicted = serialize_gene(ref_gene), serialize_gene(pred_gene)
+    if wire_format == "binary":
+        return binary_response(binary_genes([reference, predicted], {"gene_id": gene_id}))
+    if wire_format == "compact":
+        types = TypeTable()
+        return JSONBytesResponse({
+            "format": "compact",
+            "types": types.types,
+            "gene_id": gene_id,
+            "reference": compact_gene(reference, types),
+            "predicted": compact_gene(predicted, types)
+        })
     
+    return JSONBytesResponse({
+        "gene_id": gene_id,
+        "reference": reference,
+        "predicted": predicted
+    })
+
+
+def parse_region(region: str) -> tuple:
+    """Parse "chrom:start-end" (commas allowed) or a bare chrom into (chrom, start, end)."""
+    chrom, sep, span = region.rpartition(":")
+    if not sep:
+        return region, None, None
     try:
-        ref_genes = parse_gff3(ref_temp_path)
-        pred_genes = parse_gff3(pred_temp_path)
-        
-        ref_gene = ref_genes.get(gene_id)
-        pred_gene = pred_genes.get(gene_id)
-        
-        if not ref_gene:
-            return {"error": f"Gene {gene_id} not found in reference file"}
-        if not pred_gene:
-            return {"error": f"Gene {gene_id} not found in predicted file"}
-        
-        return {
-            "gene_id": gene_id,
-            "reference": serialize_gene(ref_gene),
-            "predicted": serialize_gene(pred_gene)
-        }
-    finally:
-        if os.path.exists(ref_temp_path):
-            os.unlink(ref_temp_path)
-        if os.path.exists(pred_temp_path):
-            os.unlink(pred_temp_path)
+        start, end = (int(x.replace(",", "")) for x in span.split("-", 1))
+    except ValueError:
+        raise DatasetError(f"Invalid region {region!r}; expected chrom:start-end")
+    return chrom, start, end
+
+
+@router.get("/region")
+def get_region(ref_dataset_id: str, pred_dataset_id: Optional[str] = None,
+               region: Optional[str] = None, chrom: Optional[str] = None,
+               start: Optional[int] = None, end: Optional[int] = None,
+               level: str = "gene", limit: int = 5000):
+    """
+    Features of stored datasets overlapping a window, given as
+    region=chrom:start-end or as chrom/start/end. level selects genes (with
+    their transcripts), transcripts or exons; each side returns at most
+    limit features, ordered by start. Without an end (e.g. region=chr1) the
+    window runs to the end of the chromosome and the reported end is its
+    last gene end (null if neither dataset has genes there).
+    """
+    if region:
+        chrom, start, end = parse_region(region)
+    if not chrom:
+        return JSONResponse({"error": "Provide region=chrom:start-end or chrom"}, status_code=400)
+    if level not in RegionIndex.LEVELS:
+        return JSONResponse({"error": f"Unknown region level {level}"}, status_code=400)
+    open_ended = end is None
+    start = 1 if start is None else start
+    end = 2 ** 62 if open_ended else end
+    if start > end:
+        return JSONResponse({"error": "Region start must not exceed end"}, status_code=400)
+
+    datasets = {"ref": store.get(ref_dataset_id, "ref")}
+    if pred_dataset_id:
+        datasets["pred"] = store.get(pred_dataset_id, "pred")
+
+    reported_end = end
+    if open_ended:
+        # Report the last gene end on chrom rather than the open-ended sentinel
+        ends = [e for e in (d.region_index.chrom_end(chrom) for d in datasets.values()) if e is not None]
+        reported_end = max(ends) if ends else None
+
+    result = {"chrom": chrom, "start": start, "end": reported_end, "level": level, "truncated": False}
+    for label, dataset in datasets.items():
+        features = dataset.query_region(chrom, start, end, level)
+        if len(features) > limit:
+            features = features[:limit]
+            result["truncated"] = True
+        result[label] = [serialize_region_feature(f, level) for f in features]
+    return JSONBytesResponse(result)
+
+
+def compact_comparisons(result: dict, wire_format: str) -> dict:
+    """Apply format=compact to a result holding a "comparisons" list of diffs."""
+    if wire_format != "compact":
+        return result
+    types = TypeTable()
+    comparisons = [compact_diff(diff, types) for diff in result["comparisons"]]
+    return {**result, "format": "compact", "types": types.types, "comparisons": comparisons}
 
 
 @router.post("/compare-genes")
-async def compare_genes(ref_file: UploadFile, pred_file: UploadFile, 
-                        ref_gene_id: str = Form(...), pred_gene_id: str = Form(...)):
-    """Compare two genes with different IDs from different files."""
-    ref_content = await ref_file.read()
-    pred_content = await pred_file.read()
+def compare_genes(ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                        ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                        ref_gene_id: str = Form(...), pred_gene_id: str = Form(...),
+                        wire_format: str = Form("json", alias="format")):
+    """Compare two genes with different IDs from different files (format: json or compact)."""
+    error = format_error(wire_format, binary=False)
+    if error:
+        return error
+    ref_genes = resolve_dataset(ref_file, ref_dataset_id, "ref").genes
+    pred_genes = resolve_dataset(pred_file, pred_dataset_id, "pred").genes
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as ref_temp:
-        ref_temp.write(ref_content.decode('utf-8'))
-        ref_temp_path = ref_temp.name
+    ref_gene = ref_genes.get(ref_gene_id)
+    pred_gene = pred_genes.get(pred_gene_id)
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as pred_temp:
-        pred_temp.write(pred_content.decode('utf-8'))
-        pred_temp_path = pred_temp.name
+    if not ref_gene:
+        return {"error": f"Gene {ref_gene_id} not found in reference file"}
+    if not pred_gene:
+        return {"error": f"Gene {pred_gene_id} not found in predicted file"}
     
-    try:
-        ref_genes = parse_gff3(ref_temp_path)
-        pred_genes = parse_gff3(pred_temp_path)
-        
-        ref_gene = ref_genes.get(ref_gene_id)
-        pred_gene = pred_genes.get(pred_gene_id)
-        
-        if not ref_gene:
-            return {"error": f"Gene {ref_gene_id} not found in reference file"}
-        if not pred_gene:
-            return {"error": f"Gene {pred_gene_id} not found in predicted file"}
-        
-        comparisons = []
-
-        for pred_tx in pred_gene.transcripts:
-            ref_tx = best_reference_transcript(pred_tx, ref_gene.transcripts)
-            if ref_tx:
-                diff = compare_transcripts(ref_tx, pred_tx)
-                serialized_diff = {
-                    "reference_transcript": ref_tx.id,
-                    "predicted_transcript": pred_tx.id,
-                    "matched": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["matched"]
-                    ],
-                    "missing": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["missing"]
-                    ],
-                    "extra": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["extra"]
-                    ],
-                    "partial": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["partial"]
-                    ]
-                }
-                comparisons.append(serialized_diff)
-
-        return {
-            "gene_id": f"{ref_gene_id} ↔ {pred_gene_id}",
-            "ref_gene_id": ref_gene_id,
-            "pred_gene_id": pred_gene_id,
-            "comparisons": comparisons
-        }
-    finally:
-        if os.path.exists(ref_temp_path):
-            os.unlink(ref_temp_path)
-        if os.path.exists(pred_temp_path):
-            os.unlink(pred_temp_path)
+    comparisons = compare_gene_pair(ref_gene, pred_gene)
+
+    return JSONBytesResponse(compact_comparisons({
+        "gene_id": f"{ref_gene_id} ↔ {pred_gene_id}",
+        "ref_gene_id": ref_gene_id,
+        "pred_gene_id": pred_gene_id,
+        "comparisons": comparisons
+    }, wire_format))
 
 
 @router.post("/compare")
-async def compare_gff3(ref_file: UploadFile, pred_file: UploadFile, gene_id: str = Form(...)):
-    # Save uploaded files temporarily
-    ref_content = await ref_file.read()
-    pred_content = await pred_file.read()
+def compare_gff3(ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                       ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                       gene_id: str = Form(...), wire_format: str = Form("json", alias="format")):
+    error = format_error(wire_format, binary=False)
+    if error:
+        return error
+    ref_genes = resolve_dataset(ref_file, ref_dataset_id, "ref").genes
+    pred_genes = resolve_dataset(pred_file, pred_dataset_id, "pred").genes
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as ref_temp:
-        ref_temp.write(ref_content.decode('utf-8'))
-        ref_temp_path = ref_temp.name
+    ref_gene = ref_genes.get(gene_id)
+    pred_gene = pred_genes.get(gene_id)
     
-    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.gff3') as pred_temp:
-        pred_temp.write(pred_content.decode('utf-8'))
-        pred_temp_path = pred_temp.name
+    if not ref_gene or not pred_gene:
+        return {"error": f"Gene {gene_id} not found in one or both files"}
     
-    try:
-        # Parse GFF3 files
-        ref_genes = parse_gff3(ref_temp_path)
-        pred_genes = parse_gff3(pred_temp_path)
-        
-        ref_gene = ref_genes.get(gene_id)
-        pred_gene = pred_genes.get(gene_id)
-        
-        if not ref_gene or not pred_gene:
-            return {"error": f"Gene {gene_id} not found in one or both files"}
-        
-        comparisons = []
-
-        for pred_tx in pred_gene.transcripts:
-            ref_tx = best_reference_transcript(pred_tx, ref_gene.transcripts)
-            if ref_tx:
-                diff = compare_transcripts(ref_tx, pred_tx)
-                # Serialize Exon objects to dictionaries
-                serialized_diff = {
-                    "reference_transcript": ref_tx.id,
-                    "predicted_transcript": pred_tx.id,
-                    "matched": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["matched"]
-                    ],
-                    "missing": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["missing"]
-                    ],
-                    "extra": [
-                        {"start": e.start, "end": e.end, "type": e.feature_type}
-                        for e in diff["extra"]
-                    ],
-                    "partial": [
-                        {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
-                         "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
-                        for r, p in diff["partial"]
-                    ]
-                }
-                comparisons.append(serialized_diff)
-
-        return {
-            "gene_id": gene_id,
-            "comparisons": comparisons
-        }
-    finally:
-        # Clean up temporary files
-        if os.path.exists(ref_temp_path):
-            os.unlink(ref_temp_path)
-        if os.path.exists(pred_temp_path):
-            os.unlink(pred_temp_path)
\ No newline at end of file
+    comparisons = compare_gene_pair(ref_gene, pred_gene)
+
+    return JSONBytesResponse(compact_comparisons({
+        "gene_id": gene_id,
+        "comparisons": comparisons
+    }, wire_format))
+
+
+
+@router.post("/compare-all")
+def compare_all(ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                      ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None),
+                      overlap_threshold: float = Form(0.5), offset: int = Form(0), limit: Optional[int] = Form(None),
+                      stream: bool = Form(False), wire_format: str = Form("json", alias="format")):
+    """
+    Match genes and compare transcripts for every matched pair in one request.
+    Results follow find_matching_genes order; use offset/limit to page.
+    With stream=true the selected results are sent as NDJSON, one per line,
+    with transcripts compared NDJSON_BATCH matches at a time as the response
+    is written; the last line is {"done": true, "total_matches": n}.
+    format=compact flattens the exon coordinates of every comparison.
+    """
+    error = format_error(wire_format, binary=False, stream=stream)
+    if error:
+        return error
+    ref_genes = resolve_dataset(ref_file, ref_dataset_id, "ref").genes
+    pred_genes = resolve_dataset(pred_file, pred_dataset_id, "pred").genes
+
+    matches = find_matching_genes(ref_genes, pred_genes, overlap_threshold)
+    end = len(matches) if limit is None else offset + limit
+    page = matches[offset:end]
+
+    if stream:
+        return ndjson_response(comparison_results(ref_genes, pred_genes, page, NDJSON_BATCH),
+                               {"total_matches": len(matches)})
+
+    results = list(comparison_results(ref_genes, pred_genes, page))
+
+    if wire_format == "compact":
+        types = TypeTable()
+        results = [
+            {**result, "comparisons": [compact_diff(diff, types) for diff in result["comparisons"]]}
+            for result in results
+        ]
+        return JSONBytesResponse({
+            "format": "compact",
+            "types": types.types,
+            "results": results,
+            "total_matches": len(matches),
+            "offset": offset,
+            "limit": limit
+        })
+
+    return JSONBytesResponse({
+        "results": results,
+        "total_matches": len(matches),
+        "offset": offset,
+        "limit": limit
+    })
+
+
+@router.post("/metrics")
+def prediction_metrics(ref_file: Optional[UploadFile] = File(None), pred_file: Optional[UploadFile] = File(None),
+                       ref_dataset_id: Optional[str] = Form(None), pred_dataset_id: Optional[str] = Form(None)):
+    """
+    gffcompare-style accuracy of the prediction against the reference:
+    base-, exon-, transcript- and gene-level sensitivity and precision over
+    the whole genome (see app.comparison.metrics).
+    """
+    ref_genes = resolve_dataset(ref_file, ref_dataset_id, "ref").genes
+    pred_genes = resolve_dataset(pred_file, pred_dataset_id, "pred").genes
+    return accuracy_metrics(ref_genes, pred_genes)
+
+
+@router.post("/jobs")
+def submit_job(ref_dataset_id: str = Form(...), pred_dataset_id: str = Form(...),
+               overlap_threshold: float = Form(0.5)):
+    """Start a background whole-genome comparison; poll /jobs/{job_id} for progress."""
+    ref_genes = store.get(ref_dataset_id, "ref").genes
+    pred_genes = store.get(pred_dataset_id, "pred").genes
+    job = jobs.submit_comparison(ref_genes, pred_genes, overlap_threshold)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Report a job's status and progress (genes processed / total)."""
+    job = jobs.get(job_id)
+    if not job:
+        return JSONResponse({"error": f"Job {job_id} not found"}, status_code=404)
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """Fetch a finished job's result (same shape as /compare-all)."""
+    job = jobs.get(job_id)
+    if not job:
+        return JSONResponse({"error": f"Job {job_id} not found"}, status_code=404)
+    if job.status == "failed":
+        return JSONResponse({"error": job.error}, status_code=500)
+    if job.status != "done":
+        return JSONResponse(job.to_dict(), status_code=202)
+    return JSONBytesResponse(job.result)
+
+
+@router.get("/render/stats")
+def render_stats():
+    """Render pool concurrency/queue-depth metrics and render cache occupancy."""
+    return {**render_pool.stats(), "cache": render_cache.stats()}
+
+
+def profile_error(token: Optional[str]):
+    if not profiling.ENABLED:
+        return JSONResponse({"error": "Profiling is disabled (set GFF3_PROFILE_TOKEN)"}, status_code=404)
+    if not profiling.authorized(token):
+        return JSONResponse({"error": f"Missing or invalid {profiling.ADMIN_HEADER} header"}, status_code=403)
+    return None
+
+
+@router.get("/profiles")
+def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Recently captured request profiles, newest first."""
+    error = profile_error(x_profile_token)
+    if error:
+        return error
+    return {"profiles": profiling.profiles.list()}
+
+
+@router.get("/profiles/{profile_id}.{fmt}")
+def profile_file(profile_id: str, fmt: str, x_profile_token: Optional[str] = Header(None)):
+    """A captured profile as marshalled pstats (fmt=pstats) or collapsed stacks (fmt=txt)."""
+    error = profile_error(x_profile_token)
+    if error:
+        return error
+    profile = profiling.profiles.get(profile_id)
+    if not profile:
+        return JSONResponse({"error": f"Profile {profile_id} not found"}, status_code=404)
+    headers = {"Content-Disposition": f'attachment; filename="{profile_id}.{fmt}"'}
+    if fmt == "pstats":
+        return Response(profile.pstats, media_type="application/octet-stream", headers=headers)
+    if fmt == "txt":
+        return Response(profile.collapsed, media_type="text/plain", headers=headers)
+    return JSONResponse({"error": f"Unsupported profile format {fmt}"}, status_code=400)
+
+
+@router.get("/profiles/{profile_id}")
+def profile_summary(profile_id: str, sort: str = "cumulative", limit: int = 30,
+                    x_profile_token: Optional[str] = Header(None)):
+    """Profile metadata plus a pstats text report of the top functions."""
+    error = profile_error(x_profile_token)
+    if error:
+        return error
+    profile = profiling.profiles.get(profile_id)
+    if not profile:
+        return JSONResponse({"error": f"Profile {profile_id} not found"}, status_code=404)
+    return {**profile.to_dict(), "report": profile.top(limit, sort)}
@@ -1,3 +1,7 @@
+import numpy as np
+
+from app.telemetry.spans import timed
+
 def exon_overlap(e1, e2):
     overlap_start = max(e1.start, e2.start)
     overlap_end = min(e1.end, e2.end)
@@ -6,33 +10,166 @@ def exon_overlap(e1, e2):
 def overlaps(e1, e2):
     return exon_overlap(e1, e2) > 0
 
-def compare_transcripts(ref_tx, pred_tx):
-    results = {
-        "matched": [],
-        "missing": [],
-        "extra": [],
-        "partial": []
+def overlap_pairs(ref_starts, ref_ends, pred_starts, pred_ends):
+    """
+    Find all overlapping (ref, pred) exon pairs with a vectorized merge sweep.
+
+    Predicted exons are sorted by start; for each reference exon the
+    candidate range is found with two binary searches (start - longest
+    predicted exon .. end) and filtered on predicted end, all as NumPy
+    array operations. Returns (ref_idx, pred_idx) index arrays into the
+    inputs, ordered by ref index then pred index.
+    """
+    ref_starts = np.asarray(ref_starts, dtype=np.int64)
+    ref_ends = np.asarray(ref_ends, dtype=np.int64)
+    pred_starts = np.asarray(pred_starts, dtype=np.int64)
+    pred_ends = np.asarray(pred_ends, dtype=np.int64)
+
+    empty = np.empty(0, dtype=np.int64)
+    if len(ref_starts) == 0 or len(pred_starts) == 0:
+        return empty, empty
+
+    order = np.argsort(pred_starts, kind="stable")
+    sorted_starts = pred_starts[order]
+    sorted_ends = pred_ends[order]
+    max_len = int((sorted_ends - sorted_starts).max())
+
+    lo = np.searchsorted(sorted_starts, ref_starts - max_len, side="left")
+    hi = np.searchsorted(sorted_starts, ref_ends, side="right")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return empty, empty
+
+    ref_idx = np.repeat(np.arange(len(ref_starts)), counts)
+    block_starts = np.cumsum(counts) - counts
+    cand = np.arange(total) - np.repeat(block_starts - lo, counts)
+
+    keep = sorted_ends[cand] >= ref_starts[ref_idx]
+    ref_idx = ref_idx[keep]
+    pred_idx = order[cand[keep]]
+
+    resort = np.lexsort((pred_idx, ref_idx))
+    return ref_idx[resort], pred_idx[resort]
+
+def classify_overlaps(ref_starts, ref_ends, pred_starts, pred_ends):
+    """
+    Classify exons the way compare_transcripts does, on coordinate arrays.
+
+    Returns a dict of index arrays: "matched" and "partial" are (ref_idx,
+    pred_idx) pairs (identical vs. differing boundaries), "missing" are
+    reference exons overlapping no prediction and "extra" are predicted
+    exons overlapping no reference exon.
+    """
+    ref_starts = np.asarray(ref_starts, dtype=np.int64)
+    ref_ends = np.asarray(ref_ends, dtype=np.int64)
+    pred_starts = np.asarray(pred_starts, dtype=np.int64)
+    pred_ends = np.asarray(pred_ends, dtype=np.int64)
+
+    ref_idx, pred_idx = overlap_pairs(ref_starts, ref_ends, pred_starts, pred_ends)
+    exact = (ref_starts[ref_idx] == pred_starts[pred_idx]) & (ref_ends[ref_idx] == pred_ends[pred_idx])
+
+    ref_hit = np.zeros(len(ref_starts), dtype=bool)
+    ref_hit[ref_idx] = True
+    pred_hit = np.zeros(len(pred_starts), dtype=bool)
+    pred_hit[pred_idx] = True
+
+    return {
+        "matched": (ref_idx[exact], pred_idx[exact]),
+        "partial": (ref_idx[~exact], pred_idx[~exact]),
+        "missing": np.flatnonzero(~ref_hit),
+        "extra": np.flatnonzero(~pred_hit),
     }
 
-    for ref_exon in ref_tx.exons:
-        overlaps_pred = [
-            p for p in pred_tx.exons if overlaps(ref_exon, p)
-        ]
-        if not overlaps_pred:
-            results["missing"].append(ref_exon)
-        else:
-            for p in overlaps_pred:
-                if ref_exon.start == p.start and ref_exon.end == p.end:
-                    results["matched"].append((ref_exon, p))
-                else:
-                    results["partial"].append((ref_exon, p))
-
-    for pred_exon in pred_tx.exons:
-        if not any(overlaps(pred_exon, r) for r in ref_tx.exons):
-            results["extra"].append(pred_exon)
+def _exon_arrays(exons):
+    starts = np.fromiter((e.start for e in exons), dtype=np.int64, count=len(exons))
+    ends = np.fromiter((e.end for e in exons), dtype=np.int64, count=len(exons))
+    return starts, ends
+
+def _diff_from_indices(ref_exons, pred_exons, classified, ref_offset=0, pred_offset=0):
+    """Turn classify_overlaps index arrays back into lists of exon objects."""
+    # Matched and partial pairs keep the ref-major order of the original loop
+    pairs = [
+        (int(r), int(p), status)
+        for status in ("matched", "partial")
+        for r, p in zip(*classified[status])
+    ]
+    pairs.sort(key=lambda x: (x[0], x[1]))
 
+    results = {"matched": [], "missing": [], "extra": [], "partial": []}
+    for r, p, status in pairs:
+        results[status].append((ref_exons[r - ref_offset], pred_exons[p - pred_offset]))
+    results["missing"] = [ref_exons[int(i) - ref_offset] for i in classified["missing"]]
+    results["extra"] = [pred_exons[int(i) - pred_offset] for i in classified["extra"]]
     return results
 
+@timed()
+def compare_transcripts(ref_tx, pred_tx):
+    ref_exons = ref_tx.exons
+    pred_exons = pred_tx.exons
+    classified = classify_overlaps(*_exon_arrays(ref_exons), *_exon_arrays(pred_exons))
+    return _diff_from_indices(ref_exons, pred_exons, classified)
+
+@timed()
+def compare_transcripts_batch(pairs):
+    """
+    Compare many (ref_tx, pred_tx) pairs in one vectorized call.
+
+    Exons of all pairs are concatenated and each pair's coordinates are
+    shifted into its own disjoint window (pair index * span), so a single
+    overlap_pairs sweep cannot match exons across pairs. Returns a list
+    with one compare_transcripts-style result per pair.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return []
+
+    ref_lists = [ref_tx.exons for ref_tx, _ in pairs]
+    pred_lists = [pred_tx.exons for _, pred_tx in pairs]
+    ref_counts = np.array([len(e) for e in ref_lists], dtype=np.int64)
+    pred_counts = np.array([len(e) for e in pred_lists], dtype=np.int64)
+    ref_offsets = np.concatenate(([0], np.cumsum(ref_counts)))
+    pred_offsets = np.concatenate(([0], np.cumsum(pred_counts)))
+
+    ref_exons = [e for exons in ref_lists for e in exons]
+    pred_exons = [e for exons in pred_lists for e in exons]
+    ref_starts, ref_ends = _exon_arrays(ref_exons)
+    pred_starts, pred_ends = _exon_arrays(pred_exons)
+
+    span = max(ref_ends.max(initial=0), pred_ends.max(initial=0)) + 2
+    ref_shift = np.repeat(np.arange(len(pairs), dtype=np.int64) * span, ref_counts)
+    pred_shift = np.repeat(np.arange(len(pairs), dtype=np.int64) * span, pred_counts)
+
+    classified = classify_overlaps(
+        ref_starts + ref_shift, ref_ends + ref_shift,
+        pred_starts + pred_shift, pred_ends + pred_shift,
+    )
+
+    # Split the global index arrays back into per-pair slices
+    def split(indices, offsets):
+        bounds = np.searchsorted(indices, offsets)
+        return [indices[bounds[i]:bounds[i + 1]] for i in range(len(pairs))]
+
+    per_pair = {}
+    for status in ("matched", "partial"):
+        ref_idx, pred_idx = classified[status]
+        bounds = np.searchsorted(ref_idx, ref_offsets)
+        per_pair[status] = [
+            (ref_idx[bounds[i]:bounds[i + 1]], pred_idx[bounds[i]:bounds[i + 1]])
+            for i in range(len(pairs))
+        ]
+    per_pair["missing"] = split(classified["missing"], ref_offsets)
+    per_pair["extra"] = split(classified["extra"], pred_offsets)
+
+    return [
+        _diff_from_indices(
+            ref_lists[i], pred_lists[i],
+            {status: per_pair[status][i] for status in per_pair},
+            ref_offset=int(ref_offsets[i]), pred_offset=int(pred_offsets[i]),
+        )
+        for i in range(len(pairs))
+    ]
+
 def transcript_overlap_ratio(tx1, tx2):
     if tx1.start is None or tx2.start is None:
         return 0.0
@@ -0,0 +1,213 @@
+"""
+Static interval index for overlap queries on genomic features.
+
+Intervals are sorted by start and laid out as an implicit balanced binary
+tree over the sorted array (the cgranges layout): the node at index i on
+level k has children i - 2**(k-1) and i + 2**(k-1), and each node stores the
+maximum end of its subtree. Overlap queries run in O(log n + k) and the
+index is built in O(n log n) without any per-node objects.
+
+Coordinates are 1-based and closed, as in GFF3.
+
+overlap_join_arrays pairs up two whole collections of NumPy coordinate
+arrays with sorted searches, which is cheaper than issuing one tree query
+per interval and does no per-pair Python work.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+# Subtrees at or below this level are scanned linearly
+_SCAN_LEVEL = 3
+
+
+class IntervalIndex:
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals: iterable of (start, end, item) tuples
+        """
+        records = sorted(intervals, key=lambda r: (r[0], r[1]))
+        self.starts = [r[0] for r in records]
+        self.ends = [r[1] for r in records]
+        self.items = [r[2] for r in records]
+        self.max_ends = list(self.ends)
+        self.max_level = self._build()
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def max_end(self):
+        """Largest end of any interval, or None if the index is empty."""
+        return max(self.ends) if self.ends else None
+
+    def _build(self):
+        n = len(self.starts)
+        if n == 0:
+            return -1
+
+        max_ends = self.max_ends
+        last_i = 0
+        last = max_ends[0]
+        for i in range(0, n, 2):
+            last_i = i
+            last = max_ends[i]
+
+        k = 1
+        while (1 << k) <= n:
+            x = 1 << (k - 1)
+            step = x << 2
+            for i in range((x << 1) - 1, n, step):
+                left = max_ends[i - x]
+                right = max_ends[i + x] if i + x < n else last
+                max_ends[i] = max(max_ends[i], left, right)
+            # Track the max end of the rightmost (possibly incomplete) subtree
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            k += 1
+
+        return k - 1
+
+    def overlapping_indices(self, start: int, end: int) -> list:
+        """Return positions (in start order) of intervals overlapping [start, end]."""
+        n = len(self.starts)
+        if n == 0:
+            return []
+
+        starts, ends, max_ends = self.starts, self.ends, self.max_ends
+        hits = []
+        stack = [(self.max_level, (1 << self.max_level) - 1, False)]
+        while stack:
+            k, x, left_done = stack.pop()
+            if k <= _SCAN_LEVEL:
+                i0 = x >> k << k
+                i1 = min(i0 + (1 << (k + 1)) - 1, n)
+                for i in range(i0, i1):
+                    if starts[i] > end:
+                        break
+                    if ends[i] >= start:
+                        hits.append(i)
+            elif not left_done:
+                stack.append((k, x, True))
+                y = x - (1 << (k - 1))
+                if y >= n or max_ends[y] >= start:
+                    stack.append((k - 1, y, False))
+            elif x < n and starts[x] <= end:
+                if ends[x] >= start:
+                    hits.append(x)
+                stack.append((k - 1, x + (1 << (k - 1)), False))
+
+        hits.sort()
+        return hits
+
+    def overlapping(self, start: int, end: int) -> list:
+        """Return items overlapping [start, end], ordered by start."""
+        items = self.items
+        return [items[i] for i in self.overlapping_indices(start, end)]
+
+
+def _starts_in(query_starts, query_ends, sorted_starts, lower_side):
+    """
+    (query index, position in sorted_starts) for every sorted start that lies
+    in [query start, query end] (lower_side="left") or (query start, query
+    end] (lower_side="right").
+    """
+    lo = np.searchsorted(sorted_starts, query_starts, side=lower_side)
+    hi = np.searchsorted(sorted_starts, query_ends, side="right")
+    counts = np.maximum(hi - lo, 0)
+    query_idx = np.repeat(np.arange(len(query_starts)), counts)
+    positions = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts - lo, counts)
+    return query_idx, positions
+
+
+def overlap_join_arrays(left_starts, left_ends, right_starts, right_ends):
+    """
+    Index arrays (left_idx, right_idx) of every overlapping pair between two
+    sets of closed intervals, in O((n + m) log(n + m) + k) NumPy operations.
+
+    Each overlapping pair is found exactly once: either the right interval
+    starts inside the left one, or the left one starts strictly after the
+    right start and inside the right interval.
+    """
+    left_starts = np.asarray(left_starts, dtype=np.int64)
+    left_ends = np.asarray(left_ends, dtype=np.int64)
+    right_starts = np.asarray(right_starts, dtype=np.int64)
+    right_ends = np.asarray(right_ends, dtype=np.int64)
+
+    right_order = np.argsort(right_starts, kind="stable")
+    left_order = np.argsort(left_starts, kind="stable")
+
+    left_a, right_pos = _starts_in(left_starts, left_ends, right_starts[right_order], "left")
+    right_b, left_pos = _starts_in(right_starts, right_ends, left_starts[left_order], "right")
+    return (np.concatenate([left_a, left_order[left_pos]]),
+            np.concatenate([right_order[right_pos], right_b]))
+
+
+def group_intervals(features, key=lambda f: (f.chrom, f.strand)):
+    """
+    Group features into (start, end, feature) lists by key, default
+    (chrom, strand). Features without coordinates are skipped.
+    """
+    grouped = defaultdict(list)
+    for feature in features:
+        if feature.start is None or feature.end is None:
+            continue
+        grouped[key(feature)].append((feature.start, feature.end, feature))
+    return grouped
+
+
+def build_locus_index(features, key=lambda f: (f.chrom, f.strand)):
+    """Build one IntervalIndex per group of group_intervals(features, key)."""
+    return {k: IntervalIndex(intervals) for k, intervals in group_intervals(features, key).items()}
+
+
+class RegionIndex:
+    """
+    Per-chromosome interval indexes over the genes, transcripts and exons of
+    one annotation, for chrom:start-end window queries. The gene index is
+    built up front; transcript and exon indexes are built on first use.
+    """
+
+    LEVELS = ("gene", "transcript", "exon")
+
+    def __init__(self, genes):
+        self._genes = genes
+        self._indexes = {"gene": build_locus_index(genes.values(), key=lambda g: g.chrom)}
+
+    @property
+    def chroms(self) -> list:
+        return sorted(self._indexes["gene"])
+
+    def _index(self, level: str) -> dict:
+        index = self._indexes.get(level)
+        if index is None:
+            grouped = defaultdict(list)
+            for gene in self._genes.values():
+                for tx in gene.transcripts:
+                    if level == "transcript":
+                        if tx.start is not None:
+                            grouped[tx.chrom].append((tx.start, tx.end, (gene, tx)))
+                    else:
+                        for exon in tx.exons:
+                            grouped[tx.chrom].append((exon.start, exon.end, (gene, tx, exon)))
+            index = self._indexes[level] = {
+                chrom: IntervalIndex(intervals) for chrom, intervals in grouped.items()
+            }
+        return index
+
+    def chrom_end(self, chrom: str):
+        """Largest gene end on chrom, or None if it has no genes."""
+        index = self._indexes["gene"].get(chrom)
+        return index.max_end if index is not None else None
+
+    def query(self, chrom: str, start: int, end: int, level: str = "gene") -> list:
+        """
+        Features overlapping [start, end] on chrom, ordered by start:
+        genes, (gene, transcript) pairs or (gene, transcript, exon) triples.
+        """
+        if level not in self.LEVELS:
+            raise ValueError(f"Unknown region level {level!r}; expected one of {self.LEVELS}")
+        index = self._index(level).get(chrom)
+        return index.overlapping(start, end) if index is not None else []
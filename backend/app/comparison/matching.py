@@ -0,0 +1,86 @@
+"""
+Gene matching between annotations and per-gene transcript comparison.
+"""
+import numpy as np
+
+from app.comparison.align import best_matching_transcript, compare_transcripts, compare_transcripts_batch
+from app.comparison.index import overlap_join_arrays
+from app.schemas.serializers import serialize_diff
+from app.telemetry.spans import timed
+
+# Added per (chrom, strand) group so all groups share one coordinate axis
+_GROUP_STRIDE = 1 << 40
+
+
+def transcript_pairs(ref_gene, pred_gene):
+    """Pair every predicted transcript with its best matching reference transcript."""
+    pairs = []
+    for pred_tx in pred_gene.transcripts:
+        ref_tx = best_matching_transcript(pred_tx, ref_gene.transcripts)
+        if ref_tx:
+            pairs.append((ref_tx, pred_tx))
+    return pairs
+
+
+def compare_gene_pair(ref_gene, pred_gene):
+    """Diff every predicted transcript against its best matching reference transcript."""
+    return [
+        serialize_diff(ref_tx, pred_tx, compare_transcripts(ref_tx, pred_tx))
+        for ref_tx, pred_tx in transcript_pairs(ref_gene, pred_gene)
+    ]
+
+
+def compare_gene_pairs(gene_pairs):
+    """compare_gene_pair for many (ref_gene, pred_gene) pairs in one batched diff."""
+    per_gene = [transcript_pairs(ref_gene, pred_gene) for ref_gene, pred_gene in gene_pairs]
+    diffs = iter(compare_transcripts_batch([pair for pairs in per_gene for pair in pairs]))
+    return [
+        [serialize_diff(ref_tx, pred_tx, next(diffs)) for ref_tx, pred_tx in pairs]
+        for pairs in per_gene
+    ]
+
+
+def _gene_arrays(genes, groups: dict):
+    """(group code, start, end) arrays and the IDs of genes with coordinates."""
+    ids, group, starts, ends = [], [], [], []
+    for gene in genes.values():
+        if gene.start is None or gene.end is None:
+            continue
+        ids.append(gene.id)
+        group.append(groups.setdefault((gene.chrom, gene.strand), len(groups)))
+        starts.append(gene.start)
+        ends.append(gene.end)
+    offset = np.asarray(group, dtype=np.int64) * _GROUP_STRIDE
+    return (np.array(ids, dtype=object), np.asarray(starts, dtype=np.int64) + offset,
+            np.asarray(ends, dtype=np.int64) + offset)
+
+
+@timed()
+def find_matching_genes(ref_genes, pred_genes, overlap_threshold=0.5):
+    """
+    Pair reference and predicted genes on the same (chrom, strand) whose
+    overlap covers at least overlap_threshold of the shorter gene.
+    Returns (ref_id, pred_id, overlap_ratio) tuples, best overlap first;
+    ties keep the order of a nested loop over the inputs: (chrom, strand)
+    groups in order of first appearance in ref_genes, then ref_genes order,
+    then pred_genes order.
+
+    All loci are joined at once with overlap_join_arrays (each (chrom,
+    strand) is shifted onto its own stretch of one coordinate axis), and
+    the overlap ratios are computed and filtered as arrays, so the only
+    per-match Python work is building the result tuples.
+    """
+    groups = {}
+    ref_ids, ref_starts, ref_ends = _gene_arrays(ref_genes, groups)
+    pred_ids, pred_starts, pred_ends = _gene_arrays(pred_genes, groups)
+    r, p = overlap_join_arrays(ref_starts, ref_ends, pred_starts, pred_ends)
+
+    overlap = np.minimum(ref_ends[r], pred_ends[p]) - np.maximum(ref_starts[r], pred_starts[p]) + 1
+    shorter = np.minimum(ref_ends[r] - ref_starts[r], pred_ends[p] - pred_starts[p]) + 1
+    ratio = overlap / shorter
+    keep = np.flatnonzero(ratio >= overlap_threshold)
+    r, p, ratio = r[keep], p[keep], ratio[keep]
+    # Group codes were assigned in order of first appearance in ref_genes
+    order = np.lexsort((p, r, ref_starts[r] // _GROUP_STRIDE, -ratio))
+    r, p, ratio = r[order], p[order], ratio[order]
+    return list(zip(ref_ids[r].tolist(), pred_ids[p].tolist(), ratio.tolist()))
@@ -0,0 +1,218 @@
+"""
+Genome-wide accuracy of a predicted annotation against a reference, in the
+style of gffcompare.
+
+Every level reports sensitivity (matched / reference) and precision
+(matched / predicted):
+
+    base        exon bases covered in both annotations, per (chrom, strand)
+    exon        distinct exons with identical chrom, strand, start and end
+    transcript  identical intron chains (single-exon transcripts: identical
+                exon coordinates)
+    gene        genes with at least one matching transcript
+
+Exons are the transcript's "exon" features, or its CDS features when it has
+no exon features. Coordinates of both annotations are flattened into NumPy
+arrays once, so the base and exon levels run as a handful of vectorized
+sorts rather than per-gene comparisons.
+"""
+import numpy as np
+
+from app.parsing.columnar import ColumnarAnnotation
+
+LEVELS = ("base", "exon", "transcript", "gene")
+
+# Added per (chrom, strand) group so all groups share one coordinate axis
+_GROUP_STRIDE = 1 << 40
+
+
+class _Flat:
+    """Exon coordinates of one annotation as parallel arrays."""
+
+    def __init__(self, tx_group, tx_gene, exon_tx, exon_start, exon_end, n_genes):
+        self.tx_group = np.asarray(tx_group, dtype=np.int64)  # (chrom, strand) code per transcript
+        self.tx_gene = np.asarray(tx_gene, dtype=np.int64)    # gene index per transcript
+        self.exon_tx = np.asarray(exon_tx, dtype=np.int64)    # transcript index per exon
+        self.exon_start = np.asarray(exon_start, dtype=np.int64)
+        self.exon_end = np.asarray(exon_end, dtype=np.int64)
+        self.n_genes = n_genes
+
+    @property
+    def exon_group(self):
+        return self.tx_group[self.exon_tx]
+
+
+def _select_exons(exon_tx, is_exon, is_cds, n_tx):
+    """Mask of exon features, plus CDS features of transcripts without exon features."""
+    has_exon = np.bincount(exon_tx[is_exon], minlength=n_tx) > 0
+    return is_exon | (is_cds & ~has_exon[exon_tx])
+
+
+def _flatten(genes, groups: dict) -> _Flat:
+    """Flatten a gene mapping (dict of Gene or ColumnarAnnotation) into a _Flat."""
+    if isinstance(genes, ColumnarAnnotation):
+        return _flatten_columnar(genes, groups)
+
+    tx_group, tx_gene, exon_tx, exon_start, exon_end, is_exon, is_cds = [], [], [], [], [], [], []
+    for g, gene in enumerate(genes.values()):
+        for tx in gene.transcripts:
+            t = len(tx_group)
+            tx_group.append(groups.setdefault((tx.chrom, tx.strand), len(groups)))
+            tx_gene.append(g)
+            for exon in tx.exons:
+                exon_tx.append(t)
+                exon_start.append(exon.start)
+                exon_end.append(exon.end)
+                is_exon.append(exon.feature_type == "exon")
+                is_cds.append(exon.feature_type == "CDS")
+
+    exon_tx = np.asarray(exon_tx, dtype=np.int64)
+    keep = _select_exons(exon_tx, np.asarray(is_exon, dtype=bool), np.asarray(is_cds, dtype=bool),
+                         len(tx_group))
+    return _Flat(tx_group, tx_gene, exon_tx[keep], np.asarray(exon_start, dtype=np.int64)[keep],
+                 np.asarray(exon_end, dtype=np.int64)[keep], len(genes))
+
+
+def _flatten_columnar(ann: ColumnarAnnotation, groups: dict) -> _Flat:
+    n_tx = len(ann.tx_ids)
+    chrom_strand = [groups.setdefault(pair, len(groups))
+                    for pair in ((ann.chroms[c], ann.strands[s])
+                                 for c in range(len(ann.chroms)) for s in range(len(ann.strands)))]
+    tx_group = np.asarray(chrom_strand, dtype=np.int64).reshape(len(ann.chroms), -1)[
+        ann.tx_chrom, ann.tx_strand] if n_tx else np.zeros(0, dtype=np.int64)
+    tx_gene = np.repeat(np.arange(len(ann.gene_ids)), np.diff(ann.tx_offsets))
+    exon_tx = np.repeat(np.arange(n_tx), np.diff(ann.exon_offsets))
+
+    def type_mask(name):
+        if name not in ann.feature_types:
+            return np.zeros(len(exon_tx), dtype=bool)
+        return ann.exon_type == ann.feature_types.index(name)
+
+    keep = _select_exons(exon_tx, type_mask("exon"), type_mask("CDS"), n_tx)
+    return _Flat(tx_group, tx_gene, exon_tx[keep], np.asarray(ann.exon_start)[keep],
+                 np.asarray(ann.exon_end)[keep], len(ann.gene_ids))
+
+
+def _score(tp_ref, ref_total, tp_pred, pred_total) -> dict:
+    return {
+        "sensitivity": round(float(tp_ref) / ref_total, 4) if ref_total else None,
+        "precision": round(float(tp_pred) / pred_total, 4) if pred_total else None,
+        "matched_ref": int(tp_ref),
+        "matched_pred": int(tp_pred),
+        "ref_total": int(ref_total),
+        "pred_total": int(pred_total),
+    }
+
+
+def base_level(ref: _Flat, pred: _Flat) -> dict:
+    """Bases covered by reference exons, predicted exons, and both."""
+    # Coverage change events (+1 at start, -1 after end) on a shared axis
+    ref_offset = ref.exon_group * _GROUP_STRIDE
+    pred_offset = pred.exon_group * _GROUP_STRIDE
+    positions = np.concatenate([ref.exon_start + ref_offset, ref.exon_end + 1 + ref_offset,
+                                pred.exon_start + pred_offset, pred.exon_end + 1 + pred_offset])
+    n_ref, n_pred = len(ref.exon_start), len(pred.exon_start)
+    ref_delta = np.repeat(np.array([1, -1, 0], dtype=np.int64), [n_ref, n_ref, 2 * n_pred])
+    pred_delta = np.repeat(np.array([0, 1, -1], dtype=np.int64), [2 * n_ref, n_pred, n_pred])
+
+    order = np.argsort(positions, kind="stable")
+    positions = positions[order]
+    ref_cover = np.cumsum(ref_delta[order])[:-1] > 0
+    pred_cover = np.cumsum(pred_delta[order])[:-1] > 0
+    lengths = np.diff(positions)
+
+    both = int(lengths[ref_cover & pred_cover].sum())
+    return _score(both, int(lengths[ref_cover].sum()), both, int(lengths[pred_cover].sum()))
+
+
+def _sorted_rows(columns):
+    """
+    Sort rows (given as equal-length columns) lexicographically; also
+    return a mask of rows equal to the row before them.
+    """
+    order = np.lexsort(columns[::-1])
+    rows = [column[order] for column in columns]
+    repeat = np.zeros(len(order), dtype=bool)
+    if len(order):
+        repeat[1:] = np.logical_and.reduce([row[1:] == row[:-1] for row in rows])
+    return rows, repeat
+
+
+def _unique_rows(*columns):
+    rows, repeat = _sorted_rows(columns)
+    return [row[~repeat] for row in rows]
+
+
+def exon_level(ref: _Flat, pred: _Flat) -> dict:
+    """Distinct exons present with identical coordinates in both annotations."""
+    ref_exons = _unique_rows(ref.exon_group, ref.exon_start, ref.exon_end)
+    pred_exons = _unique_rows(pred.exon_group, pred.exon_start, pred.exon_end)
+    # Each side is distinct, so a repeated row in the union is a shared exon
+    _, repeat = _sorted_rows([np.concatenate(pair) for pair in zip(ref_exons, pred_exons)])
+    matched = int(repeat.sum())
+    return _score(matched, len(ref_exons[0]), matched, len(pred_exons[0]))
+
+
+def _transcript_keys(flat: _Flat) -> list:
+    """
+    Hashable structure key per transcript: (group, intron chain) for
+    multi-exon transcripts, (group, start, end) for single-exon ones,
+    None for transcripts without exons.
+    """
+    n_tx = len(flat.tx_group)
+    order = np.lexsort((flat.exon_start, flat.exon_tx))
+    exon_tx, starts, ends = flat.exon_tx[order], flat.exon_start[order], flat.exon_end[order]
+    exon_bounds = np.searchsorted(exon_tx, np.arange(n_tx + 1))
+
+    # Introns between consecutive exons of the same transcript, as one buffer
+    same = exon_tx[1:] == exon_tx[:-1]
+    introns = np.stack([ends[:-1][same] + 1, starts[1:][same] - 1], axis=1)
+    chains = introns.tobytes()
+    intron_bounds = (np.searchsorted(exon_tx[1:][same], np.arange(n_tx + 1)) * introns.itemsize * 2).tolist()
+
+    keys = []
+    n_exons = np.diff(exon_bounds).tolist()
+    first = exon_bounds[:-1].clip(max=max(len(starts) - 1, 0))
+    first_start = starts[first].tolist() if len(starts) else [0] * n_tx
+    first_end = ends[first].tolist() if len(ends) else [0] * n_tx
+    for t, (group, count) in enumerate(zip(flat.tx_group.tolist(), n_exons)):
+        if count == 0:
+            keys.append(None)
+        elif count == 1:
+            keys.append((group, first_start[t], first_end[t]))
+        else:
+            keys.append((group, chains[intron_bounds[t]:intron_bounds[t + 1]]))
+    return keys
+
+
+def transcript_and_gene_level(ref: _Flat, pred: _Flat) -> tuple:
+    """Transcripts with identical structure, and genes with at least one of them."""
+    ref_keys = _transcript_keys(ref)
+    pred_keys = _transcript_keys(pred)
+    shared = (set(ref_keys) & set(pred_keys)) - {None}
+
+    ref_matched = np.fromiter((key in shared for key in ref_keys), dtype=bool, count=len(ref_keys))
+    pred_matched = np.fromiter((key in shared for key in pred_keys), dtype=bool, count=len(pred_keys))
+
+    transcripts = _score(ref_matched.sum(), sum(key is not None for key in ref_keys),
+                         pred_matched.sum(), sum(key is not None for key in pred_keys))
+    genes = _score(len(np.unique(ref.tx_gene[ref_matched])), ref.n_genes,
+                   len(np.unique(pred.tx_gene[pred_matched])), pred.n_genes)
+    return transcripts, genes
+
+
+def accuracy_metrics(ref_genes, pred_genes) -> dict:
+    """
+    Base-, exon-, transcript- and gene-level sensitivity and precision of
+    pred_genes against ref_genes (dicts of Gene or ColumnarAnnotation).
+    """
+    groups = {}
+    ref = _flatten(ref_genes, groups)
+    pred = _flatten(pred_genes, groups)
+    transcripts, genes = transcript_and_gene_level(ref, pred)
+    return {
+        "base": base_level(ref, pred),
+        "exon": exon_level(ref, pred),
+        "transcript": transcripts,
+        "gene": genes,
+    }
@@ -0,0 +1 @@
+"""Background jobs for long-running comparisons."""
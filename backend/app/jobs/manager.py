@@ -0,0 +1,183 @@
+"""
+Asynchronous job queue for whole-genome comparisons.
+
+A submitted job returns immediately with a job ID. Up to GFF3_JOB_CONCURRENCY
+jobs run at a time on a thread pool (the rest wait as "queued"); each farms
+CPU-bound pieces (gene matching, then chunks of matched gene pairs) out to a
+bounded process pool, updating progress as chunks complete, so request
+handlers and the event loop stay responsive. Worker processes are started
+with "spawn": forking the multithreaded server process could copy locks
+held by other threads into the child.
+"""
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from app.comparison.matching import find_matching_genes, compare_gene_pairs
+from app.parsing.models import Gene, Transcript, Exon
+
+DEFAULT_WORKERS = int(os.environ.get("GFF3_JOB_WORKERS", os.cpu_count() or 1))
+DEFAULT_CONCURRENCY = int(os.environ.get("GFF3_JOB_CONCURRENCY", 2))
+DEFAULT_CHUNK_SIZE = 500
+# Finished jobs kept for /jobs lookups, oldest dropped first
+MAX_RETAINED_JOBS = 100
+
+# Coordinates-only stand-in for a gene, cheap to send to a worker process
+Locus = namedtuple("Locus", ["id", "chrom", "strand", "start", "end"])
+
+
+def _loci(genes):
+    return {gene_id: Locus(gene_id, g.chrom, g.strand, g.start, g.end) for gene_id, g in genes.items()}
+
+
+def _detach(gene):
+    """Copy a gene (or columnar GeneView) into plain, picklable model objects."""
+    if isinstance(gene, Gene):
+        return gene
+    copy = Gene(gene.id, gene.chrom, gene.strand, gene.start, gene.end)
+    for tx in gene.transcripts:
+        transcript = Transcript(tx.id, tx.chrom, tx.strand)
+        for exon in tx.exons:
+            transcript.add_exon(Exon(exon.start, exon.end, exon.feature_type))
+        copy.add_transcript(transcript)
+    return copy
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"  # queued, running, done, failed
+        self.stage = None
+        self.processed = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": round(self.processed / self.total, 3) if self.total else 0.0,
+            "error": self.error,
+            "elapsed": round((self.finished or time.time()) - self.created, 3),
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_concurrent: int = DEFAULT_CONCURRENCY):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_concurrent = max_concurrent
+        self._pool = None
+        self._runner = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    @property
+    def runner(self) -> ThreadPoolExecutor:
+        """Threads coordinating running jobs, at most max_concurrent."""
+        with self._lock:
+            if self._runner is None:
+                self._runner = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="gff3-job")
+            return self._runner
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit_comparison(self, ref_genes, pred_genes, overlap_threshold: float = 0.5) -> Job:
+        """Start a whole-genome match + compare job and return it immediately."""
+        job = Job("compare-all")
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self.runner.submit(self._run_comparison, job, ref_genes, pred_genes, overlap_threshold)
+        return job
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond MAX_RETAINED_JOBS; active jobs are kept."""
+        excess = len(self._jobs) - MAX_RETAINED_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ("done", "failed")]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def _run_comparison(self, job, ref_genes, pred_genes, overlap_threshold):
+        try:
+            job.status = "running"
+            job.stage = "matching"
+            matches = self.pool.submit(
+                find_matching_genes, _loci(ref_genes), _loci(pred_genes), overlap_threshold
+            ).result()
+
+            job.stage = "comparing"
+            job.total = len(matches)
+            chunks = [matches[i:i + self.chunk_size] for i in range(0, len(matches), self.chunk_size)]
+            futures = {
+                self.pool.submit(
+                    compare_gene_pairs,
+                    [(_detach(ref_genes[r]), _detach(pred_genes[p])) for r, p, _ in chunk],
+                ): i
+                for i, chunk in enumerate(chunks)
+            }
+
+            comparisons = [None] * len(chunks)
+            for future in as_completed(futures):
+                i = futures[future]
+                comparisons[i] = future.result()
+                job.processed += len(chunks[i])
+
+            job.result = {
+                "results": [
+                    {
+                        "gene_id": f"{ref_id} ↔ {pred_id}",
+                        "ref_gene_id": ref_id,
+                        "pred_gene_id": pred_id,
+                        "overlap_ratio": round(ratio, 3),
+                        "comparisons": gene_comparisons,
+                    }
+                    for chunk, chunk_comparisons in zip(chunks, comparisons)
+                    for (ref_id, pred_id, ratio), gene_comparisons in zip(chunk, chunk_comparisons)
+                ],
+                "total_matches": len(matches),
+            }
+            job.status = "done"
+        except Exception as exc:
+            job.status = "failed"
+            job.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            job.stage = None
+            job.finished = time.time()
+
+    def shutdown(self):
+        with self._lock:
+            if self._runner is not None:
+                self._runner.shutdown(wait=False, cancel_futures=True)
+                self._runner = None
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+jobs = JobManager()
@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 from pathlib import Path
 from app.api.routes import router
+from app.jobs.manager import jobs
+from app.storage.datasets import DatasetError
+from app.telemetry import profiling, spans
+from app.visualization.render_pool import render_pool
 
-app = FastAPI(title="GFF3 Visualizer", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    jobs.shutdown()
+    render_pool.shutdown()
+
+
+app = FastAPI(title="GFF3 Visualizer", version="1.0.0", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -15,6 +29,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing headers and request histograms (GFF3_METRICS=1)
+if spans.ENABLED:
+    app.add_middleware(spans.TimingMiddleware)
+
+# Per-request cProfile/stack sampling on X-Profile: <token> (GFF3_PROFILE_TOKEN)
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+@app.exception_handler(DatasetError)
+async def dataset_error_handler(request: Request, exc: DatasetError):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status_code)
+
 # Include API routes (must be before static files mount)
 app.include_router(router, prefix="/api", tags=["api"])
 
@@ -22,6 +48,12 @@ app.include_router(router, prefix="/api", tags=["api"])
 def api_root():
     return {"message": "GFF3 Visualizer API", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Span and request histograms in Prometheus text format (empty unless GFF3_METRICS=1)."""
+    return PlainTextResponse(spans.registry.render() if spans.ENABLED else "",
+                             media_type="text/plain; version=0.0.4")
+
 # Serve static files (frontend) - must be last
 frontend_path = Path(__file__).parent.parent.parent / "frontend"
 if frontend_path.exists():
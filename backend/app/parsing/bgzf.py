@@ -0,0 +1,361 @@
+"""
+Compressed GFF3 input: gzip detection, BGZF block access and a
+tabix-style coordinate index.
+
+Plain gzip files can only be read front to back. BGZF (bgzip) files are a
+series of independently compressed gzip members of at most 64 KiB each, so
+a position in the uncompressed text is addressable as a virtual offset:
+
+    virtual_offset = (compressed block offset << 16) | offset within block
+
+build_index records, for every 16 kb window of each chromosome, the
+smallest virtual offset of a line overlapping that window (the tabix linear
+index). It is saved next to the annotation as <file>.gxi, so a region query
+seeks straight to the first block that can hold overlapping lines and stops
+at the first line past the region. As with tabix, the file must be sorted
+by seqid and start (sort -k1,1 -k4,4n, comments first).
+"""
+import itertools
+import json
+import os
+import stat
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+GZIP_MAGIC = b"\x1f\x8b"
+INDEX_SUFFIX = ".gxi"
+INDEX_VERSION = 1
+
+# 16 kb windows, as in the tabix linear index
+LINEAR_SHIFT = 14
+
+_BLOCK_HEADER = struct.Struct("<4BI2BH")  # ID1 ID2 CM FLG MTIME XFL OS XLEN
+_MAX_BLOCK_DATA = 0xff00
+_EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+class BgzfError(ValueError):
+    """Raised for malformed BGZF input or files that cannot be indexed."""
+
+
+def has_gzip_magic(head: bytes) -> bool:
+    return head[:2] == GZIP_MAGIC
+
+
+def is_gzip(filepath: str) -> bool:
+    with open(filepath, "rb") as f:
+        return has_gzip_magic(f.read(2))
+
+
+def is_bgzf(filepath: str) -> bool:
+    """True if the file starts with a gzip member carrying the BGZF BC subfield."""
+    with open(filepath, "rb") as f:
+        header = f.read(_BLOCK_HEADER.size)
+        if len(header) < _BLOCK_HEADER.size:
+            return False
+        id1, id2, _, flags, _, _, _, xlen = _BLOCK_HEADER.unpack(header)
+        if bytes((id1, id2)) != GZIP_MAGIC or not flags & 4:
+            return False
+        return _bsize(f.read(xlen)) is not None
+
+
+def iter_decompressed(chunks):
+    """
+    Decompress an iterable of gzip byte chunks, following multi-member
+    files (which includes every BGZF file) to the end.
+    """
+    decompressor = zlib.decompressobj(31)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            if not decompressor.eof:
+                break
+            chunk = decompressor.unused_data
+            decompressor = zlib.decompressobj(31)
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def _bsize(extra: bytes):
+    """Total block size from the BC subfield of a gzip extra field."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        si1, si2, length = extra[pos], extra[pos + 1], struct.unpack_from("<H", extra, pos + 2)[0]
+        if si1 == 66 and si2 == 67 and length == 2:
+            return struct.unpack_from("<H", extra, pos + 4)[0] + 1
+        pos += 4 + length
+    return None
+
+
+def iter_blocks(f, coffset: int = 0):
+    """Yield (compressed offset, uncompressed data) for each BGZF block from coffset."""
+    f.seek(coffset)
+    while True:
+        header = f.read(_BLOCK_HEADER.size)
+        if not header:
+            return
+        if len(header) < _BLOCK_HEADER.size:
+            raise BgzfError(f"Truncated BGZF block at offset {coffset}")
+        id1, id2, _, flags, _, _, _, xlen = _BLOCK_HEADER.unpack(header)
+        block_size = _bsize(f.read(xlen)) if flags & 4 else None
+        if bytes((id1, id2)) != GZIP_MAGIC or block_size is None:
+            raise BgzfError(f"Not a BGZF block at offset {coffset}; compress with bgzip")
+        body = f.read(block_size - _BLOCK_HEADER.size - xlen)
+        data = zlib.decompress(body[:-8], -15)
+        if data:
+            yield coffset, data
+        coffset += block_size
+
+
+def iter_lines_with_offsets(f, voffset: int = 0):
+    """
+    Yield (virtual offset, line bytes without newline) for each line of a
+    BGZF file object, starting at the given virtual offset.
+    """
+    coffset, uoffset = voffset >> 16, voffset & 0xffff
+    pending, pending_voffset = b"", None
+    for block_coffset, data in iter_blocks(f, coffset):
+        pos, uoffset = uoffset, 0
+        while True:
+            if pending_voffset is None:
+                pending_voffset = (block_coffset << 16) | pos
+            newline = data.find(b"\n", pos)
+            if newline < 0:
+                pending += data[pos:]
+                break
+            yield pending_voffset, pending + data[pos:newline]
+            pending, pending_voffset = b"", None
+            pos = newline + 1
+            if pos == len(data):
+                break
+    if pending:
+        yield pending_voffset, pending
+
+
+def write_bgzf(lines, dst: str, level: int = 6):
+    """Write an iterable of bytes lines (with newlines) as a BGZF file."""
+    def flush(buf, out):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        body = compressor.compress(buf) + compressor.flush()
+        out.write(_BLOCK_HEADER.pack(0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6))
+        out.write(struct.pack("<2BHH", 66, 67, 2, len(body) + 25))
+        out.write(body)
+        out.write(struct.pack("<II", zlib.crc32(buf), len(buf)))
+
+    with open(dst, "wb") as out:
+        buf = bytearray()
+        for line in lines:
+            buf += line
+            while len(buf) >= _MAX_BLOCK_DATA:
+                flush(bytes(buf[:_MAX_BLOCK_DATA]), out)
+                del buf[:_MAX_BLOCK_DATA]
+        if buf:
+            flush(bytes(buf), out)
+        out.write(_EOF_BLOCK)
+
+
+def bgzip_file(src: str, dst: str = None) -> str:
+    """Compress a plain GFF3 file to BGZF (dst defaults to src + '.gz')."""
+    dst = dst or src + ".gz"
+    with open(src, "rb") as f:
+        write_bgzf(f, dst)
+    return dst
+
+
+class CoordinateIndex:
+    """Per-chromosome linear index of virtual offsets for a sorted BGZF file."""
+
+    def __init__(self, linear: dict, source_size: int, source_mtime: float):
+        self.linear = linear  # chrom -> int64 array of virtual offsets per window
+        self.source_size = source_size
+        self.source_mtime = source_mtime
+
+    @property
+    def chroms(self) -> list:
+        return list(self.linear)
+
+    def offset(self, chrom: str, start: int):
+        """Virtual offset to start reading from for lines overlapping >= start, or None."""
+        windows = self.linear.get(chrom)
+        if windows is None:
+            return None
+        window = min(max(0, (start - 1) >> LINEAR_SHIFT), len(windows) - 1)
+        return int(windows[window])
+
+    def is_current(self, filepath: str) -> bool:
+        stat = os.stat(filepath)
+        return stat.st_size == self.source_size and stat.st_mtime == self.source_mtime
+
+    def save(self, path: str, mode: int = 0o644):
+        """
+        Write atomically as an .npz archive (one array per chromosome) with
+        the given permission bits (mkstemp alone would leave it 0600).
+        """
+        meta = {
+            "version": INDEX_VERSION,
+            "chroms": self.chroms,
+            "source_size": self.source_size,
+            "source_mtime": self.source_mtime,
+        }
+        arrays = {f"c{i}": windows for i, windows in enumerate(self.linear.values())}
+        fd, staging = tempfile.mkstemp(prefix=".gxi.", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8), **arrays)
+            os.chmod(staging, mode)
+            os.replace(staging, path)
+        except OSError:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a saved index, or return None if it is missing or unreadable."""
+        try:
+            with np.load(path) as data:
+                meta = json.loads(data["meta"].tobytes())
+                if meta.get("version") != INDEX_VERSION:
+                    return None
+                linear = {chrom: data[f"c{i}"] for i, chrom in enumerate(meta["chroms"])}
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(linear, meta["source_size"], meta["source_mtime"])
+
+
+def _feature_span(line: bytes):
+    """(seqid, start, end) of a feature line, or None for comments/blank lines."""
+    if not line or line.startswith(b"#"):
+        return None
+    fields = line.split(b"\t", 5)
+    if len(fields) < 5:
+        return None
+    return fields[0].decode(), int(fields[3]), int(fields[4])
+
+
+def build_index(filepath: str) -> CoordinateIndex:
+    """Scan a sorted BGZF file once and build its CoordinateIndex."""
+    linear = {}
+    chrom, windows, last_start = None, None, 0
+    with open(filepath, "rb") as f:
+        for voffset, line in iter_lines_with_offsets(f):
+            span = _feature_span(line)
+            if span is None:
+                continue
+            seqid, start, end = span
+            if seqid != chrom:
+                if seqid in linear:
+                    raise BgzfError(f"{filepath} is not sorted: {seqid} appears in two separate runs")
+                chrom, windows, last_start = seqid, [], 0
+                linear[chrom] = windows
+            if start < last_start:
+                raise BgzfError(f"{filepath} is not sorted by start on {seqid} (line at {start} after {last_start})")
+            last_start = start
+
+            first, last = (start - 1) >> LINEAR_SHIFT, (max(start, end) - 1) >> LINEAR_SHIFT
+            if len(windows) <= last:
+                windows.extend([None] * (last + 1 - len(windows)))
+            for w in range(first, last + 1):
+                if windows[w] is None:
+                    windows[w] = voffset
+
+    # Windows without lines of their own start reading where the previous one does
+    for chrom, windows in linear.items():
+        previous = next(v for v in windows if v is not None)
+        for w, value in enumerate(windows):
+            if value is None:
+                windows[w] = previous
+            else:
+                previous = value
+        linear[chrom] = np.asarray(windows, dtype=np.int64)
+
+    stat = os.stat(filepath)
+    return CoordinateIndex(linear, stat.st_size, stat.st_mtime)
+
+
+def load_or_build_index(filepath: str, save: bool = True) -> CoordinateIndex:
+    """
+    Return the index stored next to filepath, rebuilding it if it is
+    missing or older than the file. The rebuilt index is saved, with the
+    same permissions as the file, when the directory is writable.
+    """
+    index_path = filepath + INDEX_SUFFIX
+    index = CoordinateIndex.load(index_path)
+    if index is not None and index.is_current(filepath):
+        return index
+    index = build_index(filepath)
+    if save:
+        try:
+            index.save(index_path, mode=stat.S_IMODE(os.stat(filepath).st_mode))
+        except OSError:
+            pass
+    return index
+
+
+def region_lines(filepath: str, chrom: str, start: int, end: int, index: CoordinateIndex = None):
+    """
+    Yield the text lines of a sorted BGZF GFF3 file that may belong to
+    features overlapping chrom:[start, end], decompressing only the blocks
+    from the indexed offset up to the last line of those features.
+    """
+    index = index or load_or_build_index(filepath)
+    voffset = index.offset(chrom, start)
+    if voffset is None:
+        return
+    # Keep reading past end until features that overlap the region (e.g. a
+    # gene whose later exons lie beyond end) are complete
+    reach = end
+    with open(filepath, "rb") as f:
+        for _, line in iter_lines_with_offsets(f, voffset):
+            span = _feature_span(line)
+            if span is None:
+                continue
+            seqid, line_start, line_end = span
+            if seqid != chrom or line_start > reach:
+                return
+            if line_start <= end:
+                reach = max(reach, line_end)
+            yield line.decode()
+
+
+def open_binary(source):
+    """
+    Wrap a seekable binary file object so gzip/bgzip content is read
+    decompressed; other sources are returned unchanged.
+    """
+    if hasattr(source, "peek"):
+        head = source.peek(2)[:2]
+    elif hasattr(source, "seek") and hasattr(source, "tell"):
+        position = source.tell()
+        head = source.read(2)
+        source.seek(position)
+    else:
+        return source
+    if isinstance(head, (bytes, bytearray)) and has_gzip_magic(head):
+        import gzip
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    return source
+
+
+def read_chunks_decompressed(chunks):
+    """
+    Decompress an iterable of byte chunks if it starts with the gzip magic
+    number; otherwise yield it through unchanged.
+    """
+    chunks = iter(chunks)
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if not isinstance(chunk, (bytes, bytearray, memoryview)) or sum(map(len, head)) >= 2:
+            break
+    stream = itertools.chain(head, chunks)
+    if head and isinstance(head[0], (bytes, bytearray, memoryview)) \
+            and has_gzip_magic(b"".join(bytes(c) for c in head)[:2]):
+        return iter_decompressed(stream)
+    return stream
@@ -0,0 +1,175 @@
+"""
+Persistent on-disk cache of parsed annotations, keyed by SHA-256 of the input.
+
+Each entry is a directory holding the ColumnarAnnotation arrays as .npy
+files plus the feature IDs and category tables, so a cached annotation is
+loaded with np.load(mmap_mode="r") instead of re-tokenizing the GFF3 text.
+The cache directory is bounded by total size; least recently used entries
+are evicted first.
+
+    <cache_dir>/<sha256>.v<FORMAT_VERSION>/meta.json
+    <cache_dir>/<sha256>.v<FORMAT_VERSION>/gene_ids.json, tx_ids.json
+    <cache_dir>/<sha256>.v<FORMAT_VERSION>/<array>.npy
+
+Other files derived from the same input (see entry_file) can be kept in the
+entry directory; they count towards the size budget and are evicted with it.
+
+FORMAT_VERSION is part of the entry name and must be bumped whenever the
+parser's output for the same input changes, so entries written by an older
+parser are never returned (they age out through eviction). IDs are stored
+as JSON lists since unescaped GFF3 IDs may contain any character.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .columnar import ColumnarAnnotation
+
+# 2: URL-unescaped IDs, multi-parent exons, IDs stored as JSON
+FORMAT_VERSION = 2
+DEFAULT_MAX_BYTES = int(os.environ.get("GFF3_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+_ARRAYS = (
+    "gene_chrom", "gene_strand", "gene_start", "gene_end", "tx_offsets",
+    "tx_chrom", "tx_strand", "tx_start", "tx_end", "exon_offsets",
+    "exon_start", "exon_end", "exon_type",
+)
+
+
+def file_sha256(filepath: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_dir(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.v{FORMAT_VERSION}")
+
+
+def entry_file(cache_dir: str, key: str, name: str):
+    """Path for an extra file inside key's entry directory, or None if there is no entry."""
+    entry = _entry_dir(cache_dir, key)
+    return os.path.join(entry, name) if os.path.isdir(entry) else None
+
+
+def _write_ids(path: str, ids):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(ids), f, ensure_ascii=False)
+
+
+def _read_ids(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_annotation(ann: ColumnarAnnotation, cache_dir: str, key: str):
+    """Write an annotation to the cache atomically (temp dir + rename)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    target = _entry_dir(cache_dir, key)
+    if os.path.isdir(target):
+        return
+
+    staging = tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir)
+    try:
+        for name in _ARRAYS:
+            np.save(os.path.join(staging, f"{name}.npy"), getattr(ann, name))
+        _write_ids(os.path.join(staging, "gene_ids.json"), ann.gene_ids)
+        _write_ids(os.path.join(staging, "tx_ids.json"), ann.tx_ids)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "chroms": ann.chroms,
+                "strands": ann.strands,
+                "feature_types": ann.feature_types,
+            }, f)
+        os.rename(staging, target)
+    except OSError:
+        # Another process may have won the rename race; keep theirs
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+
+
+def load_annotation(cache_dir: str, key: str, mmap: bool = True):
+    """Load a cached annotation, or return None on a miss or stale entry."""
+    entry = _entry_dir(cache_dir, key)
+    meta_path = os.path.join(entry, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in _ARRAYS
+        }
+        gene_ids = _read_ids(os.path.join(entry, "gene_ids.json"))
+        tx_ids = _read_ids(os.path.join(entry, "tx_ids.json"))
+    except (OSError, ValueError):
+        return None
+
+    # Mark as recently used for eviction
+    os.utime(meta_path)
+
+    return ColumnarAnnotation(
+        gene_ids, arrays["gene_chrom"], arrays["gene_strand"], arrays["gene_start"],
+        arrays["gene_end"], arrays["tx_offsets"],
+        tx_ids, arrays["tx_chrom"], arrays["tx_strand"], arrays["exon_offsets"],
+        arrays["exon_start"], arrays["exon_end"], arrays["exon_type"],
+        meta["chroms"], meta["strands"], meta["feature_types"],
+        tx_start=arrays["tx_start"], tx_end=arrays["tx_end"],
+    )
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict(cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        meta_path = os.path.join(path, "meta.json")
+        if name.startswith(".") or not os.path.isfile(meta_path):
+            continue
+        entries.append((os.path.getmtime(meta_path), _dir_size(path), path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def cached_parse(key: str, cache_dir: str, parse, columnar: bool = True,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+    """
+    Return the cached annotation for key, or call parse() (which must return
+    a ColumnarAnnotation), store the result and evict down to max_bytes.
+    With columnar=False the result is converted to Gene objects.
+    """
+    ann = load_annotation(cache_dir, key)
+    if ann is None:
+        ann = parse()
+        save_annotation(ann, cache_dir, key)
+        evict(cache_dir, max_bytes)
+    return ann if columnar else ann.to_genes()
@@ -0,0 +1,285 @@
+"""
+Columnar, NumPy-backed representation of a parsed GFF3 annotation.
+
+Instead of one Python object per gene, transcript and exon, coordinates are
+stored in flat integer arrays, chrom/strand/feature type as small categorical
+codes, and the gene -> transcript -> exon hierarchy as CSR-style offset
+arrays:
+
+    transcripts of gene g:   tx_offsets[g] : tx_offsets[g + 1]
+    exons of transcript t:   exon_offsets[t] : exon_offsets[t + 1]
+
+ColumnarAnnotation behaves like the dict of gene_id -> Gene returned by
+parse_gff3, handing out thin GeneView/TranscriptView/ExonView objects that
+expose the same attributes as the classes in models.py.
+"""
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+# Sentinel for missing coordinates (genes/transcripts without exons)
+NO_COORD = -1
+
+
+def _encode(values, categories, lookup):
+    """Map values to integer codes, extending categories as needed."""
+    codes = []
+    for value in values:
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(categories)
+            categories.append(value)
+        codes.append(code)
+    return codes
+
+
+def coord(value):
+    """Python int for a stored coordinate, or None for NO_COORD."""
+    return None if value == NO_COORD else int(value)
+
+
+class ColumnarAnnotation(Mapping):
+    def __init__(self, gene_ids, gene_chrom, gene_strand, gene_start, gene_end, tx_offsets,
+                 tx_ids, tx_chrom, tx_strand, exon_offsets,
+                 exon_start, exon_end, exon_type,
+                 chroms, strands, feature_types, tx_start=None, tx_end=None):
+        self.gene_ids = list(gene_ids)
+        self.gene_chrom = np.asarray(gene_chrom, dtype=np.int32)
+        self.gene_strand = np.asarray(gene_strand, dtype=np.int8)
+        self.gene_start = np.asarray(gene_start, dtype=np.int64)
+        self.gene_end = np.asarray(gene_end, dtype=np.int64)
+        self.tx_offsets = np.asarray(tx_offsets, dtype=np.int64)
+
+        self.tx_ids = list(tx_ids)
+        self.tx_chrom = np.asarray(tx_chrom, dtype=np.int32)
+        self.tx_strand = np.asarray(tx_strand, dtype=np.int8)
+        self.exon_offsets = np.asarray(exon_offsets, dtype=np.int64)
+
+        self.exon_start = np.asarray(exon_start, dtype=np.int64)
+        self.exon_end = np.asarray(exon_end, dtype=np.int64)
+        self.exon_type = np.asarray(exon_type, dtype=np.int8)
+
+        self.chroms = list(chroms)
+        self.strands = list(strands)
+        self.feature_types = list(feature_types)
+
+        if tx_start is None or tx_end is None:
+            self._compute_transcript_bounds()
+        else:
+            self.tx_start = np.asarray(tx_start, dtype=np.int64)
+            self.tx_end = np.asarray(tx_end, dtype=np.int64)
+        self._gene_index = {gene_id: i for i, gene_id in enumerate(self.gene_ids)}
+
+    def _compute_transcript_bounds(self):
+        """Per-transcript min start / max end over each exon slice."""
+        n_tx = len(self.tx_ids)
+        self.tx_start = np.full(n_tx, NO_COORD, dtype=np.int64)
+        self.tx_end = np.full(n_tx, NO_COORD, dtype=np.int64)
+        counts = np.diff(self.exon_offsets)
+        has_exons = counts > 0
+        if has_exons.any():
+            offsets = self.exon_offsets[:-1][has_exons]
+            self.tx_start[has_exons] = np.minimum.reduceat(self.exon_start, offsets)
+            self.tx_end[has_exons] = np.maximum.reduceat(self.exon_end, offsets)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from a GFF3Records table, with the same linkage rules as build_genes."""
+        from .gff3_parser import link_records
+
+        chroms, strands, feature_types = [], [], []
+        chrom_codes, strand_codes, type_codes = {}, {}, {}
+
+        gene_ids, gene_chrom, gene_strand, gene_start, gene_end = [], [], [], [], []
+        tx_offsets = [0]
+        tx_ids, tx_chrom, tx_strand = [], [], []
+        exon_offsets = [0]
+        exon_start, exon_end, exon_type = [], [], []
+
+        for gene_id, chrom, strand, start, end, transcripts in link_records(records):
+            gene_ids.append(gene_id)
+            gene_chrom.append(chrom)
+            gene_strand.append(strand)
+            gene_start.append(NO_COORD if start is None else start)
+            gene_end.append(NO_COORD if end is None else end)
+            for tx_id, tx_chrom_value, tx_strand_value, exons in transcripts:
+                tx_ids.append(tx_id)
+                tx_chrom.append(tx_chrom_value)
+                tx_strand.append(tx_strand_value)
+                for start_, end_, feature_type in exons:
+                    exon_start.append(start_)
+                    exon_end.append(end_)
+                    exon_type.append(feature_type)
+                exon_offsets.append(len(exon_start))
+            tx_offsets.append(len(tx_ids))
+
+        return cls(
+            gene_ids,
+            _encode(gene_chrom, chroms, chrom_codes),
+            _encode(gene_strand, strands, strand_codes),
+            gene_start, gene_end, tx_offsets,
+            tx_ids,
+            _encode(tx_chrom, chroms, chrom_codes),
+            _encode(tx_strand, strands, strand_codes),
+            exon_offsets,
+            exon_start, exon_end,
+            _encode(exon_type, feature_types, type_codes),
+            chroms, strands, feature_types,
+        )
+
+    def to_genes(self) -> dict:
+        """Materialize the dict of gene_id -> Gene objects that parse_gff3 returns."""
+        from .models import Gene, Transcript, Exon
+
+        exon_start = self.exon_start.tolist()
+        exon_end = self.exon_end.tolist()
+        exon_type = [self.feature_types[code] for code in self.exon_type.tolist()]
+        exon_offsets = self.exon_offsets.tolist()
+        tx_offsets = self.tx_offsets.tolist()
+
+        genes = {}
+        for g, gene_id in enumerate(self.gene_ids):
+            gene = Gene(
+                gene_id=gene_id,
+                chrom=self.chroms[self.gene_chrom[g]],
+                strand=self.strands[self.gene_strand[g]],
+                start=coord(self.gene_start[g]),
+                end=coord(self.gene_end[g]),
+            )
+            for t in range(tx_offsets[g], tx_offsets[g + 1]):
+                transcript = Transcript(
+                    self.tx_ids[t],
+                    chrom=self.chroms[self.tx_chrom[t]],
+                    strand=self.strands[self.tx_strand[t]],
+                )
+                for e in range(exon_offsets[t], exon_offsets[t + 1]):
+                    transcript.add_exon(Exon(exon_start[e], exon_end[e], exon_type[e]))
+                gene.add_transcript(transcript)
+            genes[gene_id] = gene
+        return genes
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the coordinate/code arrays (excludes ID strings)."""
+        return sum(
+            arr.nbytes for arr in (
+                self.gene_chrom, self.gene_strand, self.gene_start, self.gene_end,
+                self.tx_offsets, self.tx_chrom, self.tx_strand, self.tx_start,
+                self.tx_end, self.exon_offsets, self.exon_start, self.exon_end,
+                self.exon_type,
+            )
+        )
+
+    def memory_bytes(self) -> int:
+        """Approximate total memory held: arrays plus ID strings and the ID lookup."""
+        ids = sum(map(sys.getsizeof, self.gene_ids)) + sum(map(sys.getsizeof, self.tx_ids))
+        lists = sys.getsizeof(self.gene_ids) + sys.getsizeof(self.tx_ids)
+        return self.nbytes + ids + lists + sys.getsizeof(self._gene_index)
+
+    # Mapping interface: gene_id -> GeneView
+
+    def __getitem__(self, gene_id):
+        return GeneView(self, self._gene_index[gene_id])
+
+    def __iter__(self):
+        return iter(self.gene_ids)
+
+    def __len__(self):
+        return len(self.gene_ids)
+
+    def __contains__(self, gene_id):
+        return gene_id in self._gene_index
+
+
+class ExonView:
+    __slots__ = ("_ann", "_i")
+
+    def __init__(self, ann: ColumnarAnnotation, i: int):
+        self._ann = ann
+        self._i = i
+
+    @property
+    def start(self):
+        return int(self._ann.exon_start[self._i])
+
+    @property
+    def end(self):
+        return int(self._ann.exon_end[self._i])
+
+    @property
+    def feature_type(self):
+        return self._ann.feature_types[self._ann.exon_type[self._i]]
+
+    def length(self):
+        return self.end - self.start + 1
+
+
+class TranscriptView:
+    __slots__ = ("_ann", "_i")
+
+    def __init__(self, ann: ColumnarAnnotation, i: int):
+        self._ann = ann
+        self._i = i
+
+    @property
+    def id(self):
+        return self._ann.tx_ids[self._i]
+
+    @property
+    def chrom(self):
+        return self._ann.chroms[self._ann.tx_chrom[self._i]]
+
+    @property
+    def strand(self):
+        return self._ann.strands[self._ann.tx_strand[self._i]]
+
+    @property
+    def exons(self):
+        ann = self._ann
+        return [ExonView(ann, i) for i in range(ann.exon_offsets[self._i], ann.exon_offsets[self._i + 1])]
+
+    @property
+    def cds(self):
+        return []
+
+    @property
+    def start(self):
+        return coord(self._ann.tx_start[self._i])
+
+    @property
+    def end(self):
+        return coord(self._ann.tx_end[self._i])
+
+
+class GeneView:
+    __slots__ = ("_ann", "_i")
+
+    def __init__(self, ann: ColumnarAnnotation, i: int):
+        self._ann = ann
+        self._i = i
+
+    @property
+    def id(self):
+        return self._ann.gene_ids[self._i]
+
+    @property
+    def chrom(self):
+        return self._ann.chroms[self._ann.gene_chrom[self._i]]
+
+    @property
+    def strand(self):
+        return self._ann.strands[self._ann.gene_strand[self._i]]
+
+    @property
+    def start(self):
+        return coord(self._ann.gene_start[self._i])
+
+    @property
+    def end(self):
+        return coord(self._ann.gene_end[self._i])
+
+    @property
+    def transcripts(self):
+        ann = self._ann
+        return [TranscriptView(ann, i) for i in range(ann.tx_offsets[self._i], ann.tx_offsets[self._i + 1])]
@@ -1,5 +1,11 @@
+import codecs
 from collections import defaultdict
+from urllib.parse import unquote
+from .bgzf import is_gzip, is_bgzf, load_or_build_index, open_binary, read_chunks_decompressed, region_lines
 from .models import Gene, Transcript, Exon
+from app.telemetry.spans import timed
+
+CHUNK_SIZE = 1 << 20
 
 
 def parse_attributes(attr_string: str) -> dict:
@@ -15,92 +21,304 @@ def parse_attributes(attr_string: str) -> dict:
     return attributes
 
 
-def parse_gff3(filepath: str) -> dict:
+def iter_lines(source, encoding: str = "utf-8", chunk_size: int = CHUNK_SIZE):
     """
-    Parse a GFF3 file and return a dict of gene_id -> Gene objects.
+    Yield text lines from a file object (binary or text, e.g. an upload's
+    spooled file) or from any iterable of bytes/str chunks.
+
+    Input is read chunk by chunk and decoded incrementally, so multi-byte
+    characters split across chunk boundaries are handled and the full
+    content is never held in memory at once.
+    Gzip/bgzip input is detected by its magic number and decompressed on
+    the fly.
     """
+    if hasattr(source, "read"):
+        source = open_binary(source)
+        chunks = iter(lambda: source.read(chunk_size), source.read(0))
+    else:
+        chunks = read_chunks_decompressed(source)
 
-    genes = {}
-    transcripts = {}
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = decoder.decode(chunk)
+        if not chunk:
+            continue
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        yield from lines
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+@timed()
+def parse_gff3(filepath: str, columnar: bool = False, workers: int = 1, cache_dir: str = None):
+    """
+    Parse a GFF3 file and return a dict of gene_id -> Gene objects,
+    or a ColumnarAnnotation when columnar=True.
+    With workers > 1 (or None for all CPUs) large files are parsed in
+    parallel byte-range shards, see parallel.parse_gff3_parallel.
+    With cache_dir set, the parsed annotation is stored in (and later
+    memory-mapped from) a binary cache keyed by the file's SHA-256,
+    see binary_cache.
+    Gzip and bgzip files (.gff3.gz) are decompressed while reading; they
+    are always parsed sequentially.
+    """
+    if cache_dir:
+        from .binary_cache import cached_parse, file_sha256
+        return cached_parse(
+            file_sha256(filepath), cache_dir,
+            lambda: parse_gff3(filepath, columnar=True, workers=workers),
+            columnar=columnar,
+        )
 
-    # Temporary storage
-    transcript_to_gene = {}
-    transcript_metadata = {}  # Store chrom/strand for transcripts (for geneID-based genes)
-    exon_buffer = defaultdict(list)
+    if is_gzip(filepath):
+        with open(filepath, "rb") as f:
+            return parse_gff3_stream(f, columnar=columnar)
+
+    if workers is None or workers > 1:
+        from .parallel import parse_gff3_parallel
+        return parse_gff3_parallel(filepath, workers=workers, columnar=columnar)
 
     with open(filepath, "r") as f:
-        for line in f:
-            if line.startswith("#") or not line.strip():
-                continue
+        return parse_gff3_lines(f, columnar=columnar)
+
+
+@timed()
+def parse_gff3_region(filepath: str, chrom: str, start: int, end: int, columnar: bool = False):
+    """
+    Parse only the genes overlapping chrom:[start, end].
+
+    For a sorted bgzip file the coordinate index stored next to it (built on
+    first use, see bgzf.load_or_build_index) locates the first block to
+    read, so only the blocks spanning the region are decompressed. Other
+    files are scanned in full and filtered by seqid.
+    """
+    if is_bgzf(filepath):
+        index = load_or_build_index(filepath)
+        records = collect_records(region_lines(filepath, chrom, start, end, index))
+        # The index skips lines that end before the region, which can include
+        # an overlapping gene's first exons; re-read from its start if so
+        first = min((gene[2] for gene in records.genes.values()
+                     if gene[0] == chrom and gene[2] <= end and gene[3] >= start), default=start)
+        if first < start:
+            records = collect_records(region_lines(filepath, chrom, first, end, index))
+    else:
+        with open(filepath, "rb") as f:
+            records = collect_records(
+                line for line in iter_lines(f) if line.split("\t", 1)[0] == chrom
+            )
+
+    # Keep only genes whose (linked) bounds overlap the region
+    keep = {
+        gene_id for gene_id, _, _, gene_start, gene_end, _ in link_records(records)
+        if gene_start is not None and gene_start <= end and gene_end >= start
+    }
+    records.genes = {gene_id: gene for gene_id, gene in records.genes.items() if gene_id in keep}
+    records.transcripts = {tx_id: tx for tx_id, tx in records.transcripts.items() if tx[2] in keep}
+    if columnar:
+        from .columnar import ColumnarAnnotation
+        return ColumnarAnnotation.from_records(records)
+    return build_genes(records)
+
+
+def parse_gff3_stream(source, encoding: str = "utf-8", columnar: bool = False):
+    """
+    Parse GFF3 from a file object or iterable of bytes/str chunks without
+    going through a temporary file. See iter_lines for accepted sources.
+    """
+    return parse_gff3_lines(iter_lines(source, encoding), columnar=columnar)
+
+
+def parse_gff3_lines(lines, columnar: bool = False):
+    """
+    Parse an iterable of GFF3 text lines and return a dict of
+    gene_id -> Gene objects, or a ColumnarAnnotation when columnar=True.
+    """
+    records = collect_records(lines)
+    if columnar:
+        from .columnar import ColumnarAnnotation
+        return ColumnarAnnotation.from_records(records)
+    return build_genes(records)
+
+
+class GFF3Records:
+    """
+    Raw gene/transcript/exon records gathered from GFF3 lines, before
+    ID/Parent linkage is resolved.
+    """
 
-            fields = line.strip().split("\t")
-            if len(fields) != 9:
+    def __init__(self):
+        self.genes = {}  # gene_id -> (chrom, strand, start, end)
+        self.transcripts = {}  # tx_id -> (chrom, strand, parent gene_id)
+        self.exons = defaultdict(list)  # parent tx_id -> [(start, end, feature_type)]
+
+
+# Column 3 values collect_records keeps, mapped to (kind, canonical string);
+# every other feature type (UTRs, codons, ...) is skipped before any parsing
+_GENE, _TRANSCRIPT, _EXON = 0, 1, 2
+_FEATURE_KINDS = {
+    "gene": (_GENE, "gene"),
+    "mRNA": (_TRANSCRIPT, "mRNA"),
+    "transcript": (_TRANSCRIPT, "transcript"),
+    "exon": (_EXON, "exon"),
+    "CDS": (_EXON, "CDS"),
+}
+
+
+def _raw_attribute(attributes: str, key: str):
+    """Still-escaped value of key in a column-9 string, or None if absent."""
+    tag = key + "="
+    if attributes.startswith(tag):
+        i = len(tag)
+    else:
+        i = attributes.find(";" + tag)
+        if i < 0:
+            return None
+        i += len(tag) + 1
+    j = attributes.find(";", i)
+    return attributes[i:] if j < 0 else attributes[i:j]
+
+
+def attribute_value(attributes: str, key: str):
+    """
+    Value of one attribute in a column-9 string, found without splitting the
+    whole column; URL escapes (%3B, %2C, ...) are decoded. None if absent.
+    """
+    value = _raw_attribute(attributes, key)
+    if value and "%" in value:
+        return unquote(value)
+    return value
+
+
+def attribute_values(attributes: str, key: str) -> list:
+    """Values of a multi-valued attribute (e.g. Parent=t1,t2), unescaped."""
+    value = _raw_attribute(attributes, key)
+    if not value:
+        return []
+    if "," not in value and "%" not in value:
+        return [value]
+    # Split before unescaping: an escaped comma (%2C) belongs to the value
+    return [unquote(v) for v in value.split(",") if v]
+
+
+def collect_records(lines, records: GFF3Records = None) -> GFF3Records:
+    """
+    Tokenize GFF3 lines into a GFF3Records table.
+
+    Lines are split once; the feature type (column 3) is checked before
+    coordinates are converted, and only the ID, Parent and geneID
+    attributes are extracted. An exon or CDS with several parents
+    (Parent=t1,t2) is added to each of them.
+    """
+    if records is None:
+        records = GFF3Records()
+    genes = records.genes
+    transcripts = records.transcripts
+    exon_buffer = records.exons
+    feature_kinds = _FEATURE_KINDS
+
+    for line in lines:
+        if not line or line[0] == "#":
+            continue
+        fields = line.split("\t", 8)
+        if len(fields) != 9:
+            continue
+        kind = feature_kinds.get(fields[2])
+        if kind is None:
+            continue
+
+        attributes = fields[8].rstrip()
+        if "\t" in attributes:  # more than 9 columns
+            continue
+        kind, feature_type = kind
+
+        if kind == _EXON:
+            # Inlined _raw_attribute(attributes, "Parent"): this is most lines
+            if attributes.startswith("Parent="):
+                i = 7
+            else:
+                i = attributes.find(";Parent=")
+                if i < 0:
+                    continue
+                i += 8
+            j = attributes.find(";", i)
+            parent_tx = attributes[i:] if j < 0 else attributes[i:j]
+            if not parent_tx:
                 continue
+            exon = (int(fields[3]), int(fields[4]), feature_type)
+            if "," in parent_tx or "%" in parent_tx:
+                for parent in attribute_values(attributes, "Parent"):
+                    exon_buffer[parent].append(exon)
+            else:
+                exon_buffer[parent_tx].append(exon)
+
+        elif kind == _TRANSCRIPT:
+            tx_id = attribute_value(attributes, "ID")
+            parents = attribute_values(attributes, "Parent")
+            parent_gene = parents[0] if parents else attribute_value(attributes, "geneID")
+            if tx_id and parent_gene:
+                transcripts[tx_id] = (fields[0].lstrip(), fields[6], parent_gene)
+
+        else:
+            gene_id = attribute_value(attributes, "ID")
+            if gene_id:
+                genes[gene_id] = (fields[0].lstrip(), fields[6], int(fields[3]), int(fields[4]))
+
+    return records
 
-            chrom, source, feature_type, start, end, score, strand, phase, attributes = fields
-            start, end = int(start), int(end)
-            attr_dict = parse_attributes(attributes)
-
-            if feature_type == "gene":
-                gene_id = attr_dict.get("ID")
-                if gene_id:
-                    genes[gene_id] = Gene(
-                        gene_id=gene_id,
-                        chrom=chrom,
-                        strand=strand,
-                        start=start,
-                        end=end
-                    )
-
-            elif feature_type in ("mRNA", "transcript"):
-                tx_id = attr_dict.get("ID")
-                parent_gene = attr_dict.get("Parent")
-                if not parent_gene:
-                    parent_gene = attr_dict.get("geneID")
-
-                if tx_id and parent_gene:
-                    transcripts[tx_id] = Transcript(tx_id, chrom=chrom, strand=strand)
-                    transcript_to_gene[tx_id] = parent_gene
-                    transcript_metadata[tx_id] = {"chrom": chrom, "strand": strand}
-
-            elif feature_type in ("exon", "CDS"):
-                parent_tx = attr_dict.get("Parent")
-                if parent_tx:
-                    exon = Exon(start, end, feature_type)
-                    exon_buffer[parent_tx].append(exon)
-
-    # Link exons → transcripts
-    for tx_id, exons in exon_buffer.items():
-        if tx_id in transcripts:
-            for exon in exons:
-                transcripts[tx_id].add_exon(exon)
-            transcripts[tx_id].sort_exons()
+
+def link_records(records: GFF3Records):
+    """
+    Resolve ID/Parent linkage and yield one
+    (gene_id, chrom, strand, start, end, transcripts) tuple per gene, where
+    transcripts is a list of (tx_id, chrom, strand, exons) and exons are
+    (start, end, feature_type) sorted by start.
+    """
+    genes = dict(records.genes)
+    exon_buffer = records.exons
 
     # Create genes from geneID if they don't exist (for files without gene features)
-    for tx_id, gene_id in transcript_to_gene.items():
-        if gene_id not in genes and tx_id in transcript_metadata:
-            # Create gene from transcript metadata (start/end will be calculated later)
-            metadata = transcript_metadata[tx_id]
-            genes[gene_id] = Gene(
-                gene_id=gene_id,
-                chrom=metadata["chrom"],
-                strand=metadata["strand"]
-            )
+    for tx_id, (chrom, strand, gene_id) in records.transcripts.items():
+        if gene_id not in genes:
+            # start/end will be calculated from the exons below
+            genes[gene_id] = (chrom, strand, None, None)
 
-    # Link transcripts → genes
-    for tx_id, gene_id in transcript_to_gene.items():
-        if gene_id in genes and tx_id in transcripts:
-            genes[gene_id].add_transcript(transcripts[tx_id])
+    # Link transcripts → genes (exons → transcripts, sorted by start)
+    gene_transcripts = defaultdict(list)
+    for tx_id, (chrom, strand, gene_id) in records.transcripts.items():
+        exons = sorted(exon_buffer.get(tx_id, ()), key=lambda e: e[0])
+        gene_transcripts[gene_id].append((tx_id, chrom, strand, exons))
 
-    # 🚨 ENFORCE BIOLOGICAL CONSISTENCY HERE
-    for gene in genes.values():
-        gene.transcripts = [
-            tx for tx in gene.transcripts
-            if tx.chrom == gene.chrom and tx.strand == gene.strand
+    for gene_id, (chrom, strand, start, end) in genes.items():
+        # 🚨 ENFORCE BIOLOGICAL CONSISTENCY HERE
+        transcripts = [
+            tx for tx in gene_transcripts.get(gene_id, ())
+            if tx[1] == chrom and tx[2] == strand
         ]
 
-    # Calculate gene bounds for genes that don't have explicit start/end
-    for gene in genes.values():
-        gene.calculate_bounds()
+        # Calculate gene bounds for genes that don't have explicit start/end
+        if start is None or end is None:
+            bounded = [tx[3] for tx in transcripts if tx[3]]
+            if bounded:
+                start = min(min(e[0] for e in exons) for exons in bounded)
+                end = max(max(e[1] for e in exons) for exons in bounded)
 
-    return genes
\ No newline at end of file
+        yield gene_id, chrom, strand, start, end, transcripts
+
+
+def build_genes(records: GFF3Records) -> dict:
+    """Build the dict of gene_id -> Gene objects from parsed records."""
+    genes = {}
+    for gene_id, chrom, strand, start, end, transcripts in link_records(records):
+        gene = Gene(gene_id=gene_id, chrom=chrom, strand=strand, start=start, end=end)
+        for tx_id, tx_chrom, tx_strand, exons in transcripts:
+            transcript = Transcript(tx_id, chrom=tx_chrom, strand=tx_strand)
+            for exon_start, exon_end, feature_type in exons:
+                transcript.add_exon(Exon(exon_start, exon_end, feature_type))
+            gene.add_transcript(transcript)
+        genes[gene_id] = gene
+    return genes
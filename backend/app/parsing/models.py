@@ -1,63 +1,82 @@
+"""
+Gene / transcript / exon objects built by parse_gff3.
+
+The classes use __slots__ (no per-instance __dict__), and the chrom, strand
+and feature type strings are interned, so a genome's worth of exons share a
+handful of string objects instead of one copy per GFF3 line. Transcript
+start/end are plain attributes kept up to date by add_exon and sort_exons;
+add exons through those methods rather than appending to .exons directly.
+"""
+from sys import intern
+
+
 class Exon:
+    __slots__ = ("start", "end", "feature_type")
+
     def __init__(self, start: int, end: int, feature_type: str):
         self.start = start
         self.end = end
-        self.feature_type = feature_type  # "exon" or "CDS"
+        self.feature_type = intern(str(feature_type))  # "exon" or "CDS"
 
     def length(self):
         return self.end - self.start + 1
 
 
 class Transcript:
+    __slots__ = ("id", "chrom", "strand", "exons", "cds", "start", "end")
+
     def __init__(self, transcript_id: str, chrom: str, strand: str):
         self.id = transcript_id
-        self.chrom = chrom
-        self.strand = strand
+        self.chrom = intern(str(chrom))
+        self.strand = intern(str(strand))
         self.exons = []
         self.cds = []
+        self.start = None  # min exon start, None until an exon is added
+        self.end = None  # max exon end
 
     def add_exon(self, exon: Exon):
         self.exons.append(exon)
+        if self.start is None or exon.start < self.start:
+            self.start = exon.start
+        if self.end is None or exon.end > self.end:
+            self.end = exon.end
 
     def sort_exons(self):
         self.exons.sort(key=lambda e: e.start)
-
-    @property
-    def start(self):
-        return min(e.start for e in self.exons) if self.exons else None
-
-    @property
-    def end(self):
-        return max(e.end for e in self.exons) if self.exons else None
+        # Also resynchronizes the bounds if .exons was modified directly
+        self.start = self.exons[0].start if self.exons else None
+        self.end = max(e.end for e in self.exons) if self.exons else None
 
 
 class Gene:
+    __slots__ = ("id", "chrom", "strand", "start", "end", "transcripts")
+
     def __init__(self, gene_id: str, chrom: str, strand: str, start: int = None, end: int = None):
         self.id = gene_id
-        self.chrom = chrom
-        self.strand = strand
+        self.chrom = intern(str(chrom))
+        self.strand = intern(str(strand))
         self.start = start
         self.end = end
         self.transcripts = []
 
     def add_transcript(self, transcript: Transcript):
         self.transcripts.append(transcript)
-    
+
     def calculate_bounds(self):
         """Calculate gene start/end from all transcripts if not already set."""
         if self.start is not None and self.end is not None:
             return
-        
+
         if not self.transcripts:
             return
-        
+
         all_starts = []
         all_ends = []
         for tx in self.transcripts:
             if tx.exons:
-                all_starts.append(min(e.start for e in tx.exons))
-                all_ends.append(max(e.end for e in tx.exons))
-        
+                all_starts.append(tx.start)
+                all_ends.append(tx.end)
+
         if all_starts and all_ends:
             self.start = min(all_starts)
             self.end = max(all_ends)
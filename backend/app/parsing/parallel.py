@@ -0,0 +1,139 @@
+"""
+Parallel GFF3 parsing by byte-range sharding.
+
+The file is split into byte ranges that start and end on line boundaries
+(optionally on chromosome boundaries for sorted files). Each shard is
+tokenized into a GFF3Records table in a worker process, and the tables are
+merged in file order before ID/Parent linkage is resolved, so Parent
+references that cross shard boundaries link exactly as in a sequential parse.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .gff3_parser import GFF3Records, collect_records, build_genes
+
+# Files smaller than this per worker are not worth the process overhead
+MIN_SHARD_BYTES = 8 * 1024 * 1024
+
+
+def _line_start_at_or_after(f, offset: int, size: int) -> int:
+    """Offset of the first line starting at or after offset."""
+    if offset <= 0:
+        return 0
+    if offset >= size:
+        return size
+    f.seek(offset - 1)
+    f.readline()  # finish the line that contains offset - 1
+    return f.tell()
+
+
+def _seqid(line: bytes) -> bytes:
+    return line.split(b"\t", 1)[0]
+
+
+def _next_chrom_start(f, offset: int, size: int) -> int:
+    """
+    Offset of the first line at or after offset whose seqid differs from the
+    line just before offset (comment lines are skipped over).
+    """
+    if offset <= 0 or offset >= size:
+        return offset
+    # Find the seqid of the last feature line before the boundary
+    f.seek(max(0, offset - 64 * 1024))
+    previous = None
+    while f.tell() < offset:
+        line = f.readline()
+        if line and not line.startswith(b"#") and f.tell() <= offset:
+            previous = _seqid(line)
+    f.seek(offset)
+    while True:
+        position = f.tell()
+        line = f.readline()
+        if not line:
+            return size
+        if line.startswith(b"#") or not line.strip():
+            continue
+        if previous is None or _seqid(line) != previous:
+            return position
+
+
+def shard_ranges(filepath: str, n_shards: int, by_chrom: bool = False) -> list:
+    """
+    Split a file into at most n_shards (start, end) byte ranges aligned on
+    line boundaries, or on chromosome boundaries when by_chrom=True (only
+    useful for files sorted by seqid; shards may then be fewer or uneven).
+    """
+    size = os.path.getsize(filepath)
+    if n_shards <= 1 or size == 0:
+        return [(0, size)]
+
+    boundaries = [0]
+    with open(filepath, "rb") as f:
+        for i in range(1, n_shards):
+            offset = _line_start_at_or_after(f, size * i // n_shards, size)
+            if by_chrom:
+                offset = _next_chrom_start(f, offset, size)
+            if boundaries[-1] < offset < size:
+                boundaries.append(offset)
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parse_shard(filepath: str, start: int, end: int, encoding: str = "utf-8") -> GFF3Records:
+    """Tokenize the lines in byte range [start, end) of a GFF3 file."""
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    records = collect_records(text.split("\n"))
+    # defaultdict factories don't need to cross the process boundary
+    records.exons = dict(records.exons)
+    return records
+
+
+def merge_records(shards) -> GFF3Records:
+    """
+    Merge per-shard records in file order. Later definitions overwrite
+    earlier ones and exon lists are concatenated, as in a sequential parse.
+    """
+    merged = GFF3Records()
+    for shard in shards:
+        merged.genes.update(shard.genes)
+        merged.transcripts.update(shard.transcripts)
+        for tx_id, exons in shard.exons.items():
+            merged.exons[tx_id].extend(exons)
+    return merged
+
+
+def parse_gff3_parallel(filepath: str, workers: int = None, columnar: bool = False,
+                        by_chrom: bool = False, min_shard_bytes: int = MIN_SHARD_BYTES):
+    """
+    Parse a GFF3 file using a pool of worker processes.
+
+    Args:
+        filepath: Path to a plain-text GFF3 file
+        workers: Number of worker processes (default: os.cpu_count())
+        columnar: Return a ColumnarAnnotation instead of Gene objects
+        by_chrom: Align shards on chromosome boundaries (sorted files)
+        min_shard_bytes: Lower bound on shard size; small files parse inline
+
+    Returns:
+        Same result as parse_gff3(filepath, columnar=columnar)
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(filepath)
+    n_shards = max(1, min(workers, size // max(1, min_shard_bytes)))
+    ranges = shard_ranges(filepath, n_shards, by_chrom=by_chrom)
+
+    if len(ranges) == 1:
+        shards = [parse_shard(filepath, *ranges[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            shards = list(pool.map(parse_shard, [filepath] * len(ranges),
+                                   [r[0] for r in ranges], [r[1] for r in ranges]))
+
+    records = merge_records(shards)
+    if columnar:
+        from .columnar import ColumnarAnnotation
+        return ColumnarAnnotation.from_records(records)
+    return build_genes(records)
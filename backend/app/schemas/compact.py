@@ -0,0 +1,127 @@
+"""
+Compact wire formats for gene, match and comparison payloads.
+
+format=compact keeps the JSON shape of serialize_gene but replaces each
+transcript's list of exon dicts with one flat integer array of triples
+
+    [start delta, length, type code, start delta, length, type code, ...]
+
+where the first delta is from the gene start and each following one from
+the previous exon start (exons are sorted by start, so deltas are >= 0),
+length is end - start, and type codes index the payload's "types" table.
+Diffs flatten their exon pairs the same way, without deltas.
+
+format=binary sends gene lists as one ArrayBuffer-friendly body:
+
+    uint32 header length | UTF-8 JSON header (space-padded to 4 bytes) | int32 triples
+
+The header holds the types table and, per gene, [gene_id, chrom, strand,
+start, end, [[transcript_id, exon count], ...]]; the little-endian int32
+body holds every exon triple in header order. frontend/viz/wireFormat.js
+decodes both formats back into the regular JSON shape.
+"""
+import struct
+
+import numpy as np
+
+from .encoding import dumps
+
+FORMATS = ("json", "compact", "binary")
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+class TypeTable:
+    """Feature type -> small integer code, in first-seen order."""
+
+    def __init__(self):
+        self.types = []
+        self._codes = {}
+
+    def code(self, feature_type: str) -> int:
+        code = self._codes.get(feature_type)
+        if code is None:
+            code = self._codes[feature_type] = len(self.types)
+            self.types.append(feature_type)
+        return code
+
+
+def exon_triples(exons, base, types: TypeTable, out: list = None) -> list:
+    """Append delta-encoded (start delta, length, type code) triples for exon dicts."""
+    out = [] if out is None else out
+    previous = base or 0
+    for exon in exons:
+        out.append(exon["start"] - previous)
+        out.append(exon["end"] - exon["start"])
+        out.append(types.code(exon["type"]))
+        previous = exon["start"]
+    return out
+
+
+def compact_gene(gene: dict, types: TypeTable) -> dict:
+    """Compact form of a serialize_gene dict."""
+    return {
+        **gene,
+        "transcripts": [
+            {"transcript_id": tx["transcript_id"], "exons": exon_triples(tx["exons"], gene["start"], types)}
+            for tx in gene["transcripts"]
+        ]
+    }
+
+
+def _flat_exons(exons, types: TypeTable) -> list:
+    flat = []
+    for exon in exons:
+        flat += (exon["start"], exon["end"], types.code(exon["type"]))
+    return flat
+
+
+def _flat_pairs(pairs, types: TypeTable) -> list:
+    flat = []
+    for pair in pairs:
+        ref, pred = pair["ref"], pair["pred"]
+        flat += (ref["start"], ref["end"], types.code(ref["type"]),
+                 pred["start"], pred["end"], types.code(pred["type"]))
+    return flat
+
+
+def compact_diff(diff: dict, types: TypeTable) -> dict:
+    """
+    Compact form of a serialize_diff dict: missing/extra become flat
+    [start, end, type] runs and matched/partial flat
+    [ref start, ref end, ref type, pred start, pred end, pred type] runs.
+    """
+    return {
+        "reference_transcript": diff["reference_transcript"],
+        "predicted_transcript": diff["predicted_transcript"],
+        "matched": _flat_pairs(diff["matched"], types),
+        "missing": _flat_exons(diff["missing"], types),
+        "extra": _flat_exons(diff["extra"], types),
+        "partial": _flat_pairs(diff["partial"], types),
+    }
+
+
+def encode_binary(header: dict, body) -> bytes:
+    """Pack a JSON header and an int32 body as described in the module docstring."""
+    header_bytes = dumps(header)
+    header_bytes += b" " * (-len(header_bytes) % 4)
+    return (struct.pack("<I", len(header_bytes)) + header_bytes
+            + np.asarray(body, dtype="<i4").tobytes())
+
+
+def binary_genes(genes, header: dict = None) -> bytes:
+    """
+    Binary body for a list of serialize_gene dicts; extra header fields
+    (e.g. match metadata) are merged into the header.
+    """
+    types = TypeTable()
+    body = []
+    gene_headers = []
+    for gene in genes:
+        transcripts = []
+        for tx in gene["transcripts"]:
+            exon_triples(tx["exons"], gene["start"], types, body)
+            transcripts.append([tx["transcript_id"], len(tx["exons"])])
+        gene_headers.append([gene["gene_id"], gene["chrom"], gene["strand"],
+                             gene["start"], gene["end"], transcripts])
+    return encode_binary({**(header or {}), "format": "binary", "types": types.types,
+                          "genes": gene_headers}, body)
@@ -0,0 +1,34 @@
+"""
+Bytes-level JSON encoding for API responses.
+
+Handlers that return large payloads wrap them in JSONBytesResponse instead
+of returning a dict, so FastAPI skips its jsonable_encoder pass and the
+content is written straight to bytes: with orjson when it is installed,
+otherwise with the standard json module.
+"""
+import json
+
+from fastapi.responses import Response
+
+from app.telemetry.spans import timed
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+@timed("encode_json")
+def dumps(content) -> bytes:
+    """Encode JSON-compatible content (dicts, lists, str, int, float, None) to UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    """JSON response rendered with dumps(); content must already be JSON-compatible."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
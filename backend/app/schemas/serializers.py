@@ -0,0 +1,103 @@
+"""
+JSON-serializable views of parsed genes and transcript diffs.
+"""
+from app.parsing.columnar import GeneView, coord
+from app.telemetry.spans import timed
+
+
+@timed()
+def serialize_gene(gene):
+    """Convert Gene object to JSON-serializable dict."""
+    if isinstance(gene, GeneView):
+        return _serialize_gene_view(gene)
+    return {
+        "gene_id": gene.id,
+        "chrom": gene.chrom,
+        "start": gene.start,
+        "end": gene.end,
+        "strand": gene.strand,
+        "transcripts": [
+            {
+                "transcript_id": tx.id,
+                "exons": [serialize_exon(exon) for exon in tx.exons]
+            }
+            for tx in gene.transcripts
+        ]
+    }
+
+
+def _serialize_gene_view(gene):
+    """serialize_gene for a columnar GeneView, reading exon slices as lists."""
+    ann, g = gene._ann, gene._i
+    exon_offsets = ann.exon_offsets
+    feature_types = ann.feature_types
+    transcripts = []
+    for t in range(ann.tx_offsets[g], ann.tx_offsets[g + 1]):
+        lo, hi = exon_offsets[t], exon_offsets[t + 1]
+        transcripts.append({
+            "transcript_id": ann.tx_ids[t],
+            "exons": [
+                {"start": start, "end": end, "type": feature_types[code]}
+                for start, end, code in zip(ann.exon_start[lo:hi].tolist(), ann.exon_end[lo:hi].tolist(),
+                                            ann.exon_type[lo:hi].tolist())
+            ]
+        })
+    return {
+        "gene_id": ann.gene_ids[g],
+        "chrom": ann.chroms[ann.gene_chrom[g]],
+        "start": coord(ann.gene_start[g]),
+        "end": coord(ann.gene_end[g]),
+        "strand": ann.strands[ann.gene_strand[g]],
+        "transcripts": transcripts
+    }
+
+
+def serialize_exon(exon):
+    return {"start": exon.start, "end": exon.end, "type": exon.feature_type}
+
+
+def serialize_region_feature(feature, level):
+    """
+    Convert a RegionIndex.query result to a JSON-serializable dict: a gene,
+    a (gene, transcript) pair or a (gene, transcript, exon) triple.
+    """
+    if level == "gene":
+        return serialize_gene(feature)
+    if level == "transcript":
+        gene, tx = feature
+        return {
+            "gene_id": gene.id,
+            "transcript_id": tx.id,
+            "start": tx.start,
+            "end": tx.end,
+            "strand": tx.strand,
+            "exons": [serialize_exon(exon) for exon in tx.exons]
+        }
+    gene, tx, exon = feature
+    return {"gene_id": gene.id, "transcript_id": tx.id, "strand": tx.strand, **serialize_exon(exon)}
+
+
+def serialize_diff(ref_tx, pred_tx, diff):
+    """Convert a compare_transcripts result to a JSON-serializable dict."""
+    return {
+        "reference_transcript": ref_tx.id,
+        "predicted_transcript": pred_tx.id,
+        "matched": [
+            {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
+             "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
+            for r, p in diff["matched"]
+        ],
+        "missing": [
+            {"start": e.start, "end": e.end, "type": e.feature_type}
+            for e in diff["missing"]
+        ],
+        "extra": [
+            {"start": e.start, "end": e.end, "type": e.feature_type}
+            for e in diff["extra"]
+        ],
+        "partial": [
+            {"ref": {"start": r.start, "end": r.end, "type": r.feature_type},
+             "pred": {"start": p.start, "end": p.end, "type": p.feature_type}}
+            for r, p in diff["partial"]
+        ]
+    }
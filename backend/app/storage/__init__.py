@@ -0,0 +1 @@
+"""Server-side storage for parsed annotations."""
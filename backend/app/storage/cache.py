@@ -0,0 +1,100 @@
+"""
+Bounded LRU cache with a byte budget and time-to-live.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its entries.
+
+    Every entry is stored with a size in bytes supplied by the caller. Once the
+    total exceeds max_bytes, least-recently-used entries are evicted. Entries
+    not accessed for ttl seconds expire (ttl=None disables expiry).
+    """
+
+    def __init__(self, max_bytes: int, ttl: float = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, last_access)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, now):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            value, size, _ = entry
+            self._entries[key] = (value, size, now)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size: int) -> bool:
+        """
+        Store value under key; returns False (and stores nothing) when size
+        alone exceeds max_bytes, since it would evict everything else.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = (value, size, now)
+            self._total_bytes += size
+            self._evict(now)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry[2] > self.ttl
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def _evict(self, now):
+        # Expired entries go first, then least recently used until under budget
+        if self.ttl is not None:
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                self._remove(key)
+                self.evictions += 1
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
@@ -0,0 +1,211 @@
+"""
+Session store for uploaded GFF3 annotations.
+
+Each upload is parsed once and kept in memory under a dataset ID derived from
+the SHA-256 of its content, so later requests can refer to it by ID instead
+of re-sending and re-parsing the file.
+"""
+import hashlib
+import io
+import os
+import shutil
+import sys
+import threading
+
+from app.comparison.index import RegionIndex
+from app.parsing.bgzf import has_gzip_magic, is_bgzf, load_or_build_index
+from app.parsing.binary_cache import cached_parse, entry_file, evict
+from app.parsing.columnar import ColumnarAnnotation
+from app.parsing.gff3_parser import parse_gff3_region, parse_gff3_stream, CHUNK_SIZE
+from app.parsing.models import Exon
+from .cache import LRUCache
+
+DEFAULT_MAX_BYTES = int(os.environ.get("GFF3_DATASET_CACHE_BYTES", 1024 ** 3))
+DEFAULT_TTL = float(os.environ.get("GFF3_DATASET_TTL", 3600))
+# Store annotations as NumPy columns (see app.parsing.columnar) instead of objects
+DEFAULT_COLUMNAR = os.environ.get("GFF3_COLUMNAR", "0") == "1"
+# Persist parsed annotations across restarts (see app.parsing.binary_cache);
+# sorted bgzip uploads are also kept in their cache entry with a coordinate index
+DEFAULT_CACHE_DIR = os.environ.get("GFF3_CACHE_DIR") or None
+
+
+class DatasetError(Exception):
+    """Base error for dataset lookups; carries the HTTP status to report."""
+    status_code = 400
+
+
+class DatasetNotFound(DatasetError):
+    """Raised when a dataset ID is unknown or has been evicted."""
+    status_code = 404
+
+    def __init__(self, dataset_id: str, label: str = "dataset"):
+        self.dataset_id = dataset_id
+        super().__init__(f"Unknown {label} dataset {dataset_id}; upload the file again")
+
+
+class DatasetTooLarge(DatasetError):
+    """Raised when a parsed upload alone exceeds the store's memory budget."""
+    status_code = 413
+
+    def __init__(self, nbytes: int, max_bytes: int):
+        super().__init__(
+            f"Parsed annotation needs about {nbytes / 1024 ** 2:.1f} MiB, more than the "
+            f"{max_bytes / 1024 ** 2:.1f} MiB dataset budget (GFF3_DATASET_CACHE_BYTES)"
+        )
+
+
+# One exon object with two non-cached ints, plus its slot in the exon list
+_EXON_BYTES = sys.getsizeof(Exon(1 << 20, 1 << 20, "exon")) + 2 * sys.getsizeof(1 << 20) + 8
+
+
+def estimate_nbytes(genes) -> int:
+    """Approximate memory held by a parsed annotation (dict of Gene or ColumnarAnnotation)."""
+    if isinstance(genes, ColumnarAnnotation):
+        return genes.memory_bytes()
+    total = sys.getsizeof(genes)
+    for gene_id, gene in genes.items():
+        total += sys.getsizeof(gene) + sys.getsizeof(gene_id) + sys.getsizeof(gene.transcripts)
+        for tx in gene.transcripts:
+            total += (sys.getsizeof(tx) + sys.getsizeof(tx.id) + sys.getsizeof(tx.exons)
+                      + sys.getsizeof(tx.cds) + len(tx.exons) * _EXON_BYTES)
+    return total
+
+
+class Dataset:
+    def __init__(self, dataset_id: str, genes: dict, size: int, filename: str = None,
+                 bgzf_path: str = None):
+        self.id = dataset_id
+        self.genes = genes
+        self.size = size  # source bytes
+        self.nbytes = estimate_nbytes(genes)  # parsed size, used as the cache weight
+        self.filename = filename
+        self.bgzf_path = bgzf_path  # indexed bgzip copy of the upload, if any
+        self._region_index = None
+        self._region_lock = threading.Lock()
+
+    @property
+    def region_index(self) -> RegionIndex:
+        """Interval index for window queries, built on first use."""
+        with self._region_lock:
+            if self._region_index is None:
+                self._region_index = RegionIndex(self.genes)
+            return self._region_index
+
+    def query_region(self, chrom: str, start: int, end: int, level: str = "gene") -> list:
+        """
+        Features overlapping chrom:[start, end], as RegionIndex.query. The
+        in-memory region_index answers whenever the genes are loaded; only a
+        dataset without them falls back to parsing the blocks of its indexed
+        bgzip copy that span the window.
+        """
+        if self.genes is None and self.bgzf_path is not None:
+            window = parse_gff3_region(self.bgzf_path, chrom, start, end)
+            return RegionIndex(window).query(chrom, start, end, level)
+        return self.region_index.query(chrom, start, end, level)
+
+
+def hash_file(fileobj) -> tuple:
+    """
+    Hash a seekable file object chunk by chunk and rewind it.
+    Returns (dataset_id, size_in_bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+class DatasetStore:
+    """
+    Parsed annotations keyed by content hash, bounded by an LRU byte budget
+    (measured as the estimated in-memory size of each parsed annotation) and
+    a TTL on last access.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL,
+                 columnar: bool = DEFAULT_COLUMNAR, cache_dir: str = DEFAULT_CACHE_DIR):
+        self._cache = LRUCache(max_bytes, ttl)
+        self.columnar = columnar
+        self.cache_dir = cache_dir
+
+    def get(self, dataset_id: str, label: str = "dataset") -> Dataset:
+        dataset = self._cache.get(dataset_id)
+        if dataset is None:
+            raise DatasetNotFound(dataset_id, label)
+        return dataset
+
+    def add(self, source, filename: str = None) -> tuple:
+        """
+        Store an upload, parsing it only if its content hash is new.
+        source is raw bytes or a seekable binary file object such as
+        UploadFile.file, which is parsed in place without a temp-file copy.
+        Returns (dataset, cached).
+        """
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        dataset_id, size = hash_file(source)
+        dataset = self._cache.get(dataset_id)
+        if dataset is not None:
+            return dataset, True
+
+        if self.cache_dir:
+            genes = cached_parse(
+                dataset_id, self.cache_dir,
+                lambda: parse_gff3_stream(source, columnar=True),
+                columnar=self.columnar,
+            )
+        else:
+            genes = parse_gff3_stream(source, columnar=self.columnar)
+        bgzf_path = self._keep_bgzf(dataset_id, source) if self.cache_dir else None
+        dataset = Dataset(dataset_id, genes, size=size, filename=filename, bgzf_path=bgzf_path)
+        if not self._cache.put(dataset_id, dataset, dataset.nbytes):
+            raise DatasetTooLarge(dataset.nbytes, self._cache.max_bytes)
+        return dataset, False
+
+    def _keep_bgzf(self, dataset_id: str, source):
+        """
+        Copy a bgzip upload into its binary cache entry and build its
+        coordinate index there, so both are budgeted and evicted with the
+        entry. Returns the copy's path, or None (and no copy) for other
+        input or files that cannot be indexed, such as unsorted ones.
+        """
+        source.seek(0)
+        head = source.read(2)
+        source.seek(0)
+        path = entry_file(self.cache_dir, dataset_id, "source.gff3.gz")
+        if not has_gzip_magic(head) or path is None:
+            return None
+        try:
+            if not os.path.exists(path):
+                staging = os.path.join(os.path.dirname(path), f".source.{os.getpid()}.{threading.get_ident()}")
+                with open(staging, "wb") as f:
+                    shutil.copyfileobj(source, f, CHUNK_SIZE)
+                os.replace(staging, path)
+            if is_bgzf(path):
+                load_or_build_index(path)
+                evict(self.cache_dir)
+                return path
+        except ValueError:  # BgzfError, or a malformed coordinate
+            pass
+        except OSError:  # entry evicted meanwhile
+            return None
+        finally:
+            source.seek(0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    def remove(self, dataset_id: str) -> bool:
+        return self._cache.pop(dataset_id) is not None
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+store = DatasetStore()
@@ -0,0 +1 @@
+"""Lightweight timing spans exported as Prometheus metrics and Server-Timing headers."""
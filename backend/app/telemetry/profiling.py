@@ -0,0 +1,249 @@
+"""
+On-demand request profiling.
+
+Enabled by setting GFF3_PROFILE_TOKEN. A request carrying the header
+
+    X-Profile: <token>
+
+runs its route handler under cProfile and, at the same time, under a
+sampling thread that records the handler thread's Python stack every
+GFF3_PROFILE_INTERVAL seconds. If a handler ran (so a profile was stored),
+the response gets an X-Profile-Id header; the profile is kept in memory (the last GFF3_PROFILE_KEEP requests, and
+also written to GFF3_PROFILE_DIR when set) and served by the /api/profiles
+endpoints (authorized with an X-Profile-Token: <token> header) as
+
+    .pstats   marshalled cProfile stats (pstats.Stats / snakeviz / gprof2dot)
+    .txt      collapsed stacks, one "frame;frame;frame count" per line
+              (flamegraph.pl, speedscope, inferno)
+
+Only the handler thread is profiled: work done in render or parse worker
+processes shows up as time waiting on the pool, and the body of a streamed
+response is produced after profiling has stopped. cProfile slows the
+profiled code down, which also stretches the sampled stacks; compare
+proportions, not absolute times.
+
+Without a token, profiled() returns handlers unchanged and the middleware
+is not installed.
+"""
+import cProfile
+import hmac
+import inspect
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+
+from fastapi.routing import APIRoute
+
+PROFILE_TOKEN = os.environ.get("GFF3_PROFILE_TOKEN") or None
+ENABLED = PROFILE_TOKEN is not None
+SAMPLE_INTERVAL = float(os.environ.get("GFF3_PROFILE_INTERVAL", 0.005))
+MAX_PROFILES = int(os.environ.get("GFF3_PROFILE_KEEP", 20))
+PROFILE_DIR = os.environ.get("GFF3_PROFILE_DIR") or None
+
+REQUEST_HEADER = b"x-profile"
+RESPONSE_HEADER = b"x-profile-id"
+# Header authorizing the /api/profiles endpoints (separate from X-Profile so
+# fetching a profile does not itself get profiled)
+ADMIN_HEADER = "X-Profile-Token"
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="gff3-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profiled request."""
+
+    def __init__(self, method: str, path: str):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.created = time.time()
+        self.seconds = None
+        self.samples = 0
+        self.pstats = None
+        self.collapsed = None
+        self.stored = False  # set once the profile is in the ProfileStore
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn under cProfile and the stack sampler, keeping their output."""
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            self.seconds = time.perf_counter() - started
+            sampler.stop()
+            profiler.create_stats()
+            self.pstats = marshal.dumps(profiler.stats)
+            self.collapsed = sampler.collapsed()
+            self.samples = sum(sampler.stacks.values())
+            profiles.add(self)
+            self.stored = True
+
+    def top(self, limit: int = 30, sort: str = "cumulative") -> str:
+        """pstats text report of the top functions."""
+        out = io.StringIO()
+        stats = pstats.Stats(_StatsSource(marshal.loads(self.pstats)), stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def to_dict(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "created": self.created,
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "samples": self.samples,
+        }
+
+
+class _StatsSource:
+    """Minimal object pstats.Stats accepts in place of a profiler."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileStore:
+    """The most recent profiles, oldest evicted first."""
+
+    def __init__(self, max_profiles: int = MAX_PROFILES, directory: str = PROFILE_DIR):
+        self.max_profiles = max_profiles
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, profile.profile_id)
+            with open(base + ".pstats", "wb") as f:
+                f.write(profile.pstats)
+            with open(base + ".txt", "w") as f:
+                f.write(profile.collapsed)
+
+    def get(self, profile_id: str):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [profile.to_dict() for profile in reversed(self._profiles.values())]
+
+
+profiles = ProfileStore()
+
+# Profile for the current request, set by ProfilingMiddleware
+_current_profile = ContextVar("gff3_profile", default=None)
+
+
+def authorized(token) -> bool:
+    """Constant-time check of a str or bytes token against GFF3_PROFILE_TOKEN."""
+    if not ENABLED or token is None:
+        return False
+    if isinstance(token, str):
+        token = token.encode("utf-8", "surrogateescape")
+    return hmac.compare_digest(token, PROFILE_TOKEN.encode("utf-8", "surrogateescape"))
+
+
+def profiled(endpoint):
+    """
+    Wrap a sync route handler so it runs under the current request's
+    Profile, if any. The wrapper stays sync, so FastAPI still runs it in its
+    thread pool and the profile covers the handler thread. Async handlers
+    are returned unchanged (their work interleaves on the event loop).
+    """
+    if not ENABLED or inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.run(endpoint, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose handler is wrapped with profiled()."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware starting a Profile for requests with a valid X-Profile header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(REQUEST_HEADER)
+        if not authorized(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"])
+        reset = _current_profile.set(profile)
+
+        async def send_with_id(message):
+            # The handler has returned by the time the response starts; if none
+            # ran (404, validation error) there is no profile to point to
+            if message["type"] == "http.response.start" and profile.stored:
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (RESPONSE_HEADER, profile.profile_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _current_profile.reset(reset)
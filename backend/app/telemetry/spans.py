@@ -0,0 +1,223 @@
+"""
+Timing spans for hot paths, exported as Prometheus histograms and
+per-request Server-Timing headers.
+
+Enabled with GFF3_METRICS=1. When disabled, span() returns a shared no-op
+context manager and @timed returns the function unchanged, so instrumented
+code pays nothing beyond the decoration at import time.
+
+    with span("find_matching_genes"):
+        ...
+
+    @timed("serialize_gene")
+    def serialize_gene(gene): ...
+
+Every finished span is observed in the gff3_span_seconds histogram and, when
+it runs inside a request handled by TimingMiddleware (including sync
+handlers run in the thread pool), added to that request's Server-Timing
+header as total duration and call count per span name. Spans inside render
+or parse worker processes are only visible through the span around the
+pool call in the parent.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+ENABLED = os.environ.get("GFF3_METRICS", "0") == "1"
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "gff3_span_seconds": "Time spent in instrumented code paths.",
+    "gff3_request_seconds": "HTTP request duration by handler.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with Prometheus semantics."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: tuple) -> str:
+    return ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+
+
+def _bucket_labels(histogram: Histogram) -> list:
+    return [repr(float(bound)) for bound in histogram.buckets] + ["+Inf"]
+
+
+class Registry:
+    """Histograms keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, metric: str, labels: tuple, value: float):
+        with self._lock:
+            histogram = self._histograms.get((metric, labels))
+            if histogram is None:
+                histogram = self._histograms[(metric, labels)] = Histogram()
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            previous = None
+            for (metric, labels), histogram in items:
+                if metric != previous:
+                    lines.append(f"# HELP {metric} {METRIC_HELP.get(metric, metric)}")
+                    lines.append(f"# TYPE {metric} histogram")
+                    previous = metric
+                prefix = _labels(labels)
+                sep = "," if prefix else ""
+                cumulative = 0
+                for bound, count in zip(_bucket_labels(histogram), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{prefix}{sep}le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{prefix}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{prefix}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = Registry()
+
+# name -> [total seconds, calls] for the current request, set by TimingMiddleware
+_request_timings = ContextVar("gff3_request_timings", default=None)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times its with-block and records the duration under name."""
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def record(name: str, seconds: float):
+    """Record a duration measured elsewhere as if it were a span."""
+    registry.observe("gff3_span_seconds", (("span", name),), seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.get(name)
+        if entry is None:
+            timings[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+def span(name: str):
+    """Context manager timing a block as name (no-op when metrics are disabled)."""
+    return Span(name) if ENABLED else _NULL_SPAN
+
+
+def timed(name: str = None):
+    """Decorator timing every call as name (default: the function's name)."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(timings: dict, total: float) -> str:
+    """Server-Timing header value for a request's span timings (seconds)."""
+    parts = []
+    for name, (seconds, calls) in timings.items():
+        part = f"{name};dur={seconds * 1000:.2f}"
+        if calls > 1:
+            part += f';desc="{calls} calls"'
+        parts.append(part)
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header to every HTTP response and
+    observing request durations in gff3_request_seconds by method and handler.
+    Streaming responses only report spans finished before their headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = server_timing(timings, time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # Handler name rather than the raw path keeps label cardinality bounded
+            handler = getattr(scope.get("route"), "name", None) or "other"
+            registry.observe("gff3_request_seconds", (("method", scope["method"]), ("handler", handler)),
+                             time.perf_counter() - started)
@@ -0,0 +1,196 @@
+"""
+Binned level-of-detail summaries of whole-genome gene matches.
+
+Matches are aggregated with NumPy into fixed-size bins per chromosome
+(match count, mean overlap ratio, missing/extra exon rates). Bins are
+precomputed at several zoom levels, each LEVEL_FACTOR times coarser than the
+last, so any region can be summarized by slicing the coarsest level that
+still gives enough resolution: the cost depends on the number of bins
+drawn, not on the number of genes.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from app.comparison.align import compare_transcripts_batch
+from app.comparison.matching import find_matching_genes, transcript_pairs
+from app.storage.cache import LRUCache
+
+BASE_BIN_SIZE = 10_000
+LEVEL_FACTOR = 4
+MAX_BINS = 1000
+
+METRICS = ("count", "overlap", "missing_rate", "extra_rate")
+
+# Pyramids per (ref dataset, pred dataset, threshold); small next to the datasets
+pyramid_cache = LRUCache(64 * 1024 ** 2)
+
+
+def match_stats(ref_genes, pred_genes, matches):
+    """
+    Per-match summary used for binning: chromosome and position of the
+    reference gene, overlap ratio, and exon counts from transcript diffs.
+    """
+    gene_pairs = [(ref_genes[r], pred_genes[p]) for r, p, _ in matches]
+    per_gene = [transcript_pairs(ref_gene, pred_gene) for ref_gene, pred_gene in gene_pairs]
+    diffs = iter(compare_transcripts_batch([pair for pairs in per_gene for pair in pairs]))
+
+    n = len(matches)
+    stats = {
+        "chrom": [ref_gene.chrom for ref_gene, _ in gene_pairs],
+        "position": np.fromiter((g.start for g, _ in gene_pairs), dtype=np.int64, count=n),
+        "overlap": np.fromiter((ratio for _, _, ratio in matches), dtype=np.float64, count=n),
+        "missing": np.zeros(n), "extra": np.zeros(n),
+        "ref_exons": np.zeros(n), "pred_exons": np.zeros(n),
+    }
+    for i, pairs in enumerate(per_gene):
+        for ref_tx, pred_tx in pairs:
+            diff = next(diffs)
+            stats["missing"][i] += len(diff["missing"])
+            stats["extra"][i] += len(diff["extra"])
+            stats["ref_exons"][i] += len(ref_tx.exons)
+            stats["pred_exons"][i] += len(pred_tx.exons)
+    return stats
+
+
+class OverviewPyramid:
+    """Multi-resolution per-chromosome bins of match statistics."""
+
+    def __init__(self, stats, base_bin_size: int = BASE_BIN_SIZE, factor: int = LEVEL_FACTOR):
+        self.base_bin_size = base_bin_size
+        self.factor = factor
+        self.total_matches = len(stats["chrom"])
+
+        by_chrom = defaultdict(list)
+        for i, chrom in enumerate(stats["chrom"]):
+            by_chrom[chrom].append(i)
+        self.chroms = sorted(by_chrom)
+
+        # levels[chrom] -> list of dicts of per-bin sums, finest first
+        self.levels = {}
+        self.chrom_ends = {}
+        for chrom in self.chroms:
+            idx = np.asarray(by_chrom[chrom])
+            position = stats["position"][idx]
+            self.chrom_ends[chrom] = int(position.max()) + 1
+            sums = {key: stats[key][idx] for key in ("overlap", "missing", "extra", "ref_exons", "pred_exons")}
+            sums["count"] = np.ones(len(idx))
+
+            levels = []
+            bin_size = base_bin_size
+            while True:
+                bins = position // bin_size
+                n_bins = int(bins.max()) + 1
+                levels.append({
+                    key: np.bincount(bins, weights=values, minlength=n_bins)
+                    for key, values in sums.items()
+                })
+                if n_bins <= MAX_BINS:
+                    break
+                bin_size *= factor
+            self.levels[chrom] = levels
+
+        self.nbytes = sum(
+            arr.nbytes for levels in self.levels.values() for level in levels for arr in level.values()
+        )
+
+    def bin_size(self, level: int) -> int:
+        return self.base_bin_size * self.factor ** level
+
+    def choose_level(self, start: int, end: int, max_bins: int = MAX_BINS) -> int:
+        """Finest level whose bins cover [start, end] in at most max_bins bins."""
+        level = 0
+        while end // self.bin_size(level) - start // self.bin_size(level) + 1 > max(1, max_bins):
+            level += 1
+        return level
+
+    def level_sums(self, chrom: str, level: int) -> dict:
+        """
+        Per-bin sums for chrom at level; levels coarser than the stored ones
+        are summed from the coarsest stored level (at most MAX_BINS bins).
+        """
+        levels = self.levels[chrom]
+        if level < len(levels):
+            return levels[level]
+        group = self.factor ** (level - len(levels) + 1)
+        coarsest = levels[-1]
+        n_bins = -(-len(coarsest["count"]) // group)
+        return {
+            key: np.pad(arr, (0, n_bins * group - len(arr))).reshape(n_bins, group).sum(axis=1)
+            for key, arr in coarsest.items()
+        }
+
+    def region(self, chrom: str, start: int = None, end: int = None, metric: str = "overlap",
+               max_bins: int = MAX_BINS):
+        """
+        Metric values for the bins covering [start, end] on chrom, clamped to
+        the chromosome's extent; never more than max_bins bins, so the cost
+        does not depend on the requested span.
+        Returns (values, first_bin_start, bin_size); empty bins are NaN.
+        """
+        last = self.chrom_ends[chrom] - 1
+        start = 0 if start is None else max(0, start)
+        end = last if end is None else min(end, last)
+        if start > end:
+            return np.empty(0), start, self.base_bin_size
+
+        level = self.choose_level(start, end, max_bins)
+        bin_size = self.bin_size(level)
+        lo, hi = start // bin_size, end // bin_size + 1
+        window = {key: _window(arr, lo, hi) for key, arr in self.level_sums(chrom, level).items()}
+        return _metric(window, metric), lo * bin_size, bin_size
+
+    def genome(self, metric: str = "overlap", max_bins: int = MAX_BINS):
+        """
+        Metric matrix with one row per chromosome, all at a shared bin size
+        chosen so the longest chromosome fits in max_bins.
+        Returns (matrix, chroms, bin_size).
+        """
+        if not self.chroms:
+            return np.empty((0, 0)), [], self.base_bin_size
+        last = max(self.chrom_ends.values()) - 1
+        level = self.choose_level(0, last, max_bins)
+        bin_size = self.bin_size(level)
+        n_bins = last // bin_size + 1
+        rows = [
+            _metric({key: _window(arr, 0, n_bins) for key, arr in self.level_sums(chrom, level).items()}, metric)
+            for chrom in self.chroms
+        ]
+        return np.vstack(rows), self.chroms, bin_size
+
+
+def _window(arr, lo, hi):
+    out = np.zeros(hi - lo)
+    if lo < len(arr):
+        chunk = arr[lo:min(hi, len(arr))]
+        out[:len(chunk)] = chunk
+    return out
+
+
+def _metric(window, metric):
+    count = window["count"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if metric == "count":
+            values = count.copy()
+        elif metric == "overlap":
+            values = window["overlap"] / count
+        elif metric == "missing_rate":
+            values = window["missing"] / window["ref_exons"]
+        elif metric == "extra_rate":
+            values = window["extra"] / window["pred_exons"]
+        else:
+            raise ValueError(f"Unknown overview metric {metric!r}; expected one of {METRICS}")
+    values[count == 0] = np.nan
+    return values
+
+
+def get_pyramid(ref_dataset, pred_dataset, overlap_threshold: float) -> OverviewPyramid:
+    """Build (or fetch) the overview pyramid for two stored datasets."""
+    key = (ref_dataset.id, pred_dataset.id, overlap_threshold)
+    pyramid = pyramid_cache.get(key)
+    if pyramid is None:
+        ref_genes, pred_genes = ref_dataset.genes, pred_dataset.genes
+        matches = find_matching_genes(ref_genes, pred_genes, overlap_threshold)
+        pyramid = OverviewPyramid(match_stats(ref_genes, pred_genes, matches))
+        pyramid_cache.put(key, pyramid, pyramid.nbytes)
+    return pyramid
@@ -1,16 +1,69 @@
 """
 Matplotlib-based visualization for gene structure comparisons.
 Generates static images showing gene comparisons.
+
+Figures are built with the object-oriented Figure API rather than pyplot,
+so no global figure state is shared between concurrent renders.
 """
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.patches as mpatches
 from matplotlib.patches import Rectangle, FancyBboxPatch
 import numpy as np
 from io import BytesIO
 import base64
 
+from app.telemetry.spans import timed
+
+# Matches drawn individually by create_overview_plot; larger sets should use
+# the binned overview (create_binned_overview_plot)
+OVERVIEW_GENE_LIMIT = 50
+
+def _exon_ranges(exons):
+    """(start, width) pairs for broken_barh."""
+    return [(e['start'], e['end'] - e['start']) for e in exons]
+
+
+def _draw_transcript_tracks(ax, transcripts, y_pos, color, label, label_x, tx_label_x,
+                            track_height, track_spacing):
+    """
+    Draw one block of transcript tracks. Each track is a single dashed
+    connector (shared LineCollection) plus one broken_barh artist per exon
+    style, so the artist count does not grow with the number of exons.
+    """
+    ax.text(label_x, y_pos + track_height/2,
+            label, ha='right', va='center', fontweight='bold', fontsize=11)
+
+    height = track_height * 0.6
+    line_y, line_start, line_end = [], [], []
+    for tx_idx, tx in enumerate(transcripts):
+        tx_y = y_pos - tx_idx * track_spacing
+
+        if tx['exons']:
+            line_y.append(tx_y)
+            line_start.append(min(e['start'] for e in tx['exons']))
+            line_end.append(max(e['end'] for e in tx['exons']))
+
+        # Different style for CDS vs exon
+        cds = [e for e in tx['exons'] if e['type'] == 'CDS']
+        other = [e for e in tx['exons'] if e['type'] != 'CDS']
+        for exons, alpha in ((other, 0.7), (cds, 1.0)):
+            if exons:
+                ax.broken_barh(_exon_ranges(exons), (tx_y - height/2, height),
+                               facecolor=color, edgecolor='black',
+                               linewidth=1.5, alpha=alpha, zorder=2)
+
+        # Transcript label
+        ax.text(tx_label_x, tx_y,
+                tx['transcript_id'], ha='right', va='center',
+                fontsize=9, style='italic')
+
+    if line_y:
+        ax.hlines(line_y, line_start, line_end,
+                  color='gray', linestyle='--', linewidth=1, alpha=0.5, zorder=1)
+
+
 def plot_gene_comparison(ref_gene, pred_gene, ref_transcripts, pred_transcripts, 
-                         comparison_data=None, figsize=(14, 8)):
+                         comparison_data=None, figsize=None):
     """
     Create a matplotlib figure comparing reference and predicted gene structures.
     
@@ -20,16 +73,19 @@ def plot_gene_comparison(ref_gene, pred_gene, ref_transcripts, pred_transcripts,
         ref_transcripts: List of reference transcript dicts
         pred_transcripts: List of predicted transcript dicts
         comparison_data: Optional comparison results
-        figsize: Figure size tuple
+        figsize: Figure size tuple (default: 14 wide, height scaled with
+            the number of tracks)
     
     Returns:
         matplotlib.figure.Figure
     """
+    comparison_data = comparison_data or []
+    if figsize is None:
+        n_tracks = len(ref_transcripts) + len(pred_transcripts) + len(comparison_data)
+        figsize = (14, max(8, 2 + 0.45 * n_tracks))
 
-    ref_transcripts = ref_transcripts[:5]
-    pred_transcripts = pred_transcripts[:5]
-
-    fig, ax = plt.subplots(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
     
     # Calculate bounds
     min_start = min(ref_gene['start'], pred_gene['start'])
@@ -40,6 +96,8 @@ def plot_gene_comparison(ref_gene, pred_gene, ref_transcripts, pred_transcripts,
     # Set up coordinate system
     x_min = min_start - padding
     x_max = max_end + padding
+    label_x = x_min - range_size * 0.1
+    tx_label_x = x_min - range_size * 0.08
     
     # Track positions
     y_pos = 0
@@ -54,122 +112,54 @@ def plot_gene_comparison(ref_gene, pred_gene, ref_transcripts, pred_transcripts,
     extra_color = '#f39c12'  # Yellow
     
     # Draw reference transcripts
-    ax.text(x_min - range_size * 0.1, y_pos + track_height/2, 
-            'Reference', ha='right', va='center', fontweight='bold', fontsize=11)
-    
-    for tx_idx, tx in enumerate(ref_transcripts):
-        tx_y = y_pos - tx_idx * track_spacing
-        
-        # Draw connecting line
-        if tx['exons']:
-            tx_start = min(e['start'] for e in tx['exons'])
-            tx_end = max(e['end'] for e in tx['exons'])
-            ax.plot([tx_start, tx_end], [tx_y, tx_y], 
-                   color='gray', linestyle='--', linewidth=1, alpha=0.5, zorder=1)
-        
-        # Draw exons
-        for exon in tx['exons']:
-            width = exon['end'] - exon['start']
-            height = track_height * 0.6
-            y_offset = tx_y - height/2
-            
-            # Different style for CDS vs exon
-            alpha = 1.0 if exon['type'] == 'CDS' else 0.7
-            
-            rect = Rectangle((exon['start'], y_offset), width, height,
-                           facecolor=ref_color, edgecolor='black', 
-                           linewidth=1.5, alpha=alpha, zorder=2)
-            ax.add_patch(rect)
-        
-        # Transcript label
-        ax.text(x_min - range_size * 0.08, tx_y, 
-               tx['transcript_id'], ha='right', va='center', 
-               fontsize=9, style='italic')
-    
+    _draw_transcript_tracks(ax, ref_transcripts, y_pos, ref_color, 'Reference',
+                            label_x, tx_label_x, track_height, track_spacing)
     y_pos -= len(ref_transcripts) * track_spacing + 0.5
     
     # Draw predicted transcripts
-    ax.text(x_min - range_size * 0.1, y_pos + track_height/2, 
-            'Predicted', ha='right', va='center', fontweight='bold', fontsize=11)
-    
-    for tx_idx, tx in enumerate(pred_transcripts):
-        tx_y = y_pos - tx_idx * track_spacing
-        
-        # Draw connecting line
-        if tx['exons']:
-            tx_start = min(e['start'] for e in tx['exons'])
-            tx_end = max(e['end'] for e in tx['exons'])
-            ax.plot([tx_start, tx_end], [tx_y, tx_y], 
-                   color='gray', linestyle='--', linewidth=1, alpha=0.5, zorder=1)
-        
-        # Draw exons
-        for exon in tx['exons']:
-            width = exon['end'] - exon['start']
-            height = track_height * 0.6
-            y_offset = tx_y - height/2
-            
-            alpha = 1.0 if exon['type'] == 'CDS' else 0.7
-            
-            rect = Rectangle((exon['start'], y_offset), width, height,
-                           facecolor=pred_color, edgecolor='black', 
-                           linewidth=1.5, alpha=alpha, zorder=2)
-            ax.add_patch(rect)
-        
-        # Transcript label
-        ax.text(x_min - range_size * 0.08, tx_y, 
-               tx['transcript_id'], ha='right', va='center', 
-               fontsize=9, style='italic')
-    
+    _draw_transcript_tracks(ax, pred_transcripts, y_pos, pred_color, 'Predicted',
+                            label_x, tx_label_x, track_height, track_spacing)
     y_pos -= len(pred_transcripts) * track_spacing + 0.5
     
-    # Draw comparison track if comparison data provided
-    if comparison_data and len(comparison_data) > 0:
-        ax.text(x_min - range_size * 0.1, y_pos + track_height/2, 
+    # Draw comparison track if comparison data provided: one artist per
+    # row and status (overlap, missing, extra)
+    if comparison_data:
+        ax.text(label_x, y_pos + track_height/2, 
                 'Comparison', ha='right', va='center', fontweight='bold', fontsize=11)
         
         for comp_idx, comp in enumerate(comparison_data):
             comp_y = y_pos - comp_idx * track_spacing
             
             # Draw overlaps
-            if 'matched' in comp:
-                for match in comp['matched']:
-                    if 'ref' in match and 'pred' in match:
-                        ref_exon = match['ref']
-                        pred_exon = match['pred']
-                        overlap_start = max(ref_exon['start'], pred_exon['start'])
-                        overlap_end = min(ref_exon['end'], pred_exon['end'])
-                        if overlap_start < overlap_end:
-                            width = overlap_end - overlap_start
-                            height = track_height * 0.6
-                            rect = Rectangle((overlap_start, comp_y - height/2), 
-                                           width, height,
-                                           facecolor=overlap_color, 
-                                           edgecolor='black', linewidth=1.5, zorder=3)
-                            ax.add_patch(rect)
+            overlaps = []
+            for match in comp.get('matched', []):
+                if 'ref' in match and 'pred' in match:
+                    overlap_start = max(match['ref']['start'], match['pred']['start'])
+                    overlap_end = min(match['ref']['end'], match['pred']['end'])
+                    if overlap_start < overlap_end:
+                        overlaps.append((overlap_start, overlap_end - overlap_start))
+            if overlaps:
+                height = track_height * 0.6
+                ax.broken_barh(overlaps, (comp_y - height/2, height),
+                               facecolor=overlap_color,
+                               edgecolor='black', linewidth=1.5, zorder=3)
             
             # Draw missing (in ref but not pred)
-            if 'missing' in comp:
-                for exon in comp['missing']:
-                    width = exon['end'] - exon['start']
-                    height = track_height * 0.4
-                    rect = Rectangle((exon['start'], comp_y - height/2), 
-                                   width, height,
-                                   facecolor=missing_color, 
-                                   edgecolor='black', linewidth=1.5,
-                                   linestyle='--', zorder=2)
-                    ax.add_patch(rect)
+            height = track_height * 0.4
+            if comp.get('missing'):
+                ax.broken_barh(_exon_ranges(comp['missing']), (comp_y - height/2, height),
+                               facecolor=missing_color,
+                               edgecolor='black', linewidth=1.5,
+                               linestyle='--', zorder=2)
             
             # Draw extra (in pred but not ref)
-            if 'extra' in comp:
-                for exon in comp['extra']:
-                    width = exon['end'] - exon['start']
-                    height = track_height * 0.4
-                    rect = Rectangle((exon['start'], comp_y + height/2), 
-                                   width, height,
-                                   facecolor=extra_color, 
-                                   edgecolor='black', linewidth=1.5,
-                                   linestyle='--', zorder=2)
-                    ax.add_patch(rect)
+            if comp.get('extra'):
+                ax.broken_barh(_exon_ranges(comp['extra']), (comp_y + height/2, height),
+                               facecolor=extra_color,
+                               edgecolor='black', linewidth=1.5,
+                               linestyle='--', zorder=2)
+
+        y_pos -= len(comparison_data) * track_spacing
     
     # Set axis properties
     ax.set_xlim(x_min, x_max)
@@ -203,18 +193,22 @@ def plot_gene_comparison(ref_gene, pred_gene, ref_transcripts, pred_transcripts,
     ax.tick_params(axis='y', labelsize=9)
     ax.grid(axis='x', alpha=0.3, linestyle=':', linewidth=0.5)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
+@timed()
+def figure_to_bytes(fig, fmt='png', dpi=150):
+    """Encode a matplotlib figure as image bytes in the given format."""
+    buf = BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+    return buf.getvalue()
+
+
+@timed()
 def plot_to_base64(fig):
     """Convert matplotlib figure to base64 encoded PNG."""
-    buf = BytesIO()
-    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return img_base64
+    return base64.b64encode(figure_to_bytes(fig)).decode('utf-8')
 
 
 def create_overview_plot(matches, figsize=(16, 10)):
@@ -228,7 +222,8 @@ def create_overview_plot(matches, figsize=(16, 10)):
     Returns:
         matplotlib.figure.Figure
     """
-    fig, ax = plt.subplots(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
     
     if not matches:
         ax.text(0.5, 0.5, 'No gene matches found', 
@@ -249,7 +244,8 @@ def create_overview_plot(matches, figsize=(16, 10)):
     pred_color = '#f5a623'
     overlap_color = '#50c878'
     
-    for match_idx, match in enumerate(sorted_matches[:50]):  # Limit to 50 for readability
+    shown = sorted_matches[:OVERVIEW_GENE_LIMIT]  # Limit for readability
+    for match_idx, match in enumerate(shown):
         ref_gene = match['ref_gene']
         pred_gene = match['pred_gene']
         overlap_ratio = match['overlap_ratio']
@@ -290,15 +286,16 @@ def create_overview_plot(matches, figsize=(16, 10)):
                ha='right', va='center', fontsize=8)
     
     # Set axis
-    if sorted_matches:
-        min_start = min(m['ref_gene']['start'] for m in sorted_matches)
-        max_end = max(m['ref_gene']['end'] for m in sorted_matches)
+    if shown:
+        min_start = min(m['ref_gene']['start'] for m in shown)
+        max_end = max(m['ref_gene']['end'] for m in shown)
         ax.set_xlim(min_start - 10000, max_end + 10000)
-        ax.set_ylim(-len(sorted_matches) * track_spacing, 1)
+        ax.set_ylim(-len(shown) * track_spacing, 1)
     
     ax.set_xlabel('Genomic Position', fontsize=12, fontweight='bold')
     ax.set_ylabel('Gene Matches', fontsize=12, fontweight='bold')
-    ax.set_title(f'Gene Match Overview ({len(matches)} matches found)', 
+    shown_note = f', showing first {len(shown)}' if len(shown) < len(matches) else ''
+    ax.set_title(f'Gene Match Overview ({len(matches)} matches found{shown_note})', 
                 fontsize=14, fontweight='bold', pad=20)
     
     # Add legend
@@ -310,6 +307,71 @@ def create_overview_plot(matches, figsize=(16, 10)):
     ax.legend(handles=legend_elements, loc='upper right', fontsize=10)
     
     ax.grid(axis='x', alpha=0.3, linestyle=':', linewidth=0.5)
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
+
+
+def create_binned_overview_plot(matrix, row_labels, bin_start, bin_size, metric='overlap',
+                                total_matches=None, figsize=(16, 6)):
+    """
+    Create a level-of-detail overview: binned match statistics drawn as a
+    single heatmap (one row per chromosome or region), so drawing cost
+    depends on the number of bins rather than the number of genes.
+    
+    Args:
+        matrix: 2D array of metric values (rows x bins), NaN for empty bins
+        row_labels: Label for each row (chromosome names)
+        bin_start: Genomic start of the first bin
+        bin_size: Bin width in bp
+        metric: One of count, overlap, missing_rate, extra_rate
+        total_matches: Number of matches summarized, for the title
+        figsize: Figure size tuple
+    
+    Returns:
+        matplotlib.figure.Figure
+    """
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    
+    labels = {
+        'count': 'Matches per bin',
+        'overlap': 'Mean overlap ratio',
+        'missing_rate': 'Missing exon rate',
+        'extra_rate': 'Extra exon rate',
+    }
+    cmaps = {'count': 'viridis', 'overlap': 'RdYlGn', 'missing_rate': 'Reds', 'extra_rate': 'Oranges'}
+    
+    if matrix.size == 0:
+        ax.text(0.5, 0.5, 'No gene matches found', 
+               ha='center', va='center', fontsize=14)
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        return fig
+    
+    n_rows, n_bins = matrix.shape
+    x_min = bin_start
+    x_max = bin_start + n_bins * bin_size
+    vmax = np.nanmax(matrix) if metric == 'count' and np.isfinite(matrix).any() else 1.0
+    
+    image = ax.imshow(
+        np.ma.masked_invalid(matrix), aspect='auto', interpolation='nearest',
+        cmap=cmaps.get(metric, 'viridis'), vmin=0, vmax=vmax,
+        extent=(x_min, x_max, n_rows - 0.5, -0.5)
+    )
+    
+    ax.set_yticks(range(n_rows))
+    ax.set_yticklabels(row_labels, fontsize=9)
+    ax.set_xlabel('Genomic Position', fontsize=12, fontweight='bold')
+    ax.set_ylabel('Chromosome', fontsize=12, fontweight='bold')
+    
+    summary = f'{total_matches} matches, ' if total_matches is not None else ''
+    ax.set_title(f'Gene Match Overview ({summary}{bin_size:,} bp bins)', 
+                fontsize=14, fontweight='bold', pad=20)
+    
+    colorbar = fig.colorbar(image, ax=ax)
+    colorbar.set_label(labels.get(metric, metric), fontsize=10)
+    
+    ax.grid(axis='x', alpha=0.3, linestyle=':', linewidth=0.5)
+    fig.tight_layout()
+    return fig
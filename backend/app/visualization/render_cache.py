@@ -0,0 +1,45 @@
+"""
+Cache of encoded comparison images.
+
+Rendered image bytes are kept in an LRU cache with a byte budget, keyed by
+a digest of everything that determines the image (dataset content hashes,
+gene IDs, figure parameters). The same digest serves as the HTTP ETag.
+"""
+import hashlib
+import json
+import os
+
+from app.storage.cache import LRUCache
+
+DEFAULT_MAX_BYTES = int(os.environ.get("GFF3_RENDER_CACHE_BYTES", 256 * 1024 ** 2))
+
+render_cache = LRUCache(DEFAULT_MAX_BYTES)
+
+
+def render_key(*parts) -> str:
+    """Stable digest of the inputs that determine a rendered image."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def etag_for(key: str) -> str:
+    return f'"{key}"'
+
+
+def etag_matches(if_none_match: str, key: str) -> bool:
+    """True if an If-None-Match header value covers the ETag for key."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag_for(key) in tags
+
+
+def cached_render(key: str, render) -> bytes:
+    """Return cached image bytes for key, calling render() on a miss."""
+    image = render_cache.get(key)
+    if image is None:
+        image = render()
+        render_cache.put(key, image, len(image))
+    return image
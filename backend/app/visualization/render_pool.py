@@ -0,0 +1,117 @@
+"""
+Process pool of warm matplotlib workers for rendering comparison images.
+
+Workers import matplotlib (Agg backend) and the plotter once at start-up, so
+a request only pays for drawing and encoding. A semaphore caps the number of
+renders submitted at once; requests beyond that wait, and the number waiting
+is reported as the queue depth.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.telemetry.spans import ENABLED, record
+
+DEFAULT_WORKERS = int(os.environ.get("GFF3_RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+    from app.visualization import plotter  # noqa: F401 (pre-import)
+
+
+def render_gene_comparison(ref_gene, pred_gene, comparisons, fmt="png", **plot_kwargs):
+    """Render plot_gene_comparison for serialized genes and return image bytes."""
+    from app.visualization.plotter import plot_gene_comparison, figure_to_bytes
+    fig = plot_gene_comparison(
+        ref_gene, pred_gene, ref_gene['transcripts'], pred_gene['transcripts'],
+        comparisons, **plot_kwargs
+    )
+    return figure_to_bytes(fig, fmt)
+
+
+def render_overview(match_data, fmt="png", **plot_kwargs):
+    """Render create_overview_plot for serialized matches and return image bytes."""
+    from app.visualization.plotter import create_overview_plot, figure_to_bytes
+    return figure_to_bytes(create_overview_plot(match_data, **plot_kwargs), fmt)
+
+
+def render_binned_overview(matrix, row_labels, bin_start, bin_size, fmt="png", **plot_kwargs):
+    """Render create_binned_overview_plot and return image bytes."""
+    from app.visualization.plotter import create_binned_overview_plot, figure_to_bytes
+    fig = create_binned_overview_plot(matrix, row_labels, bin_start, bin_size, **plot_kwargs)
+    return figure_to_bytes(fig, fmt)
+
+
+class RenderPool:
+    """
+    Bounded pool of render workers. With max_workers=0 renders run inline in
+    the calling thread (still bounded by the same concurrency limit).
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_in_flight: int = None):
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max(1, max_workers) * 2
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._pool = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.render_seconds = 0.0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None and self.max_workers > 0:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            return self._pool
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def render(self, fn, *args, **kwargs) -> bytes:
+        """Run a render function (e.g. render_gene_comparison) and return its bytes."""
+        self._count(waiting=1)
+        self._slots.acquire()
+        self._count(waiting=-1, in_flight=1)
+        started = time.perf_counter()
+        try:
+            pool = self._executor()
+            result = pool.submit(fn, *args, **kwargs).result() if pool else fn(*args, **kwargs)
+            self._count(completed=1)
+            return result
+        except Exception:
+            self._count(failed=1)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._count(in_flight=-1, render_seconds=elapsed)
+            if ENABLED:
+                record("render", elapsed)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "completed": self.completed,
+                "failed": self.failed,
+                "mean_render_ms": round(1000 * self.render_seconds / self.completed, 1) if self.completed else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+render_pool = RenderPool()
@@ -0,0 +1,126 @@
+"""
+Benchmark memory held by parsed annotations, per exon.
+
+Builds the same synthetic annotation three ways and reports the bytes
+retained (tracemalloc) per exon feature:
+
+    dict models     the pre-__slots__ Exon/Transcript/Gene (copied below)
+    slotted models  app.parsing.models, as returned by parse_gff3
+    columnar        ColumnarAnnotation (parse_gff3(columnar=True))
+
+plus the cost of Transcript.start/end in a best_matching_transcript-style
+loop for the rescanning properties vs the maintained attributes.
+
+    cd backend && python benchmarks/bench_memory.py [n_genes]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.parsing.gff3_parser import collect_records, link_records, parse_gff3_lines  # noqa: E402
+from benchmarks.synthetic import generate_lines  # noqa: E402
+
+
+# Pre-__slots__ models, kept here for comparison
+
+class DictExon:
+    def __init__(self, start, end, feature_type):
+        self.start = start
+        self.end = end
+        self.feature_type = feature_type
+
+
+class DictTranscript:
+    def __init__(self, transcript_id, chrom, strand):
+        self.id = transcript_id
+        self.chrom = chrom
+        self.strand = strand
+        self.exons = []
+        self.cds = []
+
+    def add_exon(self, exon):
+        self.exons.append(exon)
+
+    @property
+    def start(self):
+        return min(e.start for e in self.exons) if self.exons else None
+
+    @property
+    def end(self):
+        return max(e.end for e in self.exons) if self.exons else None
+
+
+class DictGene:
+    def __init__(self, gene_id, chrom, strand, start=None, end=None):
+        self.id = gene_id
+        self.chrom = chrom
+        self.strand = strand
+        self.start = start
+        self.end = end
+        self.transcripts = []
+
+
+def build_dict_genes(records) -> dict:
+    genes = {}
+    for gene_id, chrom, strand, start, end, transcripts in link_records(records):
+        gene = DictGene(gene_id, chrom, strand, start, end)
+        for tx_id, tx_chrom, tx_strand, exons in transcripts:
+            transcript = DictTranscript(tx_id, tx_chrom, tx_strand)
+            for exon_start, exon_end, feature_type in exons:
+                transcript.add_exon(DictExon(exon_start, exon_end, feature_type))
+            gene.transcripts.append(transcript)
+        genes[gene_id] = gene
+    return genes
+
+
+def retained_bytes(build) -> tuple:
+    """(result, bytes still allocated by build() once it has returned)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, retained
+
+
+def bounds_loop(genes, repeat: int = 3) -> float:
+    """Seconds to read every transcript's start/end repeat times."""
+    transcripts = [tx for gene in genes.values() for tx in gene.transcripts]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for tx in transcripts:
+            tx.start, tx.end  # noqa: B018
+    return time.perf_counter() - started
+
+
+def main():
+    n_genes = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lines = list(generate_lines(n_genes))
+
+    dict_genes, dict_bytes = retained_bytes(lambda: build_dict_genes(collect_records(lines)))
+    n_exons = sum(len(tx.exons) for gene in dict_genes.values() for tx in gene.transcripts)
+    dict_bounds = bounds_loop(dict_genes)
+    del dict_genes
+
+    slotted, slotted_bytes = retained_bytes(lambda: parse_gff3_lines(lines))
+    slotted_bounds = bounds_loop(slotted)
+    del slotted
+
+    _, columnar_bytes = retained_bytes(lambda: parse_gff3_lines(lines, columnar=True))
+
+    print(f"{n_genes} genes, {n_exons} exon/CDS features")
+    for label, retained in (("dict models", dict_bytes), ("slotted models", slotted_bytes),
+                            ("columnar", columnar_bytes)):
+        print(f"  {label:<15} {retained / 1e6:8.1f} MB   {retained / n_exons:6.1f} bytes/exon")
+    print(f"  transcript bounds x3: properties {dict_bounds * 1000:.1f} ms, "
+          f"attributes {slotted_bounds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
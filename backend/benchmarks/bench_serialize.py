@@ -0,0 +1,65 @@
+"""
+Benchmark JSON serialization of a /parse-sized payload.
+
+Compares FastAPI's default path (dict -> jsonable_encoder -> json.dumps, as
+done for a dict returned from a handler) with JSONBytesResponse (dict ->
+orjson/json bytes), for object and columnar annotations.
+
+    cd backend && python benchmarks/bench_serialize.py [n_genes]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.parsing.gff3_parser import parse_gff3_lines  # noqa: E402
+from benchmarks.synthetic import generate_lines  # noqa: E402
+from app.schemas.encoding import dumps, orjson  # noqa: E402
+from app.schemas.serializers import serialize_gene  # noqa: E402
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def payload(genes):
+    return {"genes": [serialize_gene(gene) for gene in genes.values()], "gene_ids": list(genes)}
+
+
+def default_path(genes):
+    # What FastAPI does with a returned dict: encode, then JSONResponse.render
+    content = jsonable_encoder(payload(genes))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def bytes_path(genes):
+    return dumps(payload(genes))
+
+
+def main():
+    n_genes = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    lines = list(generate_lines(n_genes))
+    print(f"{n_genes} genes, encoder: {'orjson ' + orjson.__version__ if orjson else 'json'}")
+
+    for columnar in (False, True):
+        genes = parse_gff3_lines(lines, columnar=columnar)
+        assert json.loads(default_path(genes)) == json.loads(bytes_path(genes))
+        baseline = best_of(lambda: default_path(genes))
+        fast = best_of(lambda: bytes_path(genes))
+        size = len(bytes_path(genes))
+        print(f"  {'columnar' if columnar else 'objects '}  default {baseline * 1000:8.1f} ms   "
+              f"bytes {fast * 1000:8.1f} ms   speedup {baseline / fast:5.1f}x   ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark GFF3 line tokenization (collect_records) in lines per second.
+
+Compares the previous tokenizer (copied below: strip + full split +
+parse_attributes dict per line) with collect_records on in-memory lines, so
+file reading and decoding are excluded. The synthetic annotation has only
+gene/mRNA/exon/CDS lines; --utr adds a five_prime_UTR and a start_codon
+line per transcript, which collect_records skips after reading column 3.
+
+    cd backend && python benchmarks/bench_tokenize.py [n_genes] [--utr]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.parsing.gff3_parser import GFF3Records, collect_records, parse_attributes  # noqa: E402
+from benchmarks.synthetic import generate_lines  # noqa: E402
+
+
+def legacy_collect_records(lines):
+    """collect_records before the fast path, kept here for comparison."""
+    records = GFF3Records()
+    genes, transcripts, exon_buffer = records.genes, records.transcripts, records.exons
+    for line in lines:
+        if line.startswith("#") or not line.strip():
+            continue
+        fields = line.strip().split("\t")
+        if len(fields) != 9:
+            continue
+        chrom, source, feature_type, start, end, score, strand, phase, attributes = fields
+        start, end = int(start), int(end)
+        attr_dict = parse_attributes(attributes)
+        if feature_type == "gene":
+            gene_id = attr_dict.get("ID")
+            if gene_id:
+                genes[gene_id] = (chrom, strand, start, end)
+        elif feature_type in ("mRNA", "transcript"):
+            tx_id = attr_dict.get("ID")
+            parent_gene = attr_dict.get("Parent") or attr_dict.get("geneID")
+            if tx_id and parent_gene:
+                transcripts[tx_id] = (chrom, strand, parent_gene)
+        elif feature_type in ("exon", "CDS"):
+            parent_tx = attr_dict.get("Parent")
+            if parent_tx:
+                exon_buffer[parent_tx].append((start, end, feature_type))
+    return records
+
+
+def with_utrs(lines):
+    """Add UTR/start_codon lines (ignored feature types) after each mRNA line."""
+    for line in lines:
+        yield line
+        fields = line.split("\t")
+        if len(fields) == 9 and fields[2] == "mRNA":
+            tx_id = fields[8].split(";")[0][3:]
+            start = int(fields[3])
+            yield "\t".join(fields[:2] + ["five_prime_UTR", str(start), str(start + 20)]
+                            + fields[5:8] + [f"Parent={tx_id}"])
+            yield "\t".join(fields[:2] + ["start_codon", str(start + 21), str(start + 23)]
+                            + fields[5:7] + ["0", f"Parent={tx_id}"])
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n_genes = int(args[0]) if args else 50_000
+    lines = list(generate_lines(n_genes))
+    if "--utr" in sys.argv:
+        lines = list(with_utrs(lines))
+
+    legacy = legacy_collect_records(lines)
+    fast = collect_records(lines)
+    assert (legacy.genes, legacy.transcripts, dict(legacy.exons)) == \
+        (fast.genes, fast.transcripts, dict(fast.exons)), "tokenizers disagree"
+
+    print(f"{len(lines)} lines ({n_genes} genes)")
+    for label, fn in (("legacy", legacy_collect_records), ("collect_records", collect_records)):
+        seconds = best_of(lambda: fn(lines))
+        print(f"  {label:<16} {seconds * 1000:8.1f} ms   {len(lines) / seconds / 1e6:5.2f} M lines/s")
+
+
+if __name__ == "__main__":
+    main()
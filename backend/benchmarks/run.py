@@ -0,0 +1,222 @@
+"""
+Timed benchmark scenarios over synthetic annotations.
+
+Each scenario runs in a fresh (spawned) process so its peak RSS is not
+inflated by earlier scenarios. Inputs are generated once per size with
+benchmarks/synthetic.py and reused across runs; setup (e.g. parsing the
+inputs for the matching scenario) is excluded from the timing.
+
+    cd backend && python benchmarks/run.py --genes 10000 100000
+    python benchmarks/run.py --genes 10000 --scenarios parse match --json out.json
+    python benchmarks/run.py --genes 10000 --baseline out.json   # flag regressions
+
+Reported per scenario: wall time, throughput (items/s, items named per
+scenario), peak RSS of the process and the RSS growth during the timed
+section.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.synthetic import generate_pair  # noqa: E402
+
+# Slower than the baseline by more than this fraction is reported as a regression
+REGRESSION_TOLERANCE = 0.2
+# Images rendered by the plot scenario, whatever the genome size
+PLOT_GENES = 20
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Scenarios: setup(ref_path, pred_path) -> state, run(state) -> (items, unit)
+
+def _parse_setup(ref_path, pred_path):
+    return ref_path
+
+
+def _parse(columnar):
+    def run(path):
+        from app.parsing.gff3_parser import parse_gff3
+        return len(parse_gff3(path, columnar=columnar)), "genes"
+    return run
+
+
+def _parsed_setup(ref_path, pred_path):
+    from app.parsing.gff3_parser import parse_gff3
+    return parse_gff3(ref_path), parse_gff3(pred_path)
+
+
+def _match_run(state):
+    from app.comparison.matching import find_matching_genes
+    ref_genes, pred_genes = state
+    find_matching_genes(ref_genes, pred_genes, 0.5)
+    return len(ref_genes) + len(pred_genes), "genes"
+
+
+def _pairs_setup(ref_path, pred_path):
+    from app.comparison.matching import find_matching_genes, transcript_pairs
+    ref_genes, pred_genes = _parsed_setup(ref_path, pred_path)
+    matches = find_matching_genes(ref_genes, pred_genes, 0.5)
+    return [pair for r, p, _ in matches for pair in transcript_pairs(ref_genes[r], pred_genes[p])]
+
+
+def _compare_loop(pairs):
+    from app.comparison.align import compare_transcripts
+    for ref_tx, pred_tx in pairs:
+        compare_transcripts(ref_tx, pred_tx)
+    return len(pairs), "pairs"
+
+
+def _compare_batch(pairs):
+    from app.comparison.align import compare_transcripts_batch
+    compare_transcripts_batch(pairs)
+    return len(pairs), "pairs"
+
+
+def _serialize_setup(ref_path, pred_path):
+    from app.parsing.gff3_parser import parse_gff3
+    return parse_gff3(ref_path)
+
+
+def _serialize(genes):
+    from app.schemas.encoding import dumps
+    from app.schemas.serializers import serialize_gene
+    dumps({"genes": [serialize_gene(gene) for gene in genes.values()]})
+    return len(genes), "genes"
+
+
+def _plot_setup(ref_path, pred_path):
+    from app.comparison.matching import find_matching_genes, compare_gene_pair
+    from app.schemas.serializers import serialize_gene
+    from app.visualization.render_pool import _init_worker
+    _init_worker()
+    ref_genes, pred_genes = _parsed_setup(ref_path, pred_path)
+    matches = find_matching_genes(ref_genes, pred_genes, 0.5)[:PLOT_GENES]
+    return [
+        (serialize_gene(ref_genes[r]), serialize_gene(pred_genes[p]),
+         compare_gene_pair(ref_genes[r], pred_genes[p]))
+        for r, p, _ in matches
+    ]
+
+
+def _plot(items):
+    from app.visualization.render_pool import render_gene_comparison
+    for ref_gene, pred_gene, comparisons in items:
+        render_gene_comparison(ref_gene, pred_gene, comparisons)
+    return len(items), "images"
+
+
+def _metrics(state):
+    from app.comparison.metrics import accuracy_metrics
+    ref_genes, pred_genes = state
+    accuracy_metrics(ref_genes, pred_genes)
+    return len(ref_genes) + len(pred_genes), "genes"
+
+
+SCENARIOS = {
+    "parse": (_parse_setup, _parse(False)),
+    "parse_columnar": (_parse_setup, _parse(True)),
+    "match": (_parsed_setup, _match_run),
+    "compare": (_pairs_setup, _compare_loop),
+    "compare_batch": (_pairs_setup, _compare_batch),
+    "serialize": (_serialize_setup, _serialize),
+    "plot": (_plot_setup, _plot),
+    "metrics": (_parsed_setup, _metrics),
+}
+
+
+def _run_scenario(name, ref_path, pred_path, results):
+    setup, run = SCENARIOS[name]
+    state = setup(ref_path, pred_path)
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    items, unit = run(state)
+    seconds = time.perf_counter() - started
+    results.put({
+        "seconds": seconds,
+        "items": items,
+        "unit": unit,
+        "throughput": items / seconds if seconds else None,
+        "peak_rss_mb": _rss_mb(),
+        "rss_growth_mb": _rss_mb() - rss_before,
+    })
+
+
+def run_scenario(name: str, ref_path: str, pred_path: str) -> dict:
+    """Run one scenario in a spawned process and return its measurements."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_scenario, args=(name, ref_path, pred_path, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Scenario {name} failed (exit code {process.exitcode})")
+    return results.get()
+
+
+def _key(record):
+    return f"{record['scenario']}@{record['genes']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--genes", type=int, nargs="+", default=[10_000],
+                        help="reference genome sizes in genes (e.g. 10000 100000 1000000)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--chroms", type=int, default=5)
+    parser.add_argument("--isoforms", type=int, default=3)
+    parser.add_argument("--exons", type=int, default=8)
+    parser.add_argument("--perturb", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(__file__), "data"))
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {_key(record): record for record in json.load(f)}
+
+    records = []
+    regressions = 0
+    print(f"{'scenario':<16}{'genes':>10}{'seconds':>10}{'throughput':>22}{'peak RSS':>12}{'growth':>10}")
+    for n_genes in args.genes:
+        ref_path, pred_path = generate_pair(args.data_dir, n_genes, args.chroms, args.isoforms,
+                                            args.exons, args.perturb, args.seed)
+        for name in args.scenarios:
+            result = run_scenario(name, ref_path, pred_path)
+            record = {"scenario": name, "genes": n_genes, **result}
+            records.append(record)
+
+            line = (f"{name:<16}{n_genes:>10}{result['seconds']:>10.3f}"
+                    f"{result['throughput']:>14,.0f} {result['unit'] + '/s':<7}"
+                    f"{result['peak_rss_mb']:>9.0f} MB{result['rss_growth_mb']:>7.0f} MB")
+            previous = baseline.get(_key(record))
+            if previous:
+                ratio = result["seconds"] / previous["seconds"]
+                line += f"   {ratio:.2f}x baseline"
+                if ratio > 1 + REGRESSION_TOLERANCE:
+                    line += "  REGRESSION"
+                    regressions += 1
+            print(line, flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(records, f, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
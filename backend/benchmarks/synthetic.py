@@ -0,0 +1,128 @@
+"""
+Deterministic synthetic GFF3 annotations for benchmarks.
+
+generate_pair writes a reference annotation and a "predicted" one derived
+from the same random layout: each predicted exon boundary is shifted with
+probability perturb, each exon is dropped with probability perturb / 4,
+and predicted models use transcript/geneID lines (no gene features) like
+typical gene-finder output. The same arguments always produce
+byte-identical files.
+
+    cd backend && python benchmarks/synthetic.py --genes 100000 --out /tmp/bench
+"""
+import argparse
+import os
+import random
+
+
+def generate_lines(n_genes: int, chroms: int = 5, isoforms: int = 3, exons: int = 8,
+                   perturb: float = 0.0, seed: int = 0, predicted: bool = False):
+    """
+    Yield GFF3 lines (without newlines) for n_genes genes spread evenly over
+    chroms chromosomes, with 1..isoforms transcripts per gene and 1..exons
+    exons (each with a CDS) per transcript.
+    """
+    layout = random.Random(seed)
+    noise = random.Random(seed + 1)
+    prefix = "pred" if predicted else "ref"
+
+    yield "##gff-version 3"
+    per_chrom = -(-n_genes // chroms)
+    for c in range(chroms):
+        chrom = f"chr{c + 1}"
+        position = 1000
+        for i in range(c * per_chrom, min(n_genes, (c + 1) * per_chrom)):
+            strand = "+-"[layout.random() < 0.5]
+            gene_id = f"{prefix}_g{i}"
+
+            gene_exons = []
+            cursor = position
+            for _ in range(layout.randint(1, exons)):
+                start = cursor + layout.randint(50, 400)
+                end = start + layout.randint(50, 600)
+                gene_exons.append((start, end))
+                cursor = end
+            gene_start, gene_end = gene_exons[0][0], gene_exons[-1][1]
+
+            if not predicted:
+                yield f"{chrom}\tsynthetic\tgene\t{gene_start}\t{gene_end}\t.\t{strand}\t.\tID={gene_id}"
+            for t in range(layout.randint(1, isoforms)):
+                tx_id = f"{gene_id}.t{t}"
+                # Later isoforms skip some exons
+                tx_exons = [e for k, e in enumerate(gene_exons) if t == 0 or k in (0, len(gene_exons) - 1)
+                            or layout.random() >= 0.3]
+                if predicted:
+                    tx_exons = _perturb(tx_exons, perturb, noise)
+                tx_start, tx_end = tx_exons[0][0], tx_exons[-1][1]
+                if predicted:
+                    yield (f"{chrom}\tsynthetic\ttranscript\t{tx_start}\t{tx_end}\t.\t{strand}\t.\t"
+                           f"ID={tx_id};geneID={gene_id}")
+                else:
+                    yield f"{chrom}\tsynthetic\tmRNA\t{tx_start}\t{tx_end}\t.\t{strand}\t.\tID={tx_id};Parent={gene_id}"
+                for start, end in tx_exons:
+                    yield f"{chrom}\tsynthetic\texon\t{start}\t{end}\t.\t{strand}\t.\tParent={tx_id}"
+                    yield f"{chrom}\tsynthetic\tCDS\t{start + 3}\t{end - 3}\t.\t{strand}\t0\tParent={tx_id}"
+            position = gene_end + layout.randint(200, 5000)
+
+
+def _perturb(exons, rate, rng):
+    if not rate:
+        return exons
+    out = []
+    for start, end in exons:
+        if len(exons) > 1 and rng.random() < rate / 4:
+            continue
+        if rng.random() < rate:
+            start += rng.randint(-30, 30)
+        if rng.random() < rate:
+            end += rng.randint(-30, 30)
+        if end - start >= 10:
+            out.append((start, end))
+    return out or exons[:1]
+
+
+def write_gff3(path: str, lines):
+    with open(path, "w") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+    return path
+
+
+def generate_pair(out_dir: str, n_genes: int, chroms: int = 5, isoforms: int = 3, exons: int = 8,
+                  perturb: float = 0.1, seed: int = 0) -> tuple:
+    """
+    Write (or reuse) ref/pred GFF3 files for these parameters under out_dir
+    and return their paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tag = f"{n_genes}g_{chroms}c_{isoforms}i_{exons}e_{perturb}p_{seed}s"
+    paths = []
+    for predicted in (False, True):
+        path = os.path.join(out_dir, f"{'pred' if predicted else 'ref'}_{tag}.gff3")
+        if not os.path.exists(path):
+            staging = path + ".tmp"
+            write_gff3(staging, generate_lines(n_genes, chroms, isoforms, exons, perturb if predicted else 0.0,
+                                               seed, predicted=predicted))
+            os.replace(staging, path)
+        paths.append(path)
+    return tuple(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--genes", type=int, default=10_000)
+    parser.add_argument("--chroms", type=int, default=5)
+    parser.add_argument("--isoforms", type=int, default=3, help="max transcripts per gene")
+    parser.add_argument("--exons", type=int, default=8, help="max exons per transcript")
+    parser.add_argument("--perturb", type=float, default=0.1, help="predicted boundary shift rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmarks/data")
+    args = parser.parse_args()
+    for path in generate_pair(args.out, args.genes, args.chroms, args.isoforms, args.exons,
+                              args.perturb, args.seed):
+        print(path, f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,58 @@
 // Global state
 let geneMatches = [];
 let comparisonData = {};
+let datasetIds = { ref: null, pred: null };
+const OVERLAP_THRESHOLD = "0.3";
+
+// Upload a GFF3 file once and return its server-side dataset ID
+async function uploadDataset(file) {
+  const formData = new FormData();
+  formData.append("file", file);
+
+  const response = await fetch("http://localhost:8000/api/upload", {
+    method: "POST",
+    body: formData
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || `HTTP ${response.status}: Failed to upload ${file.name}`);
+  }
+
+  const data = await response.json();
+  console.log(`Uploaded ${file.name} as dataset ${data.dataset_id} (${data.gene_count} genes${data.cached ? ", cached" : ""})`);
+  return data.dataset_id;
+}
+
+// Read an NDJSON response line by line, calling onRecord for each record
+// as it arrives. Returns the final {"done": true, ...} summary line.
+async function readNDJSON(response, onRecord) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let pending = "";
+  let summary = null;
+
+  const handle = (line) => {
+    if (!line.trim()) return;
+    const record = JSON.parse(line);
+    if (record.done) {
+      summary = record;
+    } else {
+      onRecord(record);
+    }
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    pending += decoder.decode(value, { stream: true });
+    const lines = pending.split("\n");
+    pending = lines.pop();
+    lines.forEach(handle);
+  }
+  handle(pending + decoder.decode());
+  return summary;
+}
 
 // Upload files and compare
 document.getElementById("runBtn").onclick = async () => {
@@ -16,49 +68,31 @@ document.getElementById("runBtn").onclick = async () => {
   const btn = document.getElementById("runBtn");
   const loadingMsg = document.getElementById("loading-message");
   const originalText = btn.textContent;
+  const originalMessage = loadingMsg.textContent;
   btn.disabled = true;
   btn.textContent = "Processing...";
   loadingMsg.style.display = "block";
 
   try {
-    console.log("Step 1: Finding matching genes...");
-    
-    // Find matching genes
-    const matchFormData = new FormData();
-    matchFormData.append("ref_file", refFile);
-    matchFormData.append("pred_file", predFile);
-    matchFormData.append("overlap_threshold", "0.3");
-
-    const matchResponse = await fetch("http://localhost:8000/api/find-matches", {
-      method: "POST",
-      body: matchFormData
-    });
-
-    if (!matchResponse.ok) {
-      const errorData = await matchResponse.json().catch(() => ({}));
-      throw new Error(errorData.error || `HTTP ${matchResponse.status}: Failed to find gene matches`);
-    }
+    console.log("Step 0: Uploading files...");
+    const [refId, predId] = await Promise.all([uploadDataset(refFile), uploadDataset(predFile)]);
+    datasetIds = { ref: refId, pred: predId };
 
-    const matchData = await matchResponse.json();
-    console.log("Match data received:", matchData);
-    geneMatches = matchData.matches || [];
+    // Match once on the server and stream every matched gene's comparison;
+    // each result is categorized and listed as soon as it arrives
+    console.log("Step 1: Streaming gene comparisons...");
+    const summary = await loadAllComparisons(OVERLAP_THRESHOLD, loadingMsg);
+    console.log("Comparison summary received:", summary);
 
     if (geneMatches.length === 0) {
       alert("No matching genes found between the two files");
-      btn.disabled = false;
-      btn.textContent = originalText;
       return;
     }
 
     console.log(`Found ${geneMatches.length} matching genes`);
 
-    // Get detailed comparison for each gene
-    console.log("Step 2: Loading detailed comparisons...");
-    await loadAllComparisons(refFile, predFile);
-
-    console.log("Step 3: Categorizing genes...");
-    // Categorize and display
-    categorizeAndDisplay();
+    console.log("Step 2: Loading accuracy metrics...");
+    await loadMetrics();
 
     console.log("Done!");
 
@@ -69,146 +103,109 @@ document.getElementById("runBtn").onclick = async () => {
     btn.disabled = false;
     btn.textContent = originalText;
     loadingMsg.style.display = "none";
+    loadingMsg.textContent = originalMessage;
   }
 };
 
-// Load comparison data for all matched genes
-async function loadAllComparisons(refFile, predFile) {
+// Stream /compare-all results as NDJSON, adding each matched gene to the
+// categories as it arrives. Returns the final summary line.
+async function loadAllComparisons(overlapThreshold, loadingMsg) {
+  geneMatches = [];
   comparisonData = {};
-  
-  // The /api/compare endpoint expects the gene_id to exist in BOTH files
-  // But we have different IDs, so we need to use a different approach
-  // Let's parse both files and get the actual gene data, then compare manually
-  
-  console.log(`Loading comparisons for ${geneMatches.length} genes...`);
-  
-  for (let i = 0; i < geneMatches.length; i++) {
-    const match = geneMatches[i];
-    try {
-      // Use the new endpoint that accepts both gene IDs
-      const formData = new FormData();
-      formData.append("ref_file", refFile);
-      formData.append("pred_file", predFile);
-      formData.append("ref_gene_id", match.ref_gene_id);
-      formData.append("pred_gene_id", match.pred_gene_id);
-
-      const response = await fetch("http://localhost:8000/api/compare-genes", {
-        method: "POST",
-        body: formData
-      });
+  resetCategories();
 
-      if (response.ok) {
-        const data = await response.json();
-        comparisonData[match.ref_gene_id] = {
-          ...data,
-          pred_gene_id: match.pred_gene_id,
-          overlap_ratio: match.overlap_ratio
-        };
-        console.log(`Loaded comparison ${i+1}/${geneMatches.length}: ${match.ref_gene_id} ↔ ${match.pred_gene_id}`);
-      } else {
-        const errorData = await response.json().catch(() => ({}));
-        console.warn(`Failed to compare ${match.ref_gene_id} ↔ ${match.pred_gene_id}:`, errorData.error || response.status);
-        // Create empty comparison so we don't skip it
-        comparisonData[match.ref_gene_id] = {
-          gene_id: match.ref_gene_id,
-          comparisons: [],
-          pred_gene_id: match.pred_gene_id,
-          overlap_ratio: match.overlap_ratio
-        };
-      }
-    } catch (err) {
-      console.error(`Error comparing ${match.ref_gene_id}:`, err);
-      // Create empty comparison
-      comparisonData[match.ref_gene_id] = {
-        gene_id: match.ref_gene_id,
-        comparisons: [],
-        pred_gene_id: match.pred_gene_id,
-        overlap_ratio: match.overlap_ratio
-      };
-    }
+  const formData = new FormData();
+  formData.append("ref_dataset_id", datasetIds.ref);
+  formData.append("pred_dataset_id", datasetIds.pred);
+  formData.append("overlap_threshold", overlapThreshold);
+  formData.append("stream", "true");
+
+  const response = await fetch("http://localhost:8000/api/compare-all", {
+    method: "POST",
+    body: formData
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || `HTTP ${response.status}: Failed to load comparisons`);
   }
-  
+
+  const summary = await readNDJSON(response, (result) => {
+    geneMatches.push(result);
+    comparisonData[result.ref_gene_id] = result;
+    addGeneMatch(result, result);
+    if (geneMatches.length % 500 === 0) {
+      loadingMsg.textContent = `Received ${geneMatches.length} matches...`;
+    }
+  });
+
   console.log(`Loaded ${Object.keys(comparisonData).length} comparisons`);
+  return summary;
 }
 
-// Categorize genes and calculate statistics
-function categorizeAndDisplay() {
-  const SIGNIFICANT_THRESHOLD = 0.30; // 30% non-overlap = significant difference
-  const REASONABLE_THRESHOLD = 0.30; // <30% non-overlap = reasonable
+// Running totals behind the statistics and category lists
+let categories = { perfect: [], reasonable: [], significant: [] };
+let totalOverlap = 0;
 
-  const perfect = [];
-  const reasonable = [];
-  const significant = [];
+// Empty the category lists and statistics before a new comparison
+function resetCategories() {
+  categories = { perfect: [], reasonable: [], significant: [] };
+  totalOverlap = 0;
+  Object.keys(categories).forEach(category => populateDropdown(`${category}-select`, [], category));
+  updateCategoryCounts();
+}
 
-  let totalOverlap = 0;
-  let totalGenes = 0;
+// Categorize one matched gene and append it to its category list
+function addGeneMatch(match, comp) {
+  const SIGNIFICANT_THRESHOLD = 0.30; // 30% non-overlap = significant difference
 
-  geneMatches.forEach(match => {
-    const comp = comparisonData[match.ref_gene_id];
-    if (!comp) {
-      console.warn(`No comparison data for ${match.ref_gene_id}`);
-      return;
-    }
+  // Use the overlap ratio from the match if available, otherwise calculate
+  let overlapRatio = match.overlap_ratio || 0;
+  let nonOverlapRatio = 1 - overlapRatio;
 
-    // Use the overlap ratio from the match if available, otherwise calculate
-    let overlapRatio = match.overlap_ratio || 0;
-    let nonOverlapRatio = 1 - overlapRatio;
-
-    // If we have comparison data, calculate more precisely
-    if (comp.comparisons && comp.comparisons.length > 0) {
-      const totalRefBp = calculateTotalBp(comp.comparisons, 'ref');
-      const totalPredBp = calculateTotalBp(comp.comparisons, 'pred');
-      const matchedBp = calculateMatchedBp(comp.comparisons);
-      const totalBp = Math.max(totalRefBp, totalPredBp);
-      
-      if (totalBp > 0) {
-        overlapRatio = matchedBp / totalBp;
-        nonOverlapRatio = 1 - overlapRatio;
-      }
-    }
+  // If we have comparison data, calculate more precisely
+  if (comp.comparisons && comp.comparisons.length > 0) {
+    const totalRefBp = calculateTotalBp(comp.comparisons, 'ref');
+    const totalPredBp = calculateTotalBp(comp.comparisons, 'pred');
+    const matchedBp = calculateMatchedBp(comp.comparisons);
+    const totalBp = Math.max(totalRefBp, totalPredBp);
 
-    totalOverlap += overlapRatio;
-    totalGenes++;
-
-    const geneInfo = {
-      ref_id: match.ref_gene_id,
-      pred_id: match.pred_gene_id,
-      overlap_ratio: overlapRatio,
-      non_overlap_ratio: nonOverlapRatio,
-      comparison: comp
-    };
-
-    if (nonOverlapRatio === 0) {
-      perfect.push(geneInfo);
-    } else if (nonOverlapRatio < SIGNIFICANT_THRESHOLD) {
-      reasonable.push(geneInfo);
-    } else {
-      significant.push(geneInfo);
+    if (totalBp > 0) {
+      overlapRatio = matchedBp / totalBp;
+      nonOverlapRatio = 1 - overlapRatio;
     }
-  });
-
-  if (totalGenes === 0) {
-    console.error("No genes with comparison data found!");
-    alert("No comparison data could be loaded. Check console for details.");
-    return;
   }
 
-  // Display statistics
-  displayStatistics(totalGenes, totalOverlap / totalGenes, perfect.length, significant.length);
+  const geneInfo = {
+    ref_id: match.ref_gene_id,
+    pred_id: match.pred_gene_id,
+    overlap_ratio: overlapRatio,
+    non_overlap_ratio: nonOverlapRatio,
+    comparison: comp
+  };
+
+  const category = nonOverlapRatio === 0 ? "perfect" :
+    nonOverlapRatio < SIGNIFICANT_THRESHOLD ? "reasonable" : "significant";
+  categories[category].push(geneInfo);
+  totalOverlap += overlapRatio;
+  appendGeneOption(document.getElementById(`${category}-select`), geneInfo, categories[category].length - 1);
+  updateCategoryCounts();
+}
 
-  // Populate dropdowns
-  populateDropdown("perfect-select", perfect, "perfect");
-  populateDropdown("reasonable-select", reasonable, "reasonable");
-  populateDropdown("significant-select", significant, "significant");
+// Refresh the statistics and category counts, showing the sections once
+// the first gene has been added
+function updateCategoryCounts() {
+  const total = categories.perfect.length + categories.reasonable.length + categories.significant.length;
+  displayStatistics(total, total ? totalOverlap / total : 0,
+                    categories.perfect.length, categories.significant.length);
 
-  // Update counts
-  document.getElementById("perfect-count").textContent = perfect.length;
-  document.getElementById("reasonable-count").textContent = reasonable.length;
-  document.getElementById("significant-count").textContent = significant.length;
+  document.getElementById("perfect-count").textContent = categories.perfect.length;
+  document.getElementById("reasonable-count").textContent = categories.reasonable.length;
+  document.getElementById("significant-count").textContent = categories.significant.length;
 
-  // Show sections
-  document.getElementById("stats-section").style.display = "block";
-  document.getElementById("gene-categories").style.display = "block";
+  const display = total ? "block" : "none";
+  document.getElementById("stats-section").style.display = display;
+  document.getElementById("gene-categories").style.display = display;
 }
 
 // Calculate total base pairs for reference or predicted
@@ -266,6 +263,30 @@ function calculateMatchedBp(comparisons) {
   return matched;
 }
 
+// Load genome-wide sensitivity/precision computed by the server
+async function loadMetrics() {
+  const formData = new FormData();
+  formData.append("ref_dataset_id", datasetIds.ref);
+  formData.append("pred_dataset_id", datasetIds.pred);
+
+  const response = await fetch("http://localhost:8000/api/metrics", {
+    method: "POST",
+    body: formData
+  });
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || `HTTP ${response.status}: Failed to load metrics`);
+  }
+
+  const metrics = await response.json();
+  const percent = value => value === null ? "-" : (value * 100).toFixed(1) + "%";
+  ["base", "exon", "transcript", "gene"].forEach(level => {
+    const { sensitivity, precision } = metrics[level];
+    document.getElementById(`metric-${level}`).textContent = `${percent(sensitivity)} / ${percent(precision)}`;
+  });
+}
+
 // Display statistics
 function displayStatistics(total, avgOverlap, perfect, significant) {
   document.getElementById("total-matches").textContent = total;
@@ -279,13 +300,7 @@ function populateDropdown(selectId, genes, category) {
   const select = document.getElementById(selectId);
   select.innerHTML = '<option value="">-- Select a gene --</option>';
   
-  genes.forEach((gene, idx) => {
-    const option = document.createElement("option");
-    option.value = idx;
-    option.textContent = `${gene.ref_id} ↔ ${gene.pred_id} (${(gene.overlap_ratio * 100).toFixed(1)}% overlap)`;
-    option.dataset.geneInfo = JSON.stringify(gene);
-    select.appendChild(option);
-  });
+  genes.forEach((gene, idx) => appendGeneOption(select, gene, idx));
 
   // Add event listener
   select.onchange = function() {
@@ -296,6 +311,15 @@ function populateDropdown(selectId, genes, category) {
   };
 }
 
+// Append one gene to a category dropdown
+function appendGeneOption(select, gene, idx) {
+  const option = document.createElement("option");
+  option.value = idx;
+  option.textContent = `${gene.ref_id} ↔ ${gene.pred_id} (${(gene.overlap_ratio * 100).toFixed(1)}% overlap)`;
+  option.dataset.geneInfo = JSON.stringify(gene);
+  select.appendChild(option);
+}
+
 // Display gene comparison visualization
 function displayGeneComparison(geneInfo) {
   document.getElementById("selected-gene-title").textContent = 
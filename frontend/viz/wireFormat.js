@@ -0,0 +1,81 @@
+/**
+ * Decoders for the compact wire formats (format=compact / format=binary),
+ * see backend/app/schemas/compact.py. Each returns data in the regular JSON
+ * shape, so renderGene and the rest of the UI need no changes.
+ *
+ * Compact exons are flat [start delta, length, type code, ...] triples; the
+ * first delta is from the gene start, later ones from the previous exon start.
+ */
+
+function decodeExonTriples(triples, geneStart, types, offset = 0, count = triples.length / 3) {
+    const exons = new Array(count);
+    let previous = geneStart || 0;
+    for (let i = 0; i < count; i++) {
+        const j = offset + i * 3;
+        const start = previous + triples[j];
+        exons[i] = { start, end: start + triples[j + 1], type: types[triples[j + 2]] };
+        previous = start;
+    }
+    return exons;
+}
+
+function decodeCompactGene(gene, types) {
+    return {
+        ...gene,
+        transcripts: gene.transcripts.map(tx => ({
+            transcript_id: tx.transcript_id,
+            exons: decodeExonTriples(tx.exons, gene.start, types)
+        }))
+    };
+}
+
+function decodeFlatExons(flat, types) {
+    const exons = [];
+    for (let i = 0; i < flat.length; i += 3) {
+        exons.push({ start: flat[i], end: flat[i + 1], type: types[flat[i + 2]] });
+    }
+    return exons;
+}
+
+function decodeFlatPairs(flat, types) {
+    const pairs = [];
+    for (let i = 0; i < flat.length; i += 6) {
+        pairs.push({
+            ref: { start: flat[i], end: flat[i + 1], type: types[flat[i + 2]] },
+            pred: { start: flat[i + 3], end: flat[i + 4], type: types[flat[i + 5]] }
+        });
+    }
+    return pairs;
+}
+
+function decodeCompactDiff(diff, types) {
+    return {
+        reference_transcript: diff.reference_transcript,
+        predicted_transcript: diff.predicted_transcript,
+        matched: decodeFlatPairs(diff.matched, types),
+        missing: decodeFlatExons(diff.missing, types),
+        extra: decodeFlatExons(diff.extra, types),
+        partial: decodeFlatPairs(diff.partial, types)
+    };
+}
+
+// Decode a format=binary body (e.g. await response.arrayBuffer()).
+// Returns { header, genes } with genes in serialize_gene shape.
+function decodeBinaryGenes(buffer) {
+    const view = new DataView(buffer);
+    const headerLength = view.getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+
+    // Int32Array needs platform (little-endian) byte order and 4-byte alignment
+    const triples = new Int32Array(buffer, 4 + headerLength);
+    let offset = 0;
+    const genes = header.genes.map(([gene_id, chrom, strand, start, end, transcripts]) => ({
+        gene_id, chrom, start, end, strand,
+        transcripts: transcripts.map(([transcript_id, count]) => {
+            const exons = decodeExonTriples(triples, start, header.types, offset, count);
+            offset += count * 3;
+            return { transcript_id, exons };
+        })
+    }));
+    return { header, genes };
+}